@@ -0,0 +1,317 @@
+#!/usr/bin/env python3.6
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from collections import deque
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+from LettersDistributionFrequency import *
+from FuzzerController import *
+from WriterController import *
+from SequenceGenerator import *
+from Deduplicators.SetDeduplicator import *
+from Writers.SimpleFileWriter import *
+from Writers.BlockFileWriter import *
+from Writers.ShardedFileWriter import *
+from Writers.FixedWidthRecordWriter import *
+
+class Benchmark(object):
+
+	# Throughput benchmarks on synthetic data
+	#
+	# Every benchmark runs `repeat` times and keeps the best time; results
+	# are printed and can be saved as JSON (with the git commit) to compare
+	# revisions:
+	#	./Benchmark.py --output-json before.json
+	#	... change ...
+	#	./Benchmark.py --output-json after.json
+
+	WRITE_BATCH_SIZE = 10000
+
+	def __init__(self, loggerObj, wordsPerLength=20000, maximumWordLength=10, numberOfLetters=12, numberOfOperations=200000, repeat=3, seed=1):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		self._wordsPerLength = wordsPerLength
+		self._maxWordLength = maximumWordLength
+		self._nbLetters = numberOfLetters
+		self._nbOperations = numberOfOperations
+		self._repeat = repeat
+		self._seed = seed
+
+		self._tmpDir = None
+		self._results = {}
+
+
+	# *** Synthetic data ***
+
+	def createSyntheticWords(self, randomObj):
+		# { length : { word : weight } }, Zipf-like weights
+		wordsByLength = {}
+		for length in range(1, self._maxWordLength + 1):
+			# Short lengths can't hold wordsPerLength distinct words
+			nbWords = min(self._wordsPerLength, 26 ** length)
+			words = set()
+			while (len(words) < nbWords):
+				words.add("".join(randomObj.choices(string.ascii_lowercase, k=length)))
+			wordsByLength[length] = { word : (1.0 / rank) for rank, word in enumerate(sorted(words), start=1) }
+		return wordsByLength
+
+
+	def createSyntheticDistribution(self):
+		# Decreasing frequency with the length
+		weights = { length : float(self._maxWordLength + 1 - length) for length in range(1, self._maxWordLength + 1) }
+		total = sum(weights.values())
+		return { length : (weight / total) for length, weight in weights.items() }
+
+
+	def writeSyntheticCsv(self, wordsByLength, csvPath):
+		# Same format as the dictionnaries: "probability,word"
+		with open(csvPath, "w") as csvFile:
+			for patternDict in wordsByLength.values():
+				total = sum(patternDict.values())
+				for word, weight in patternDict.items():
+					csvFile.write(format(weight / total, ".10f") + "," + word + "\n")
+
+
+	def createSyntheticPasswords(self, randomObj):
+		alphabet = string.ascii_letters + string.digits
+		return [ "".join(randomObj.choices(alphabet, k=self._nbLetters)) for index in range(self._nbOperations) ]
+
+
+	# *** Helpers ***
+
+	def _measure(self, name, function, nbItems, unit, nbBytes=None):
+		# Best of `repeat` runs; function() is called once per run
+		# nbBytes may be a callable, evaluated after the runs
+		bestTime = None
+		for run in range(self._repeat):
+			startTime = time.perf_counter()
+			function()
+			elapsedTime = time.perf_counter() - startTime
+			if ( (bestTime is None) or (elapsedTime < bestTime) ):
+				bestTime = elapsedTime
+
+		result = {
+			"seconds": bestTime,
+			"items"  : nbItems,
+			"rate"   : nbItems / max(bestTime, 1e-9),
+			"unit"   : unit,
+		}
+		if (callable(nbBytes)):
+			nbBytes = nbBytes()
+		if (nbBytes is not None):
+			result["bytes"] = nbBytes
+			result["mbPerSecond"] = (nbBytes / (1024*1024)) / max(bestTime, 1e-9)
+		self._results[name] = result
+
+		line = name.ljust(32) + format(result["rate"], ",.0f").rjust(14) + " " + unit
+		if (nbBytes is not None):
+			line += "  (" + format(result["mbPerSecond"], ".1f") + " MB/s)"
+		print(line)
+		return result
+
+
+	def _createLoaders(self, wordsByLength):
+		wordsObj = DictionnaryLoader(loggerObj=self._logger)
+		for length, patternDict in wordsByLength.items():
+			wordsObj.setPatternDictForLength(length, patternDict)
+		frequencyObj = LettersDistributionFrequency(loggerObj=self._logger)
+		frequencyObj.setDistributionDict(self.createSyntheticDistribution())
+		return (wordsObj, frequencyObj)
+
+
+	def _createGenerator(self, wordsByLength, writerCtrl, maximumNumberOfSequences):
+		(wordsObj, frequencyObj) = self._createLoaders(wordsByLength)
+		return SequenceGenerator(loggerObj=self._logger,
+		                         dictionnaryLoaderObj=wordsObj,
+		                         fuzzerObj=FuzzerController(loggerObj=self._logger, seed=self._seed),
+		                         writerObj=writerCtrl,
+		                         numberOfLetters=self._nbLetters,
+		                         lettersDistributionFrequencyObj=frequencyObj,
+		                         maximumNumberOfSequences=maximumNumberOfSequences,
+		                         maximumBytesSizeForAllSequences=sys.maxsize,
+		                         randomObj=random.Random(self._seed))
+
+
+	# *** Benchmarks ***
+
+	def benchmarkLoadDictionnary(self, wordsByLength):
+		csvPath = os.path.join(self._tmpDir, "words.csv")
+		self.writeSyntheticCsv(wordsByLength, csvPath)
+		nbRows = sum( len(patternDict) for patternDict in wordsByLength.values() )
+
+		def run():
+			DictionnaryLoader(loggerObj=self._logger).loadPatternFromCsvPath(csvPath)
+		self._measure("DictionnaryLoader.load", run, nbRows, "rows/s", os.path.getsize(csvPath))
+
+
+	def benchmarkPickWord(self, wordsByLength):
+		generator = self._createGenerator(wordsByLength, WriterController(loggerObj=self._logger), 1)
+
+		def run():
+			pickWord = generator._pickWord
+			for index in range(self._nbOperations):
+				pickWord(self._nbLetters)
+		self._measure("SequenceGenerator._pickWord", run, self._nbOperations, "picks/s")
+
+
+	def benchmarkSortCompletedSequence(self, wordsByLength, passwords):
+		generator = self._createGenerator(wordsByLength, WriterController(loggerObj=self._logger), 1)
+
+		def run():
+			# Half new, half duplicates
+			sequencesToSort = passwords + passwords[:len(passwords)//2]
+			generator._sortCompletedSequence(sequencesToSort, SetDeduplicator(loggerObj=self._logger), [], deque(), sys.maxsize)
+		self._measure("SequenceGenerator._sortCompleted", run, len(passwords) + len(passwords)//2, "sequences/s")
+
+
+	def benchmarkFuzzerLookups(self):
+		fuzzerCtrl = FuzzerController(loggerObj=self._logger, seed=self._seed)
+		fuzzerCtrl.buildLookupTables(self._nbLetters)
+		budgets = [ (index % (self._nbLetters + 1)) for index in range(self._nbOperations) ]
+
+		def run():
+			for budget in budgets:
+				fuzzerCtrl.getNewSequenceFuzzers(budget)
+				fuzzerCtrl.getNewWordInSequenceFuzzers(budget)
+				fuzzerCtrl.getBetweenWordInSequenceFuzzers(budget)
+				fuzzerCtrl.getCompleteSequenceFuzzers(budget)
+		self._measure("FuzzerController.lookups", run, 4 * len(budgets), "lookups/s")
+
+
+	def benchmarkWriters(self, passwords):
+		nbBytes = sum( (len(password) + 1) for password in passwords )
+		batches = [ passwords[start:start+self.WRITE_BATCH_SIZE] for start in range(0, len(passwords), self.WRITE_BATCH_SIZE) ]
+		writerFactories = [
+			("SimpleFileWriter",            "out.txt", lambda: SimpleFileWriter(loggerObj=self._logger)),
+			("BlockFileWriter",             "out.txt", lambda: BlockFileWriter(loggerObj=self._logger)),
+			("BlockFileWriter.writev",      "out.txt", lambda: BlockFileWriter(loggerObj=self._logger, useWritev=True)),
+			("BlockFileWriter.gz",          "out.txt.gz", lambda: BlockFileWriter(loggerObj=self._logger)),
+			("ShardedFileWriter",           "out.txt", lambda: ShardedFileWriter(loggerObj=self._logger, maximumPasswordsPerShard=max(1, len(passwords) // 4))),
+			("FixedWidthRecordWriter",      "out.bin", lambda: FixedWidthRecordWriter(loggerObj=self._logger, recordWidth=self._nbLetters)),
+		]
+
+		for (name, filename, createWriter) in writerFactories:
+			outputDir = os.path.join(self._tmpDir, name)
+			os.makedirs(outputDir, exist_ok=True)
+
+			def run():
+				writer = createWriter()
+				writer.open(filepath=os.path.join(outputDir, filename), overwrite=True)
+				for batch in batches:
+					writer.write(batch)
+				writer.close()
+			self._measure(name, run, len(passwords), "passwords/s", nbBytes)
+			shutil.rmtree(outputDir)
+
+
+	def benchmarkEndToEnd(self, wordsByLength):
+		outputPath = os.path.join(self._tmpDir, "generated.txt")
+		holder = {}
+
+		def run():
+			writerCtrl = WriterController(loggerObj=self._logger)
+			writer = BlockFileWriter(loggerObj=self._logger)
+			writer.open(filepath=outputPath, overwrite=True)
+			writerCtrl.addWriter(writer)
+			self._createGenerator(wordsByLength, writerCtrl, self._nbOperations).generateSequences()
+			holder["bytes"] = os.path.getsize(outputPath)
+		# Generator creation (samplers, fuzzers) is part of the measure
+		self._measure("SequenceGenerator.end-to-end", run, self._nbOperations, "passwords/s", lambda: holder["bytes"])
+		os.remove(outputPath)
+
+
+	# *** Run ***
+
+	@staticmethod
+	def getGitCommit():
+		try:
+			return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode("ascii").strip()
+		except (OSError, subprocess.CalledProcessError) as err:
+			return None
+
+
+	def run(self, selectedNames=None):
+		randomObj = random.Random(self._seed)
+		wordsByLength = self.createSyntheticWords(randomObj)
+		passwords = self.createSyntheticPasswords(randomObj)
+
+		benchmarks = [
+			("load",       lambda: self.benchmarkLoadDictionnary(wordsByLength)),
+			("pick",       lambda: self.benchmarkPickWord(wordsByLength)),
+			("sort",       lambda: self.benchmarkSortCompletedSequence(wordsByLength, passwords)),
+			("fuzzers",    lambda: self.benchmarkFuzzerLookups()),
+			("writers",    lambda: self.benchmarkWriters(passwords)),
+			("end-to-end", lambda: self.benchmarkEndToEnd(wordsByLength)),
+		]
+
+		self._tmpDir = tempfile.mkdtemp(prefix="wordsgenerator-benchmark-")
+		try:
+			for (name, benchmark) in benchmarks:
+				if ( (selectedNames is None) or (name in selectedNames) ):
+					benchmark()
+		finally:
+			shutil.rmtree(self._tmpDir, ignore_errors=True)
+			self._tmpDir = None
+
+		return {
+			"commit"    : self.getGitCommit(),
+			"date"      : time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"python"    : platform.python_version(),
+			"platform"  : platform.platform(),
+			"parameters": {
+				"wordsPerLength"    : self._wordsPerLength,
+				"maximumWordLength" : self._maxWordLength,
+				"numberOfLetters"   : self._nbLetters,
+				"numberOfOperations": self._nbOperations,
+				"repeat"            : self._repeat,
+				"seed"              : self._seed,
+			},
+			"results"   : self._results,
+		}
+
+
+BENCHMARK_NAMES = ["load", "pick", "sort", "fuzzers", "writers", "end-to-end"]
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description="WordsGenerator throughput benchmarks on synthetic data")
+	parser.add_argument("--words-per-length", type=int, default=20000, help="Synthetic words per length. Default: 20000.")
+	parser.add_argument("--maximum-word-length", type=int, default=10, help="Synthetic words are 1 to this many letters. Default: 10.")
+	parser.add_argument("-n", "--letter-number", type=int, default=12, help="Number of letters of the passwords. Default: 12.")
+	parser.add_argument("-m", "--operations", type=int, default=200000, help="Operations (picks, passwords, ...) per benchmark. Default: 200000.")
+	parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best is kept. Default: 3.")
+	parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic data and generators. Default: 1.")
+	parser.add_argument("--only", type=str, action="append", choices=BENCHMARK_NAMES, help="Run only this benchmark. Can be given multiple time.")
+	parser.add_argument("--output-json", type=str, help="Save results (with commit, python and parameters) to this JSON file.")
+	args = parser.parse_args()
+
+	myLogger = SimpleLogger(defaultLevel=SimpleLoggerLevel.ERROR,
+	                        printOnStderrLevel=SimpleLoggerLevel.WARNING,
+	                        throwOnLevel=SimpleLoggerLevel.CRITICAL)
+
+	benchmark = Benchmark(loggerObj=myLogger,
+	                      wordsPerLength=args.words_per_length,
+	                      maximumWordLength=args.maximum_word_length,
+	                      numberOfLetters=args.letter_number,
+	                      numberOfOperations=args.operations,
+	                      repeat=args.repeat,
+	                      seed=args.seed)
+	report = benchmark.run(args.only)
+
+	if (args.output_json is not None):
+		with open(args.output_json, "w") as jsonFile:
+			json.dump(report, jsonFile, indent=1)
@@ -2,64 +2,77 @@
 
 import os
 import sys
+import random
 import argparse
 
 from SimpleLogger import *
+from CommandLineUIBase import *
 from DictionnaryLoader import *
+from DictionnaryFilter import *
 from LettersDistributionFrequency import *
 from FuzzerController import *
 from Writers.DebugWriter import *
 from Writers.SimpleFileWriter import *
+from Writers.BlockFileWriter import *
+from Writers.ShardedFileWriter import *
+from Writers.FixedWidthRecordWriter import *
 from SequenceGenerator import * 
+from GeneratorMetrics import *
+from ProfilerHook import *
+from ParallelSequenceGenerator import *
+from GenerationCheckpoint import *
+from DictionnaryCache import *
+from SequenceEnumerator import *
+from KeyspaceEstimator import *
+from NumpyBatchSampler import *
+from MarkovBatchSampler import *
+from Deduplicators.SetDeduplicator import *
+from Deduplicators.PackedHashDeduplicator import *
+from Deduplicators.BloomFilterDeduplicator import *
+from Deduplicators.WindowDeduplicator import *
 
-class CommandLineUI(object):
+class CommandLineUI(CommandLineUIBase):
+	
+	# --binary-encoding choices and their bytes per character
+	BINARY_ENCODINGS = { "utf-8": 1, "ascii": 1, "latin-1": 1, "utf-16-le": 2, "utf-32-le": 4 }
+	# Recent sequences each worker remembers with --worker-output merge; the
+	# parent does the global deduplication with --dedup-engine
+	WORKER_DEDUP_WINDOW = 10000
 	
 	def __init__(self):
 		self._loggerObj = None
 		self._wordsLoaderObj = None
 		self._letterFreqObj = None
+		self._dictionnaryFilterObj = None
 		self._fuzzerLoaderObj = None
 		self._writerCtrlObj = None
+		self._passCount = None
+		self._profilerObj = None
 	
-	def __createLogger(self, args):
-		logger = SimpleLogger()
-		if (args.verbose == True):
-			logger.setDefaultLevel(SimpleLoggerLevel.INFO)
-		if (not args.logging_levels is None):
-			levels = args.logging_levels.split(',')
-			if (len(levels) < 3):
-				raise Exception("Bad --logging-levels given; format is 'N1,N2,N3' where N1 stdout level, N2 stderr level and N3 exit level.\nGot '" + str(args.logging_levels) + "'")
-			
-			# Assume levels are int, if not try their string
-			try:
-				level = SimpleLoggerLevel(int(levels[0]) )
-			except ValueError as err:
-				level = SimpleLoggerLevel[ str(levels[0]) ]
-			logger.setDefaultLevel( level )
-			
-			try:
-				level = SimpleLoggerLevel(int(levels[1]) )
-			except ValueError as err:
-				level = SimpleLoggerLevel[ str(levels[1]) ]
-			logger.setPrintOnStderrLevel( level )
-			
-			try:
-				level = SimpleLoggerLevel(int(levels[2]))
-			except ValueError as err:
-				level = SimpleLoggerLevel[ str(levels[2]) ]
-			logger.setThrowOnLevel( level )
+	def _createDictionnaryFilter(self, args, logger):
+		maximumLength = args.dictionnary_max_length
+		if (maximumLength is None):
+			# Longer words never fit a words engine password; the Markov
+			# chain still learns from them
+			maximumLength = args.letter_number if (args.engine == "words") else 0
 		
-		return logger
+		if ( (maximumLength == 0) and (args.dictionnary_regex is None) and (args.dictionnary_min_probability <= 0.0) and (args.dictionnary_top_k == 0) and (not args.dictionnary_renormalize) ):
+			return None
+		return DictionnaryFilter(loggerObj=logger, 
+		                         maximumLength=maximumLength, 
+		                         allowedRegex=args.dictionnary_regex, 
+		                         minimumProbability=args.dictionnary_min_probability, 
+		                         topPerLength=args.dictionnary_top_k, 
+		                         renormalize=args.dictionnary_renormalize)
 	
 	
 	def _createDictionnaryLoader(self, args, logger):
-		dictionnaryObj = DictionnaryLoader(loggerObj=logger, allowDuplicatePattern=args.forbid_duplicate)
+		dictionnaryObj = DictionnaryLoader(loggerObj=logger, allowDuplicatePattern=args.forbid_duplicate, compactStorage=args.compact_dictionnary, filterObj=self._dictionnaryFilterObj)
 		
 		if ( (args.words_dictionnary_path is None) or (len(args.words_dictionnary_path) <= 0) ):
 			logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Need at least ONE --words-dictionnary-path argument to load word from. See --help.")
 		else:
-			for dictPath in args.words_dictionnary_path:
-				dictionnaryObj.loadPatternFromCsvPath(dictPath)
+			dictionnaryObj.loadPatternsFromCsvPaths(args.words_dictionnary_path, numberOfWorkers=args.load_workers)
 		
 		return dictionnaryObj
 	
@@ -76,15 +89,39 @@ class CommandLineUI(object):
 		return lettersFrequencyObj
 	
 	
+	def _createLoadersFromCache(self, args, logger):
+		
+		dictionnaryPaths = args.words_dictionnary_path
+		if (dictionnaryPaths is None):
+			dictionnaryPaths = []
+		frequencyPaths = args.letters_by_word_frequency_path
+		if (frequencyPaths is None):
+			frequencyPaths = []
+		
+		cacheObj = DictionnaryCache(loggerObj=logger, cachePath=args.dictionnary_cache)
+		if (cacheObj.isValid(dictionnaryPaths, frequencyPaths, args.forbid_duplicate, self._dictionnaryFilterObj)):
+			dictionnaryObj = DictionnaryLoader(loggerObj=logger, allowDuplicatePattern=args.forbid_duplicate, compactStorage=args.compact_dictionnary, filterObj=self._dictionnaryFilterObj)
+			lettersFrequencyObj = LettersDistributionFrequency(loggerObj=logger, allowDuplicatePattern=args.forbid_duplicate)
+			cacheObj.loadInto(dictionnaryObj, lettersFrequencyObj)
+		else:
+			# Missing or outdated: load sources and (re)build the cache
+			dictionnaryObj = self._createDictionnaryLoader(args, logger)
+			lettersFrequencyObj = self._createLetterFrequencyLoader(args, logger)
+			cacheObj.compile(dictionnaryObj, lettersFrequencyObj, dictionnaryPaths, frequencyPaths)
+		
+		return (dictionnaryObj, lettersFrequencyObj)
+	
+	
 	def _createFuzzer(self, args, logger):
-		fuzzerObj = FuzzerController(loggerObj=self._loggerObj)
+		fuzzerObj = FuzzerController(loggerObj=self._loggerObj, seed=args.seed)
 		
 		return fuzzerObj
 		
 	
-	def _createWriters(self, args, logger):
+	def _createWriters(self, args, logger, workerIndex=None):
+		# workerIndex is given when each worker writes its own shard
 		
-		writerCtrlObj = WriterController(loggerObj=logger)
+		writerCtrlObj = WriterController(loggerObj=logger, asynchronous=args.async_writers, queueSize=args.writer_queue_size)
 		
 		if (args.debug):
 			newWriter = DebugWriter(loggerObj=logger)
@@ -92,12 +129,35 @@ class CommandLineUI(object):
 		
 		if ( (not args.write_output_to is None) and (len(args.write_output_to) > 0) ):
 			for outputPath in args.write_output_to:
-				newWriter = SimpleFileWriter(loggerObj=logger)
-				newWriter.open(filepath=outputPath, overwrite=args.append_to_output)
+				if (workerIndex is not None):
+					outputPath = ParallelSequenceGenerator.getShardPath(outputPath, workerIndex)
+				blockSize = self._parseSizeString(args.write_block_size, "--write-block-size", logger)
+				if ( (args.shard_max_passwords is not None) or (args.shard_max_size is not None) ):
+					newWriter = ShardedFileWriter(loggerObj=logger,
+					                              maximumPasswordsPerShard=(args.shard_max_passwords or 0),
+					                              maximumBytesPerShard=(self._parseSizeString(args.shard_max_size, "--shard-max-size", logger) if (args.shard_max_size is not None) else 0),
+					                              parallelShards=args.shard_parallel,
+					                              blockSize=blockSize,
+					                              useWritev=args.use_writev)
+				else:
+					newWriter = BlockFileWriter(loggerObj=logger, blockSize=blockSize, useWritev=args.use_writev)
+				# When resuming, files are truncated back to their checkpoint offset instead
+				newWriter.open(filepath=outputPath, overwrite=(args.append_to_output and not args.resume))
+				writerCtrlObj.addWriter(newWriter)
+		
+		if ( (not args.write_binary_output_to is None) and (len(args.write_binary_output_to) > 0) ):
+			recordWidth = args.binary_record_width
+			if (recordWidth is None):
+				recordWidth = args.letter_number * self.BINARY_ENCODINGS[args.binary_encoding]
+			for outputPath in args.write_binary_output_to:
+				if (workerIndex is not None):
+					outputPath = ParallelSequenceGenerator.getShardPath(outputPath, workerIndex)
+				newWriter = FixedWidthRecordWriter(loggerObj=logger, recordWidth=recordWidth, encoding=args.binary_encoding, bufferSize=self._parseSizeString(args.write_block_size, "--write-block-size", logger))
+				newWriter.open(filepath=outputPath, overwrite=(args.append_to_output and not args.resume))
 				writerCtrlObj.addWriter(newWriter)
 		
 		if (len(writerCtrlObj.getWriters()) <= 0):
-			logger.printMessage(self, SimpleLoggerLevel.WARNING, "No writer defined; you need either --write-output-to or --debug argument; generated password will NOT be written or shown. See --help.")
+			logger.printMessage(self, SimpleLoggerLevel.WARNING, "No writer defined; you need either --write-output-to, --write-binary-output-to or --debug argument; generated password will NOT be written or shown. See --help.")
 		
 		return writerCtrlObj
 	
@@ -106,7 +166,7 @@ class CommandLineUI(object):
 		passCount = args.password_count
 		if (passCount is None):
 			logger.printMessage(self, SimpleLoggerLevel.WARNING, "No argument --password-count given; password generation will NOT end automatically. See --help.")
-			passCount = sys.maxint
+			passCount = sys.maxsize
 		
 		return passCount
 	
@@ -115,38 +175,192 @@ class CommandLineUI(object):
 		if (maxSize is None):
 			maxSize = sys.maxsize
 		else:
-			# Assume we got byte number first
-			try:
-				maxSize = int(args.maximum_storage_size)
-			# If not, try to parse K/M/G/T given
-			except ValueError as err:
-				# Remove whitespace
-				maxSizeStr = args.maximum_storage_size.strip()
-				# Isolate "unit" (i.e. K/M/G/T)
-				unit = maxSizeStr[-1]
-				# Isolate number (assuming it is a number)
-				try:
-					maxSize = int(maxSizeStr[:-1])
-				except ValueError as err:
-					logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unrecognized --maximum-storage-size '" + str(maxSizeStr) + "'. See --help.")
-				
-				# Multiply number by unit
-				if (unit == "K"):
-					maxSize *= 1024
-				elif (unit == "M"):
-					maxSize *= (1024*1024)
-				elif (unit == "G"):
-					maxSize *= (1024*1024*1024)
-				elif (unit == "T"):
-					maxSize *= (1024*1024*1024*1024)
-				else:
-					logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unrecognized --maximum-storage-size unit '" + str(unit) + "'. See --help.")
+			maxSize = self._parseSizeString(args.maximum_storage_size, "--maximum-storage-size", logger)
 			
 			# Some debug
-			logger.printMessage(self, SimpleLoggerLevel.INFO, "Got --maximum-storage-size '" + str(maxSizeStr) + "'; generating up to " + str(maxSize) + " bytes.")
+			logger.printMessage(self, SimpleLoggerLevel.INFO, "Got --maximum-storage-size '" + str(args.maximum_storage_size) + "'; generating up to " + str(maxSize) + " bytes.")
 			
 		return maxSize
 	
+	def _createDeduplicator(self, args, logger, passCount):
+		
+		if (args.dedup_engine == "packed"):
+			recordWidth = args.dedup_record_width
+			if (recordWidth is None):
+				recordWidth = args.letter_number
+			deduplicatorObj = PackedHashDeduplicator(loggerObj=logger, recordWidth=recordWidth)
+		elif (args.dedup_engine == "bloom"):
+			memoryLimit = None
+			if (args.dedup_memory_limit is not None):
+				memoryLimit = self._parseSizeString(args.dedup_memory_limit, "--dedup-memory-limit", logger)
+			if ( (passCount == sys.maxsize) and (memoryLimit is None) ):
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--dedup-engine bloom needs --password-count and/or --dedup-memory-limit to size the filter. See --help.")
+			deduplicatorObj = BloomFilterDeduplicator(loggerObj=logger, 
+			                                          expectedNumberOfSequences=passCount, 
+			                                          falsePositiveRate=args.dedup_false_positive_rate, 
+			                                          maximumMemoryBytes=memoryLimit)
+		else:
+			deduplicatorObj = SetDeduplicator(loggerObj=logger)
+		
+		return deduplicatorObj
+	
+	
+	def _createRandom(self, seed, componentName):
+		# Per-component random generator; no seed means system entropy
+		randomObj = random.Random()
+		if (seed is not None):
+			randomObj.seed(str(seed) + ":" + componentName)
+		return randomObj
+	
+	
+	def _createBatchSampler(self, args, logger, seed):
+		if (args.engine == "markov"):
+			if (args.sampling_backend != "python"):
+				logger.printMessage(self, SimpleLoggerLevel.WARNING, "--sampling-backend is not used by --engine markov.")
+			return MarkovBatchSampler(loggerObj=logger,
+			                          dictionnaryLoaderObj=self._wordsLoaderObj,
+			                          numberOfLetters=args.letter_number,
+			                          order=args.markov_order,
+			                          seed=seed)
+		if (args.sampling_backend != "numpy"):
+			return None
+		if (not NumpyBatchSampler.isAvailable()):
+			logger.printMessage(self, SimpleLoggerLevel.WARNING, "--sampling-backend numpy requested but numpy is not installed; using the python backend.")
+			return None
+		
+		return NumpyBatchSampler(loggerObj=logger,
+		                         dictionnaryLoaderObj=self._wordsLoaderObj,
+		                         lettersDistributionFrequencyObj=self._letterFreqObj,
+		                         numberOfLetters=args.letter_number,
+		                         seed=seed)
+	
+	
+	def _createProfiler(self, args, logger):
+		if (args.profile is None):
+			if (args.profile_duration > 0.0):
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--profile-duration needs --profile. See --help.")
+			return None
+		if ( (args.profile_duration > 0.0) and ( (args.enumerate) or (args.estimate) or (args.workers > 1) ) ):
+			logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--profile-duration is not supported with --enumerate, --estimate nor --workers; use -m to bound the run. See --help.")
+		if (args.workers > 1):
+			logger.printMessage(self, SimpleLoggerLevel.WARNING, "--profile only profiles this process, not the --workers processes.")
+		return ProfilerHook(loggerObj=logger, outputPath=args.profile, maximumDuration=args.profile_duration, topFunctions=args.profile_top)
+	
+	
+	def _createMetrics(self, args, logger):
+		# No metrics object at all when not asked for: the generator skips every measure
+		if ( (args.progress_interval <= 0.0) and (args.stats_output is None) ):
+			return None
+		return GeneratorMetrics(loggerObj=logger, progressInterval=max(0.0, args.progress_interval), statsOutputPath=args.stats_output)
+	
+	
+	def _createCheckpoint(self, args, logger):
+		if (args.checkpoint_path is None):
+			if (args.resume):
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--resume needs --checkpoint-path. See --help.")
+			return None
+		
+		# Such outputs can't be truncated back to a checkpoint offset: fail
+		# now rather than when resuming
+		if ( (args.shard_max_passwords is not None) or (args.shard_max_size is not None) ):
+			logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--checkpoint-path does not support --shard-max-passwords nor --shard-max-size. See --help.")
+		for outputPath in (args.write_output_to or []):
+			if (os.path.splitext(outputPath)[1].lower() in BlockFileWriter.COMPRESSIONS):
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "--checkpoint-path does not support compressed output '" + str(outputPath) + "'. See --help.")
+		
+		if (args.seed is None):
+			logger.printMessage(self, SimpleLoggerLevel.WARNING, "Checkpoints without --seed: resumed run will not match an uninterrupted one.")
+		
+		# Resuming with different values would silently produce something else
+		runParameters = {
+			"letter_number"  : args.letter_number,
+			"seed"           : args.seed,
+			"dedup_engine"   : args.dedup_engine,
+			"engine"         : args.engine,
+			"markov_order"   : args.markov_order,
+			"dictionnary_filter": (self._dictionnaryFilterObj.describe() if (self._dictionnaryFilterObj is not None) else None),
+			"write_output_to": args.write_output_to,
+		}
+		return GenerationCheckpoint(loggerObj=logger, 
+		                            checkpointPath=args.checkpoint_path, 
+		                            intervalSeconds=args.checkpoint_interval, 
+		                            runParameters=runParameters)
+	
+	
+	def _createEnumerator(self, args, lettersNumber, passCount, storageSizeLimit):
+		
+		if ( (args.workers > 1) or (args.checkpoint_path is not None) ):
+			self._loggerObj.printMessage(self, SimpleLoggerLevel.CRITICAL, "--enumerate does not support --workers nor --checkpoint-path. See --help.")
+		
+		self._writerCtrlObj = self._createWriters(args, self._loggerObj)
+		
+		enumerator = SequenceEnumerator(loggerObj=self._loggerObj,
+		                                dictionnaryLoaderObj=self._wordsLoaderObj,
+		                                writerObj=self._writerCtrlObj,
+		                                numberOfLetters=lettersNumber,
+		                                lettersDistributionFrequencyObj=self._letterFreqObj,
+		                                maximumNumberOfSequences=passCount,
+		                                maximumBytesSizeForAllSequences=storageSizeLimit)
+		return enumerator
+	
+	
+	def _createParallelGenerator(self, args, lettersNumber, passCount, storageSizeLimit):
+		
+		# Build the word samplers once, before forking, so workers share them
+		self._wordsLoaderObj.freezeSamplers()
+		batchSamplerObj = self._createBatchSampler(args, self._loggerObj, None)
+		
+		def createWorkerGenerator(workerIndex, writerObj, maxSequences, maxBytes, stopEventObj):
+			# Called in the worker process
+			# Merge mode: only a small local window, so that memory is not
+			# paid once per worker on top of the parent global deduplicator
+			if (args.worker_output == ParallelSequenceGenerator.OUTPUT_MERGE):
+				workerDeduplicatorObj = WindowDeduplicator(loggerObj=self._loggerObj, windowSize=self.WORKER_DEDUP_WINDOW)
+			else:
+				workerDeduplicatorObj = self._createDeduplicator(args, self._loggerObj, maxSequences)
+			# Every worker needs its own random streams (fuzzers were seeded before fork)
+			workerSeed = None
+			if (args.seed is not None):
+				workerSeed = str(args.seed) + ":worker" + str(workerIndex)
+			self._fuzzerLoaderObj.setSeed(workerSeed)
+			if (batchSamplerObj is not None):
+				batchSamplerObj.setSeed(workerSeed)
+			return SequenceGenerator(loggerObj=self._loggerObj, 
+			                         dictionnaryLoaderObj=self._wordsLoaderObj,
+			                         fuzzerObj=self._fuzzerLoaderObj,
+			                         writerObj=writerObj,
+			                         numberOfLetters=lettersNumber,
+			                         lettersDistributionFrequencyObj=self._letterFreqObj,
+			                         maximumNumberOfSequences=maxSequences,
+			                         maximumBytesSizeForAllSequences=maxBytes,
+			                         deduplicatorObj=workerDeduplicatorObj,
+			                         stopEventObj=stopEventObj,
+			                         randomObj=self._createRandom(workerSeed, "SequenceGenerator"),
+			                         batchSamplerObj=batchSamplerObj,
+			                         batchSize=args.batch_size)
+		
+		def createWorkerWriters(workerIndex):
+			# Called in the worker process (shard mode)
+			return self._createWriters(args, self._loggerObj, workerIndex)
+		
+		if (args.worker_output == ParallelSequenceGenerator.OUTPUT_MERGE):
+			self._writerCtrlObj = self._createWriters(args, self._loggerObj)
+			deduplicatorObj = self._createDeduplicator(args, self._loggerObj, passCount)
+		else:
+			self._writerCtrlObj = None
+			deduplicatorObj = None
+		
+		generator = ParallelSequenceGenerator(loggerObj=self._loggerObj,
+		                                      generatorFactory=createWorkerGenerator,
+		                                      numberOfWorkers=args.workers,
+		                                      outputMode=args.worker_output,
+		                                      writerObj=self._writerCtrlObj,
+		                                      writerFactory=createWorkerWriters,
+		                                      deduplicatorObj=deduplicatorObj,
+		                                      maximumNumberOfSequences=passCount,
+		                                      maximumBytesSizeForAllSequences=storageSizeLimit)
+		return generator
+	
 	
 	def __parseArguments(self):
 		
@@ -157,34 +371,109 @@ class CommandLineUI(object):
 		parser.add_argument("-d", "--debug", action="store_true", help="Debug mode; all messages printed on stdout, generated passwords are printed on screen as well.")
 		parser.add_argument("-n", "--letter-number", type=int, help="Number of letters for the passwords to generate.", required=True)
 		parser.add_argument("-m", "--password-count", type=int, help="Number of passwords that are going to be generated. Default: no limit.")
-		parser.add_argument("-s", "--maximum-storage-size", type=str, help="Maximum storage size the password can use. Support K, M, G, T format (ex: 1G = 1073741824 bytes). Default: no limit.")
+		parser.add_argument("-s", "--maximum-storage-size", type=str, help="Maximum storage size each output can use, as really written (encoding, separators, compression). Support K, M, G, T format (ex: 1G = 1073741824 bytes). Default: no limit.")
 		parser.add_argument("-w", "--words-dictionnary-path", type=str, action="append", help="Load words from dictionnary at given path (see Format). Can be given multiple time to load multiple files.")
 		parser.add_argument("-f", "--letters-by-word-frequency-path", type=str, action="append", help="Load number of letter in a word frequency from path (see Format). Can be given multiple time to load multiple files.")
-		parser.add_argument("-o", "--write-output-to", type=str, action="append", help="Write output to given path. Can be given multiple time to write to multiple path at once.")
+		parser.add_argument("-o", "--write-output-to", type=str, action="append", help="Write output to given path; compressed on the fly when path ends with .gz, .bz2, .xz or .lzma. Can be given multiple time to write to multiple path at once.")
 		
+		parser.add_argument("--log-buffer-size", type=int, default=0, help="Write stdout messages by groups of given lines instead of one by one (errors on stderr are never delayed). Default: 0 (no buffering).")
 		parser.add_argument("--logging-levels", type=str, help="Use given logging level instead of default ones. Format is 'N1,N2,N3' where N1 stdout level, N2 stderr level and N3 exit level (Ex:'2,3,4' or 'WARNING,ERROR,CRITICAL')")
 		parser.add_argument("--forbid-duplicate", action="store_false", help="Forbid duplicate words when loading dictionnaries and/or letters frequency; raise error if a word is present in more than one dictionnary at a time.")
 		parser.add_argument("--append-to-output", action="store_false", help="Append to output file(s) instead of starting anew.")
+		parser.add_argument("--write-block-size", type=str, default="1M", help="Bytes buffered before each write to --write-output-to files. Support K, M, G, T format. Default: 1M.")
+		parser.add_argument("--use-writev", action="store_true", help="Write buffered batches with os.writev() (uncompressed outputs only).")
+		parser.add_argument("--write-binary-output-to", type=str, action="append", help="Write output to given path as fixed width binary records (see Writers/FixedWidthRecordWriter.py). Can be given multiple time.")
+		parser.add_argument("--binary-encoding", type=str, choices=sorted(self.BINARY_ENCODINGS.keys()), default="utf-8", help="Encoding of --write-binary-output-to records. Default: utf-8.")
+		parser.add_argument("--binary-record-width", type=int, help="Bytes per --write-binary-output-to record; longer passwords are not written. Default: --letter-number characters of --binary-encoding (1 byte each for utf-8).")
+		parser.add_argument("--shard-max-passwords", type=int, help="Split each --write-output-to file in numbered shards ('out.00001.txt', ...) of at most this many passwords, listed in 'out.manifest.json'.")
+		parser.add_argument("--shard-max-size", type=str, help="Split each --write-output-to file in numbered shards of at most this size (uncompressed). Support K, M, G, T format.")
+		parser.add_argument("--shard-parallel", type=int, default=1, help="Number of shards written at the same time with --shard-max-passwords/--shard-max-size. Default: 1.")
+		parser.add_argument("--async-writers", action="store_true", help="Run each writer in its own thread, so generation goes on while batches are written.")
+		parser.add_argument("--writer-queue-size", type=int, default=16, help="Batches queued per writer with --async-writers before generation waits for it. Default: 16.")
+		parser.add_argument("--dedup-engine", type=str, choices=["set", "packed", "bloom"], default="set", help="Engine used to reject duplicated passwords: 'set' (exact, most memory), 'packed' (exact, fixed-width byte-packed hash table) or 'bloom' (probabilistic, fixed memory). Default: set.")
+		parser.add_argument("--dedup-record-width", type=int, help="Bytes per record for --dedup-engine packed; longer passwords are kept in an overflow set. Default: --letter-number.")
+		parser.add_argument("--dedup-false-positive-rate", type=float, default=0.001, help="Target false positive rate for --dedup-engine bloom (a false positive drops a never-seen password). Default: 0.001.")
+		parser.add_argument("--dedup-memory-limit", type=str, help="Maximum memory for --dedup-engine bloom. Support K, M, G, T format. Default: sized from --password-count.")
+		parser.add_argument("--load-workers", type=int, default=1, help="Number of processes parsing --words-dictionnary-path files (by chunks of 1 MB) in parallel. Default: 1.")
+		parser.add_argument("--compact-dictionnary", action="store_true", help="Store loaded dictionnaries in flat buffers instead of Python dicts: several times less memory, slightly slower picks. Same passwords for the same seed.")
+		parser.add_argument("--dictionnary-max-length", type=int, help="Drop words longer than this while loading --words-dictionnary-path files; 0 keeps every length. Default: --letter-number with --engine words, 0 with --engine markov.")
+		parser.add_argument("--dictionnary-regex", type=str, help="Only load words fully matching this regular expression (ex: '[a-z]+').")
+		parser.add_argument("--dictionnary-min-probability", type=float, default=0.0, help="Drop words less probable than this while loading. Default: 0.0 (keep all).")
+		parser.add_argument("--dictionnary-top-k", type=int, default=0, help="Only keep the given number of most probable words of each length. Default: 0 (keep all).")
+		parser.add_argument("--dictionnary-renormalize", action="store_true", help="Scale the kept words probabilities so each length sums to 1.0.")
+		parser.add_argument("--dictionnary-cache", type=str, help="Binary cache of the loaded --words-dictionnary-path and --letters-by-word-frequency-path files; built on first use, rebuilt when a source file changes, and loaded instead of parsing the CSV files otherwise.")
+		parser.add_argument("--enumerate", action="store_true", help="Instead of random sampling, enumerate every password once, most probable first (fuzzers are not applied).")
+		parser.add_argument("--estimate", action="store_true", help="Do not generate anything; print the keyspace size, the probability mass of the most probable passwords and the expected duplicate rate for --password-count samples.")
+		parser.add_argument("--estimate-top-k", type=int, default=10000, help="Number of most probable passwords enumerated exactly by --estimate. Default: 10000.")
+		parser.add_argument("--sampling-backend", type=str, choices=["python", "numpy"], default="python", help="'numpy' draws whole batches of passwords at once (faster; new word and between words fuzzers are not applied); falls back to 'python' when numpy is not installed. Default: python.")
+		parser.add_argument("--batch-size", type=int, default=10000, help="Passwords drawn per batch with --sampling-backend numpy or --engine markov. Default: 10000.")
+		parser.add_argument("--engine", type=str, choices=["words", "markov"], default="words", help="'words' concatenates dictionnary words picked by length; 'markov' builds passwords character by character from a Markov chain trained on the dictionnary (new word and between words fuzzers are not applied). Default: words.")
+		parser.add_argument("--markov-order", type=int, default=3, help="Number of previous characters the next one depends on with --engine markov. Default: 3.")
+		parser.add_argument("--seed", type=str, help="Seed for every random generator (generator and fuzzers); the same seed and arguments give the same passwords. Default: random.")
+		parser.add_argument("--checkpoint-path", type=str, help="Periodically save the generation state to this path so the run can be resumed with --resume. Not supported with sharded or compressed outputs.")
+		parser.add_argument("--checkpoint-interval", type=float, default=60.0, help="Seconds between two checkpoints. Default: 60.")
+		parser.add_argument("--resume", action="store_true", help="Resume an interrupted run from --checkpoint-path; output files are truncated back to the checkpoint and appended to.")
+		parser.add_argument("--progress-interval", type=float, default=0.0, help="Print a progress line (rate, duplicates, ETA) on stderr every given seconds. Default: 0 (never).")
+		parser.add_argument("--stats-output", type=str, help="Save generation statistics (counters, time spent picking, fuzzing and writing) as JSON to this path at the end.")
+		parser.add_argument("--profile", type=str, help="Run the generation under cProfile; save the profile to this path (.pstats) and a summary of the hottest functions and fuzzer plugins to <path>.txt.")
+		parser.add_argument("--profile-duration", type=float, default=0.0, help="With --profile, stop the generation after the given seconds. Default: 0 (no limit; use -m to bound the run instead).")
+		parser.add_argument("--profile-top", type=int, default=25, help="Number of functions listed in the --profile summary. Default: 25.")
+		parser.add_argument("--workers", type=int, default=1, help="Number of generator processes to run in parallel. Default: 1.")
+		parser.add_argument("--worker-output", type=str, choices=[ParallelSequenceGenerator.OUTPUT_MERGE, ParallelSequenceGenerator.OUTPUT_SHARD], default=ParallelSequenceGenerator.OUTPUT_MERGE, help="With --workers: 'merge' sends every password to this process that removes duplicates and writes them to --write-output-to; 'shard' makes each worker write its own file (ex: out.w01.txt), without removing duplicates across files. Default: merge.")
 		
 		args = parser.parse_args()
 		
 		# Create logger first as everyone need it
-		self._loggerObj = self.__createLogger(args)
-		# Create dictionnary object
-		self._wordsLoaderObj = self._createDictionnaryLoader(args, self._loggerObj)
-		# Create letter frequency loader
-		self._letterFreqObj = self._createLetterFrequencyLoader(args, self._loggerObj)
+		self._loggerObj = self._createLogger(args, bufferSize=args.log_buffer_size)
+		# Load time filter of the dictionnaries (if any)
+		self._dictionnaryFilterObj = self._createDictionnaryFilter(args, self._loggerObj)
+		if (args.dictionnary_cache is not None):
+			# Create dictionnary and letter frequency from the compiled cache (if up to date)
+			(self._wordsLoaderObj, self._letterFreqObj) = self._createLoadersFromCache(args, self._loggerObj)
+		else:
+			# Create dictionnary object
+			self._wordsLoaderObj = self._createDictionnaryLoader(args, self._loggerObj)
+			# Create letter frequency loader
+			self._letterFreqObj = self._createLetterFrequencyLoader(args, self._loggerObj)
 		# Create fuzzers loader
 		self._fuzzerLoaderObj = self._createFuzzer(args, self._loggerObj)
-		# Create writer controller
-		self._writerCtrlObj = self._createWriters(args, self._loggerObj)
 		
 		# Letter number is given straight
 		lettersNumber = args.letter_number
 		# Number of password to generate (if any)
 		passCount = self._parsePasswordCount(args, self._loggerObj)
+		self._passCount = passCount
 		# Storage size limit (if any)
 		storageSizeLimit = self._parseSizeLimit(args, self._loggerObj)
+		# Profiler (if any)
+		self._profilerObj = self._createProfiler(args, self._loggerObj)
+		
+		if ( (args.engine != "words") and ( (args.enumerate) or (args.estimate) ) ):
+			self._loggerObj.printMessage(self, SimpleLoggerLevel.CRITICAL, "--enumerate and --estimate only support --engine words. See --help.")
+		
+		if (args.estimate):
+			return KeyspaceEstimator(loggerObj=self._loggerObj,
+			                         dictionnaryLoaderObj=self._wordsLoaderObj,
+			                         fuzzerObj=self._fuzzerLoaderObj,
+			                         numberOfLetters=lettersNumber,
+			                         lettersDistributionFrequencyObj=self._letterFreqObj,
+			                         topCandidates=args.estimate_top_k)
+		
+		if (args.enumerate):
+			return self._createEnumerator(args, lettersNumber, passCount, storageSizeLimit)
+		
+		if (args.workers > 1):
+			if (args.checkpoint_path is not None):
+				self._loggerObj.printMessage(self, SimpleLoggerLevel.CRITICAL, "--checkpoint-path is not supported with --workers. See --help.")
+			return self._createParallelGenerator(args, lettersNumber, passCount, storageSizeLimit)
+		
+		# Checkpoint (if any)
+		checkpointObj = self._createCheckpoint(args, self._loggerObj)
+		
+		# Create writer controller
+		self._writerCtrlObj = self._createWriters(args, self._loggerObj)
+		# Duplicate rejection engine
+		deduplicatorObj = self._createDeduplicator(args, self._loggerObj, passCount)
 		
 		# This (finally) create our generator
 		generator = SequenceGenerator(loggerObj=self._loggerObj, 
@@ -194,16 +483,36 @@ class CommandLineUI(object):
 		                        	numberOfLetters=lettersNumber,
 		                        	lettersDistributionFrequencyObj=self._letterFreqObj,
 		                        	maximumNumberOfSequences=passCount,
-		                        	maximumBytesSizeForAllSequences=storageSizeLimit)
+		                        	maximumBytesSizeForAllSequences=storageSizeLimit,
+		                        	deduplicatorObj=deduplicatorObj,
+		                        	randomObj=self._createRandom(args.seed, "SequenceGenerator"),
+		                        	checkpointObj=checkpointObj,
+		                        	batchSamplerObj=self._createBatchSampler(args, self._loggerObj, args.seed),
+		                        	batchSize=args.batch_size,
+		                        	metricsObj=self._createMetrics(args, self._loggerObj),
+		                        	stopEventObj=(self._profilerObj.getStopEvent() if (self._profilerObj is not None) else None))
+		
+		if (args.resume):
+			generator.restoreState(checkpointObj.load())
 		
 		return generator
 	
 	
 	
 	
+	def _runGenerator(self, generator):
+		if (isinstance(generator, KeyspaceEstimator)):
+			generator.printEstimate(self._passCount)
+		else:
+			generator.generateSequences()
+	
+	
 	def run(self):
 		generator = self.__parseArguments()
-		generator.generateSequences()
+		if (self._profilerObj is not None):
+			self._profilerObj.run(self._runGenerator, generator)
+		else:
+			self._runGenerator(generator)
 	
 	
 
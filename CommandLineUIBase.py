@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.6
+
+from SimpleLogger import *
+
+class CommandLineUIBase(object):
+
+	# Argument handling shared by the command line front ends
+	# (CommandLineUI, SortUniqueUI)
+
+	def _createLogger(self, args, bufferSize=0):
+		logger = SimpleLogger(bufferSize=bufferSize)
+		if (args.verbose == True):
+			logger.setDefaultLevel(SimpleLoggerLevel.INFO)
+		if (not args.logging_levels is None):
+			levels = args.logging_levels.split(',')
+			if (len(levels) < 3):
+				raise Exception("Bad --logging-levels given; format is 'N1,N2,N3' where N1 stdout level, N2 stderr level and N3 exit level.\nGot '" + str(args.logging_levels) + "'")
+
+			# Assume levels are int, if not try their string
+			try:
+				level = SimpleLoggerLevel(int(levels[0]) )
+			except ValueError as err:
+				level = SimpleLoggerLevel[ str(levels[0]) ]
+			logger.setDefaultLevel( level )
+
+			try:
+				level = SimpleLoggerLevel(int(levels[1]) )
+			except ValueError as err:
+				level = SimpleLoggerLevel[ str(levels[1]) ]
+			logger.setPrintOnStderrLevel( level )
+
+			try:
+				level = SimpleLoggerLevel(int(levels[2]))
+			except ValueError as err:
+				level = SimpleLoggerLevel[ str(levels[2]) ]
+			logger.setThrowOnLevel( level )
+
+		return logger
+
+
+	def _parseSizeString(self, sizeStr, argName, logger):
+		# Assume we got byte number first
+		try:
+			size = int(sizeStr)
+		# If not, try to parse K/M/G/T given
+		except ValueError as err:
+			# Remove whitespace
+			sizeStr = sizeStr.strip()
+			# Isolate "unit" (i.e. K/M/G/T)
+			unit = sizeStr[-1]
+			# Isolate number (assuming it is a number)
+			try:
+				size = int(sizeStr[:-1])
+			except ValueError as err:
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unrecognized " + argName + " '" + str(sizeStr) + "'. See --help.")
+
+			# Multiply number by unit
+			if (unit == "K"):
+				size *= 1024
+			elif (unit == "M"):
+				size *= (1024*1024)
+			elif (unit == "G"):
+				size *= (1024*1024*1024)
+			elif (unit == "T"):
+				size *= (1024*1024*1024*1024)
+			else:
+				logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unrecognized " + argName + " unit '" + str(unit) + "'. See --help.")
+
+		return size
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3.6
+
+import array
+import collections.abc
+
+class CompactPatternStore(collections.abc.Mapping):
+
+	# Read-only pattern -> probability mapping of one length bucket, stored
+	# in a few flat buffers instead of one str and one float object per
+	# pattern (about 20 bytes per pattern instead of 100+):
+	#	_blob    : bytes, every encoded pattern one after the other
+	#	           (with _encoding, UTF-8 by default)
+	#	_offsets : array('I'), pattern i is _blob[_offsets[i]:_offsets[i+1]]
+	#	_weights : array('d'), probability of pattern i
+	#	_order   : array('I'), pattern indexes sorted by encoded bytes
+	#
+	# Patterns keep their insertion order, so samplers built on a store pick
+	# the same patterns as samplers built on the equivalent dict. Lookups
+	# (in, [], get) are a binary search over _order.
+	__slots__ = ("_blob", "_offsets", "_weights", "_order", "_encoding")
+
+	def __init__(self, patterns, weights, encoding="utf-8"):
+		self._encoding = encoding
+		encodedPatterns = [ pattern.encode(encoding) for pattern in patterns ]
+		self._blob = b"".join(encodedPatterns)
+		self._offsets = array.array("I", [0])
+		position = 0
+		for encoded in encodedPatterns:
+			position += len(encoded)
+			self._offsets.append(position)
+		self._weights = array.array("d", weights)
+		if (len(self._weights) != len(encodedPatterns)):
+			raise Exception("CompactPatternStore: patterns and weights must have the same size!")
+		self._order = array.array("I", sorted(range(len(encodedPatterns)), key=encodedPatterns.__getitem__))
+
+
+	@classmethod
+	def fromBuffers(cls, blob, offsets, weights, encoding="utf-8"):
+		# Build from buffers already in the store layout (ex: a memory
+		# mapped dictionnary cache); they are copied, not decoded
+		store = cls.__new__(cls)
+		store._encoding = encoding
+		store._blob = bytes(blob)
+		store._offsets = array.array("I", offsets)
+		store._weights = array.array("d", weights)
+		if (len(store._offsets) != len(store._weights) + 1):
+			raise Exception("CompactPatternStore: offsets must have one more entry than weights!")
+		store._order = array.array("I", sorted(range(len(store._weights)), key=store.getEncodedPattern))
+		return store
+
+
+	@classmethod
+	def fromDict(cls, patternDict):
+		if (isinstance(patternDict, cls)):
+			return patternDict
+		return cls(patternDict.keys(), patternDict.values())
+
+
+	def getMemoryUsage(self):
+		return len(self._blob) + sum( (len(buffer) * buffer.itemsize) for buffer in (self._offsets, self._weights, self._order) )
+
+
+	# Index based access (samplers)
+
+	def getEncodedPattern(self, index):
+		return self._blob[self._offsets[index]:self._offsets[index+1]]
+
+
+	def getPattern(self, index):
+		return self._blob[self._offsets[index]:self._offsets[index+1]].decode(self._encoding)
+
+
+	def getWeight(self, index):
+		return self._weights[index]
+
+
+	def getWeights(self):
+		return self._weights
+
+
+	def getPatterns(self):
+		# Sequence view of the patterns, in insertion order
+		return CompactPatternList(self)
+
+
+	def indexOf(self, pattern):
+		# Index of pattern, or -1
+		encoded = pattern.encode(self._encoding)
+		(lo, hi) = (0, len(self._order))
+		while (lo < hi):
+			middle = (lo + hi) // 2
+			candidate = self.getEncodedPattern(self._order[middle])
+			if (candidate < encoded):
+				lo = middle + 1
+			else:
+				hi = middle
+		if ( (lo < len(self._order)) and (self.getEncodedPattern(self._order[lo]) == encoded) ):
+			return self._order[lo]
+		return -1
+
+
+	# Mapping interface (same use as the pattern dicts)
+
+	def __len__(self):
+		return len(self._weights)
+
+
+	def __iter__(self):
+		for index in range(len(self._weights)):
+			yield self.getPattern(index)
+
+
+	def __getitem__(self, pattern):
+		index = self.indexOf(pattern)
+		if (index < 0):
+			raise KeyError(pattern)
+		return self._weights[index]
+
+
+	def __contains__(self, pattern):
+		return (isinstance(pattern, str) and (self.indexOf(pattern) >= 0))
+
+
+	def values(self):
+		return self._weights
+
+
+	def items(self):
+		# Walk the buffers once instead of one lookup per pattern
+		return zip(self, self._weights)
+
+
+
+class CompactPatternList(collections.abc.Sequence):
+
+	# Patterns of a CompactPatternStore by index, decoded on access;
+	# WeightedSampler keeps such a sequence instead of copying it
+	__slots__ = ("_store",)
+
+	def __init__(self, store):
+		self._store = store
+
+
+	def __len__(self):
+		return len(self._store)
+
+
+	def __getitem__(self, index):
+		if (isinstance(index, slice)):
+			return [ self._store.getPattern(i) for i in range(*index.indices(len(self._store))) ]
+		if (index < 0):
+			index += len(self._store)
+		if ( (index < 0) or (index >= len(self._store)) ):
+			raise IndexError("pattern index out of range")
+		return self._store.getPattern(index)
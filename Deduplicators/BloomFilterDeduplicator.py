@@ -0,0 +1,99 @@
+#!/usr/bin/env python3.6
+
+import sys
+import math
+import hashlib
+
+from Deduplicators.DeduplicatorInterface import *
+
+class BloomFilterDeduplicator(DeduplicatorInterface):
+	
+	# Probabilistic deduplication using a Bloom filter
+	# Memory is fixed at creation; a never-seen sequence may be reported as
+	# duplicate (false positive), it is then simply NOT generated.
+	# A duplicated sequence is never reported as new.
+	def __init__(self, loggerObj, expectedNumberOfSequences, falsePositiveRate=0.001, maximumMemoryBytes=None):
+		super().__init__(loggerObj)
+		
+		if ( (not isinstance(expectedNumberOfSequences, int)) or (expectedNumberOfSequences < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "expectedNumberOfSequences must be an integer greater or equal to 1")
+		if ( (falsePositiveRate <= 0.0) or (falsePositiveRate >= 1.0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "falsePositiveRate must be between 0.0 and 1.0 exclusive (got " + str(falsePositiveRate) + ")")
+		
+		# Optimal number of bits:  m = -n * ln(p) / ln(2)^2
+		nbBits = int(math.ceil(-expectedNumberOfSequences * math.log(falsePositiveRate) / (math.log(2) ** 2)))
+		if ( (maximumMemoryBytes is not None) and (nbBits > (maximumMemoryBytes * 8)) ):
+			nbBits = maximumMemoryBytes * 8
+			if (expectedNumberOfSequences == sys.maxsize):
+				# No count given (endless generation): size for what the capped
+				# filter holds at the requested rate, n = -m * ln(2)^2 / ln(p)
+				expectedNumberOfSequences = max(1, int(-nbBits * (math.log(2) ** 2) / math.log(falsePositiveRate)))
+				self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Bloom filter capped to " + str(maximumMemoryBytes) + " bytes; false positive rate will be higher than requested after " + str(expectedNumberOfSequences) + " sequences")
+			else:
+				self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Bloom filter capped to " + str(maximumMemoryBytes) + " bytes; false positive rate will be higher than requested")
+		nbBits = max(nbBits, 8)
+		
+		# Optimal number of hashes: k = m/n * ln(2)
+		self._nbHashes = max(1, int(round((nbBits / expectedNumberOfSequences) * math.log(2))))
+		self._nbBits = nbBits
+		self._bits = bytearray((nbBits + 7) // 8)
+		self._expectedCount = expectedNumberOfSequences
+		self._count = 0
+		
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Bloom filter: " + str(len(self._bits)) + " bytes, " + str(self._nbHashes) + " hashes, expected false positive rate " + str(self.getFalsePositiveRate(expectedNumberOfSequences)) + " for " + str(expectedNumberOfSequences) + " sequences")
+	
+	
+	def getFalsePositiveRate(self, nbSequences=None):
+		# p = (1 - e^(-k*n/m))^k
+		if (nbSequences is None):
+			nbSequences = self._count
+		return (1.0 - math.exp(-self._nbHashes * nbSequences / self._nbBits)) ** self._nbHashes
+	
+	
+	def _bitPositions(self, sequence):
+		# Double hashing (Kirsch-Mitzenmacher): h1 + i*h2
+		digest = hashlib.blake2b(sequence.encode("utf-8"), digest_size=16).digest()
+		h1 = int.from_bytes(digest[:8], "little")
+		h2 = int.from_bytes(digest[8:], "little") | 1
+		nbBits = self._nbBits
+		return [ ((h1 + i * h2) % nbBits) for i in range(self._nbHashes) ]
+	
+	
+	def add(self, sequence):
+		bits = self._bits
+		isNew = False
+		for position in self._bitPositions(sequence):
+			mask = 1 << (position & 7)
+			if (not (bits[position >> 3] & mask)):
+				bits[position >> 3] |= mask
+				isNew = True
+		if (isNew):
+			self._count += 1
+		return isNew
+	
+	
+	def __contains__(self, sequence):
+		bits = self._bits
+		for position in self._bitPositions(sequence):
+			if (not (bits[position >> 3] & (1 << (position & 7)))):
+				return False
+		return True
+	
+	
+	def getCount(self):
+		return self._count
+	
+	
+	def getMemoryUsage(self):
+		return sys.getsizeof(self._bits)
+
+	
+	def getState(self):
+		return { "nbBits": self._nbBits, "nbHashes": self._nbHashes, "bits": bytes(self._bits), "count": self._count }
+	
+	def setState(self, state):
+		# Hashes are stable (blake2b), bits can be restored as is
+		self._nbBits = state["nbBits"]
+		self._nbHashes = state["nbHashes"]
+		self._bits = bytearray(state["bits"])
+		self._count = state["count"]
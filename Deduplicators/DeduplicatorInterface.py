@@ -0,0 +1,34 @@
+#!/usr/bin/env python3.6
+
+from SimpleLogger import *
+
+class DeduplicatorInterface(object):
+	
+	def __init__(self, loggerObj):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+	
+	# Add sequence; return True if it was NOT seen before, False otherwise
+	def add(self, sequence):
+		raise Exception("Method must be implemented by child class")
+	
+	def __contains__(self, sequence):
+		raise Exception("Method must be implemented by child class")
+	
+	# Number of sequences added so far
+	def getCount(self):
+		raise Exception("Method must be implemented by child class")
+	
+	# Memory used by the deduplication structure, in bytes
+	def getMemoryUsage(self):
+		raise Exception("Method must be implemented by child class")
+
+	
+	# Picklable snapshot of the deduplication content (used by checkpoints)
+	def getState(self):
+		raise Exception("Method must be implemented by child class")
+	
+	# Restore content from a getState() snapshot
+	def setState(self, state):
+		raise Exception("Method must be implemented by child class")
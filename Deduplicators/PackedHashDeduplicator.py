@@ -0,0 +1,133 @@
+#!/usr/bin/env python3.6
+
+import sys
+
+from Deduplicators.DeduplicatorInterface import *
+
+class PackedHashDeduplicator(DeduplicatorInterface):
+	
+	# Exact deduplication using an open addressing hash table
+	# packed in a single bytearray.
+	# Every slot is recordWidth+1 bytes:
+	#	byte 0     : 0 if slot is free, else encoded length + 1
+	#	byte 1..N  : encoded sequence, zero padded
+	# As numberOfLetters is fixed for a run, recordWidth is usually
+	# numberOfLetters (one byte per char when sequences are ASCII).
+	# Sequences that do not fit (ex: multi-bytes UTF-8) go to an overflow set.
+	def __init__(self, loggerObj, recordWidth, initialCapacity=1024, maximumLoadFactor=0.7, encoding="utf-8"):
+		super().__init__(loggerObj)
+		
+		if ( (not isinstance(recordWidth, int)) or (recordWidth < 1) or (recordWidth > 254) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "recordWidth must be an integer between 1 and 254 (got " + str(recordWidth) + ")")
+		if ( (maximumLoadFactor <= 0.0) or (maximumLoadFactor >= 1.0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumLoadFactor must be between 0.0 and 1.0 exclusive (got " + str(maximumLoadFactor) + ")")
+		
+		self._recordWidth = recordWidth
+		self._slotSize = recordWidth + 1
+		self._encoding = encoding
+		self._maxLoadFactor = maximumLoadFactor
+		
+		# Capacity is always a power of 2 so we can mask instead of modulo
+		capacity = 1
+		while (capacity < initialCapacity):
+			capacity = capacity * 2
+		self._capacity = capacity
+		self._mask = capacity - 1
+		self._table = bytearray(capacity * self._slotSize)
+		self._count = 0
+		
+		self._overflowSet = set()
+	
+	
+	def _findSlot(self, table, mask, data):
+		# Return (slotOffset, found)
+		slotSize = self._slotSize
+		lengthByte = len(data) + 1
+		index = hash(data) & mask
+		while (True):
+			offset = index * slotSize
+			slotLength = table[offset]
+			if (slotLength == 0):
+				return (offset, False)
+			if ( (slotLength == lengthByte) and (table[offset+1:offset+lengthByte] == data) ):
+				return (offset, True)
+			# Linear probing
+			index = (index + 1) & mask
+	
+	
+	def _rehash(self, oldTable, newCapacity):
+		# Re-insert every used slot of oldTable in a new table
+		newMask = newCapacity - 1
+		newTable = bytearray(newCapacity * self._slotSize)
+		
+		slotSize = self._slotSize
+		for offset in range(0, len(oldTable), slotSize):
+			slotLength = oldTable[offset]
+			if (slotLength != 0):
+				data = bytes(oldTable[offset+1:offset+slotLength])
+				(newOffset, found) = self._findSlot(newTable, newMask, data)
+				newTable[newOffset:newOffset+slotLength] = oldTable[offset:offset+slotLength]
+		
+		self._table = newTable
+		self._capacity = newCapacity
+		self._mask = newMask
+	
+	
+	def _grow(self):
+		self._rehash(self._table, self._capacity * 2)
+		self._logger.printMessage(self, SimpleLoggerLevel.DEBUG, "Grew hash table to %d slots", self._capacity)
+	
+	
+	def add(self, sequence):
+		data = sequence.encode(self._encoding)
+		if (len(data) > self._recordWidth):
+			if (sequence in self._overflowSet):
+				return False
+			self._overflowSet.add(sequence)
+			return True
+		
+		(offset, found) = self._findSlot(self._table, self._mask, data)
+		if (found):
+			return False
+		
+		self._table[offset] = len(data) + 1
+		self._table[offset+1:offset+1+len(data)] = data
+		self._count += 1
+		
+		if (self._count > (self._capacity * self._maxLoadFactor)):
+			self._grow()
+		return True
+	
+	
+	def __contains__(self, sequence):
+		data = sequence.encode(self._encoding)
+		if (len(data) > self._recordWidth):
+			return (sequence in self._overflowSet)
+		(offset, found) = self._findSlot(self._table, self._mask, data)
+		return found
+	
+	
+	def getCount(self):
+		return self._count + len(self._overflowSet)
+	
+	
+	def getMemoryUsage(self):
+		overflowSize = sys.getsizeof(self._overflowSet)
+		for sequence in self._overflowSet:
+			overflowSize += sys.getsizeof(sequence)
+		return sys.getsizeof(self._table) + overflowSize
+
+	
+	
+	def getState(self):
+		return { "recordWidth": self._recordWidth, "capacity": self._capacity, "table": bytes(self._table), "count": self._count, "overflow": self._overflowSet }
+	
+	
+	def setState(self, state):
+		if (state["recordWidth"] != self._recordWidth):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Saved record width " + str(state["recordWidth"]) + " does not match current one " + str(self._recordWidth))
+		# Python hash of bytes changes from one process to another:
+		# slots must be re-inserted rather than copied
+		self._rehash(state["table"], state["capacity"])
+		self._count = state["count"]
+		self._overflowSet = set(state["overflow"])
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3.6
+
+import sys
+
+from Deduplicators.DeduplicatorInterface import *
+
+class SetDeduplicator(DeduplicatorInterface):
+	
+	# Exact deduplication using a python set
+	# Fastest, but cost ~100 bytes per sequence
+	def __init__(self, loggerObj):
+		super().__init__(loggerObj)
+		self._sequenceSet = set()
+		# Keep track of strings size as we go; summing at the end would be O(n)
+		self._stringsSize = 0
+	
+	def add(self, sequence):
+		if (sequence in self._sequenceSet):
+			return False
+		self._sequenceSet.add(sequence)
+		self._stringsSize += sys.getsizeof(sequence)
+		return True
+	
+	def __contains__(self, sequence):
+		return (sequence in self._sequenceSet)
+	
+	def getCount(self):
+		return len(self._sequenceSet)
+	
+	def getMemoryUsage(self):
+		return sys.getsizeof(self._sequenceSet) + self._stringsSize
+
+	
+	def getState(self):
+		return { "sequences": self._sequenceSet }
+	
+	def setState(self, state):
+		self._sequenceSet = set(state["sequences"])
+		self._stringsSize = 0
+		for sequence in self._sequenceSet:
+			self._stringsSize += sys.getsizeof(sequence)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3.6
+
+import sys
+
+from Deduplicators.DeduplicatorInterface import *
+
+class WindowDeduplicator(DeduplicatorInterface):
+
+	# Local deduplication over the most recent sequences only
+	# Two generations of at most windowSize sequences each: when the current
+	# one is full it becomes the previous one (the oldest is dropped).
+	# Memory is bounded, but a sequence older than the window is reported
+	# as new again. Meant for parallel workers whose output is deduplicated
+	# globally by the parent process.
+	def __init__(self, loggerObj, windowSize):
+		super().__init__(loggerObj)
+
+		if ( (not isinstance(windowSize, int)) or (windowSize < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "windowSize must be an integer greater or equal to 1")
+		self._windowSize = windowSize
+		self._currentSet = set()
+		self._previousSet = set()
+		self._count = 0
+
+	def add(self, sequence):
+		if ( (sequence in self._currentSet) or (sequence in self._previousSet) ):
+			return False
+		if (len(self._currentSet) >= self._windowSize):
+			self._previousSet = self._currentSet
+			self._currentSet = set()
+		self._currentSet.add(sequence)
+		self._count += 1
+		return True
+
+	def __contains__(self, sequence):
+		return ( (sequence in self._currentSet) or (sequence in self._previousSet) )
+
+	def getCount(self):
+		return self._count
+
+	def getMemoryUsage(self):
+		return sum( (sys.getsizeof(sequenceSet) + sum(sys.getsizeof(sequence) for sequence in sequenceSet)) for sequenceSet in (self._currentSet, self._previousSet) )
+
+
+	def getState(self):
+		return { "windowSize": self._windowSize, "current": self._currentSet, "previous": self._previousSet, "count": self._count }
+
+	def setState(self, state):
+		self._windowSize = state["windowSize"]
+		self._currentSet = set(state["current"])
+		self._previousSet = set(state["previous"])
+		self._count = state["count"]
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3.6
+
+import os
+import sys
+import mmap
+import json
+import array
+import struct
+import hashlib
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+from LettersDistributionFrequency import *
+
+class DictionnaryCache(object):
+
+	# Binary cache of loaded dictionnaries and letters distribution
+	# Skip CSV parsing at startup; the cache is rebuilt whenever one of the
+	# source files changed.
+	#
+	# File layout:
+	#	magic    : 4 bytes  "WGDC"
+	#	version  : uint32
+	#	hdr size : uint32
+	#	header   : JSON (sources, load filter, distribution, buckets description)
+	#	buckets  : for each length, 8 bytes aligned:
+	#		string pool : UTF-8 patterns one after the other
+	#		offsets     : array('I') of count+1 entries, pattern i is
+	#		              pool[offsets[i]:offsets[i+1]]
+	#		weights     : array('d') probability of each pattern
+	MAGIC = b"WGDC"
+	VERSION = 2
+	PREFIX_FORMAT = "<4sII"
+	ALIGNMENT = 8
+	# Used to hash sources when mtime/size changed
+	HASH_BLOCK_SIZE = 1024 * 1024
+
+	def __init__(self, loggerObj, cachePath):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		self._cachePath = cachePath
+
+
+	def _hashFile(self, path):
+		hasher = hashlib.sha1()
+		with open(path, "rb") as sourceFile:
+			block = sourceFile.read(self.HASH_BLOCK_SIZE)
+			while (block):
+				hasher.update(block)
+				block = sourceFile.read(self.HASH_BLOCK_SIZE)
+		return hasher.hexdigest()
+
+
+	def _describeSources(self, kind, paths):
+		sources = []
+		for path in paths:
+			stat = os.stat(path)
+			sources.append({
+				"kind"    : kind,
+				"path"    : os.path.abspath(path),
+				"mtime_ns": stat.st_mtime_ns,
+				"size"    : stat.st_size,
+				"sha1"    : self._hashFile(path),
+			})
+		return sources
+
+
+	def _readHeader(self, cacheFile):
+		prefixSize = struct.calcsize(self.PREFIX_FORMAT)
+		(magic, version, headerSize) = struct.unpack(self.PREFIX_FORMAT, cacheFile.read(prefixSize))
+		if ( (magic != self.MAGIC) or (version != self.VERSION) ):
+			return None
+		return json.loads(cacheFile.read(headerSize).decode("utf-8"))
+
+
+	def _describeFilter(self, filterObj):
+		if (filterObj is None):
+			return None
+		return filterObj.describe()
+
+
+	def isValid(self, dictionnaryPaths, frequencyPaths, allowDuplicatePattern, filterObj=None):
+		if (not os.path.isfile(self._cachePath)):
+			return False
+
+		try:
+			with open(self._cachePath, "rb") as cacheFile:
+				header = self._readHeader(cacheFile)
+		except (OSError, ValueError, struct.error) as err:
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Unreadable cache '" + str(self._cachePath) + "': " + str(err))
+			return False
+		if (header is None):
+			return False
+
+		if ( (header["byteorder"] != sys.byteorder) or (header["duplicates"] != allowDuplicatePattern) ):
+			return False
+		# Buckets were filtered while loading: same filter needed
+		if (header.get("filter") != self._describeFilter(filterObj)):
+			return False
+
+		wantedSources = [ ("words", os.path.abspath(path)) for path in dictionnaryPaths ]
+		wantedSources += [ ("frequency", os.path.abspath(path)) for path in frequencyPaths ]
+		if (wantedSources != [ (source["kind"], source["path"]) for source in header["sources"] ]):
+			return False
+
+		for source in header["sources"]:
+			try:
+				stat = os.stat(source["path"])
+			except OSError as err:
+				return False
+			# Fast path: untouched file
+			if ( (stat.st_mtime_ns == source["mtime_ns"]) and (stat.st_size == source["size"]) ):
+				continue
+			# File was touched; only content matters
+			if ( (stat.st_size != source["size"]) or (self._hashFile(source["path"]) != source["sha1"]) ):
+				self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Source '" + str(source["path"]) + "' changed; cache is outdated")
+				return False
+
+		return True
+
+
+	def _align(self, position):
+		return (position + self.ALIGNMENT - 1) // self.ALIGNMENT * self.ALIGNMENT
+
+
+	def compile(self, dictionnaryLoaderObj, lettersFrequencyObj, dictionnaryPaths, frequencyPaths):
+
+		# Build every bucket section first, to know their offsets
+		sections = []
+		for length in dictionnaryLoaderObj.getPatternLengths():
+			patternDict = dictionnaryLoaderObj.getPatternDictForLength(length)
+			encodedPatterns = [ pattern.encode("utf-8") for pattern in patternDict.keys() ]
+			pool = b"".join(encodedPatterns)
+			offsets = array.array("I", [0])
+			position = 0
+			for encoded in encodedPatterns:
+				position += len(encoded)
+				offsets.append(position)
+			weights = array.array("d", patternDict.values())
+			sections.append( (length, len(encodedPatterns), pool, offsets, weights) )
+
+		header = {
+			"byteorder"   : sys.byteorder,
+			"duplicates"  : dictionnaryLoaderObj.allowDuplicatePattern(),
+			"filter"      : self._describeFilter(dictionnaryLoaderObj.getFilter()),
+			"sources"     : self._describeSources("words", dictionnaryPaths) + self._describeSources("frequency", frequencyPaths),
+			"distribution": [ [length, probability] for length, probability in lettersFrequencyObj.getDistributionDict().items() ],
+			"buckets"     : [],
+		}
+
+		# Offsets are relative to the data start, so header size does not matter
+		position = 0
+		for (length, count, pool, offsets, weights) in sections:
+			bucket = { "length": length, "count": count }
+			bucket["poolOffset"] = position
+			bucket["poolSize"] = len(pool)
+			position = self._align(position + len(pool))
+			bucket["offsetsOffset"] = position
+			position = self._align(position + (len(offsets) * offsets.itemsize))
+			bucket["weightsOffset"] = position
+			position = self._align(position + (len(weights) * weights.itemsize))
+			header["buckets"].append(bucket)
+
+		encodedHeader = json.dumps(header).encode("utf-8")
+		prefix = struct.pack(self.PREFIX_FORMAT, self.MAGIC, self.VERSION, len(encodedHeader))
+		dataStart = self._align(len(prefix) + len(encodedHeader))
+
+		tmpPath = self._cachePath + ".tmp"
+		with open(tmpPath, "wb") as cacheFile:
+			cacheFile.write(prefix)
+			cacheFile.write(encodedHeader)
+			for (bucket, section) in zip(header["buckets"], sections):
+				(length, count, pool, offsets, weights) = section
+				cacheFile.seek(dataStart + bucket["poolOffset"])
+				cacheFile.write(pool)
+				cacheFile.seek(dataStart + bucket["offsetsOffset"])
+				offsets.tofile(cacheFile)
+				cacheFile.seek(dataStart + bucket["weightsOffset"])
+				weights.tofile(cacheFile)
+		os.replace(tmpPath, self._cachePath)
+
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Compiled " + str(len(sections)) + " bucket(s) to cache '" + str(self._cachePath) + "'")
+		return True
+
+
+	def loadInto(self, dictionnaryLoaderObj, lettersFrequencyObj):
+
+		with open(self._cachePath, "rb") as cacheFile:
+			header = self._readHeader(cacheFile)
+			if (header is None):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "'" + str(self._cachePath) + "' is not a dictionnary cache")
+			dataStart = self._align(cacheFile.tell())
+
+			mappedFile = mmap.mmap(cacheFile.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				mappedView = memoryview(mappedFile)
+				for bucket in header["buckets"]:
+					count = bucket["count"]
+					poolStart = dataStart + bucket["poolOffset"]
+					poolView = mappedView[poolStart:poolStart+bucket["poolSize"]]
+					offsetsStart = dataStart + bucket["offsetsOffset"]
+					offsetsView = mappedView[offsetsStart:offsetsStart+((count+1)*4)].cast("I")
+					weightsStart = dataStart + bucket["weightsOffset"]
+					weightsView = mappedView[weightsStart:weightsStart+(count*8)].cast("d")
+					if (dictionnaryLoaderObj.isCompactStorage()):
+						# Same layout as the compact buffers: copied as is,
+						# without decoding the patterns
+						dictionnaryLoaderObj.setPatternDictForLength(bucket["length"], CompactPatternStore.fromBuffers(poolView, offsetsView, weightsView))
+					else:
+						patterns = [ str(poolView[offsetsView[index]:offsetsView[index+1]], "utf-8") for index in range(count) ]
+						dictionnaryLoaderObj.setPatternDictForLength(bucket["length"], dict(zip(patterns, weightsView.tolist())))
+					weightsView.release()
+					offsetsView.release()
+					poolView.release()
+				mappedView.release()
+			finally:
+				mappedFile.close()
+
+		lettersFrequencyObj.setDistributionDict({ length : probability for length, probability in header["distribution"] })
+
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded " + str(len(header["buckets"])) + " bucket(s) from cache '" + str(self._cachePath) + "'")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3.6
+
+import re
+import heapq
+
+from SimpleLogger import *
+
+class DictionnaryFilter(object):
+
+	# Patterns to keep while loading dictionnaries
+	#
+	# Row filters, applied to every CSV row as it is parsed (before it takes
+	# any memory), by DictionnaryLoader or its worker processes:
+	#	maximumLength      : longer patterns are dropped (0: no limit)
+	#	allowedRegex       : patterns must fully match it (None: any)
+	#	minimumProbability : less probable patterns are dropped
+	# Bucket filters, applied once every file is loaded (duplicates across
+	# files must be resolved first):
+	#	topPerLength       : only the N most probable patterns of each length
+	#	                     are kept (0: all)
+	#	renormalize        : probabilities of each length sum to 1.0
+
+	def __init__(self, loggerObj, maximumLength=0, allowedRegex=None, minimumProbability=0.0, topPerLength=0, renormalize=False):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if ( (not isinstance(maximumLength, int)) or (maximumLength < 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumLength must be a positive integer")
+		self._maxLength = maximumLength
+
+		self._regex = None
+		if (allowedRegex is not None):
+			try:
+				self._regex = re.compile(allowedRegex)
+			except re.error as err:
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Invalid allowedRegex '" + str(allowedRegex) + "': " + str(err))
+
+		if ( (minimumProbability < 0.0) or (minimumProbability > 1.0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "minimumProbability must be between 0.0 and 1.0")
+		self._minProbability = minimumProbability
+
+		if ( (not isinstance(topPerLength, int)) or (topPerLength < 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "topPerLength must be a positive integer")
+		self._topPerLength = topPerLength
+		self._renormalize = renormalize
+
+
+	def __getstate__(self):
+		# Sent to the loading worker processes: the logger stays here
+		state = self.__dict__.copy()
+		state["_logger"] = None
+		return state
+
+
+	def describe(self):
+		# JSON friendly description (dictionnary cache key)
+		return {
+			"maximumLength"     : self._maxLength,
+			"allowedRegex"      : (self._regex.pattern if (self._regex is not None) else None),
+			"minimumProbability": self._minProbability,
+			"topPerLength"      : self._topPerLength,
+			"renormalize"       : self._renormalize,
+		}
+
+
+	def rejectRow(self, pattern, probability):
+		# True to drop that row, False to keep it
+		if ( (self._maxLength > 0) and (len(pattern) > self._maxLength) ):
+			return True
+		if ( (self._regex is not None) and (self._regex.fullmatch(pattern) is None) ):
+			return True
+		return (probability < self._minProbability)
+
+
+	def hasBucketFilters(self):
+		return ( (self._topPerLength > 0) or (self._renormalize) )
+
+
+	def filterBucket(self, patternDict):
+		# Return the kept { pattern : probability } of one length bucket;
+		# kept patterns stay in their loading order
+		if (self._topPerLength > 0) and (len(patternDict) > self._topPerLength):
+			# Ties broken on the pattern, so the result does not depend on order
+			kept = set( pattern for (probability, pattern) in heapq.nlargest(self._topPerLength, ( (probability, pattern) for (pattern, probability) in patternDict.items() )) )
+			patternDict = { pattern : probability for (pattern, probability) in patternDict.items() if (pattern in kept) }
+
+		if (self._renormalize):
+			totalProbability = sum(patternDict.values())
+			if (totalProbability > 0.0):
+				patternDict = { pattern : (probability / totalProbability) for (pattern, probability) in patternDict.items() }
+		return patternDict
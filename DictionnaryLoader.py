@@ -1,14 +1,91 @@
 #!/usr/bin/env python3.6
 
+import io
 import os
 import sys
 import csv
+import time
+import locale
+import collections
+import concurrent.futures
 
 from SimpleLogger import *
+from WeightedSampler import *
+from CompactPatternStore import *
+from DictionnaryFilter import *
+
+
+# Bytes of CSV parsed at once (by a worker process, or in this process)
+CSV_CHUNK_SIZE = 1024 * 1024
+
+
+def _parseCsvChunk(csvPath, start, end, allowDuplicatePattern, encoding, filterObj=None):
+	# Parse the rows starting in [start, end) of csvPath
+	# Run in a worker process: messages are returned, not printed
+	# Rows rejected by filterObj are dropped before being stored
+	# Return ( { length : { pattern : probability } }, nb rows, nb filtered rows, [ (level, message, args) ] )
+	with open(csvPath, "rb") as csvFile:
+		if (start > 0):
+			# A row starting before "start" belongs to the previous chunk
+			csvFile.seek(start - 1)
+			csvFile.readline()
+		data = b""
+		if (csvFile.tell() < end):
+			data = csvFile.read(end - csvFile.tell())
+			if ( (len(data) > 0) and (not data.endswith(b"\n")) ):
+				data += csvFile.readline()
+	
+	lenDict = {}
+	messages = []
+	nbRows = 0
+	nbFiltered = 0
+	# A row is expected to be a list [percent, char]
+	for row in csv.reader(io.StringIO(data.decode(encoding)), delimiter=','):
+		nbRows += 1
+		
+		# Make sure we are dealing with string
+		if ( (len(row) < 2) or (not isinstance(row[1], str)) ):
+			messages.append( (SimpleLoggerLevel.ERROR, "Read row '%s' is not a recognized [probability, pattern] row!", (",".join(row),)) )
+			# Skip that pattern, move to next one
+			continue
+		pattern = row[1]
+		
+		# Make sure we are dealing with percentage
+		try:
+			probability = float(row[0])
+			if ( (probability < 0.0) or (probability > 1.0) ):
+				raise ValueError("Not a recognized percentage (0.0 to 1.0) !")
+		except ValueError as err:
+			messages.append( (SimpleLoggerLevel.ERROR, "Probability '%s' for pattern '%s' is not a recognized float OR is not between 0.0 and 1.0!", (row[0], pattern)) )
+			# Bad value / bad type, move on
+			continue
+		
+		if ( (filterObj is not None) and (filterObj.rejectRow(pattern, probability)) ):
+			nbFiltered += 1
+			continue
+		
+		patternLen = len(pattern)
+		if (patternLen not in lenDict):
+			lenDict[patternLen] = {}
+		
+		patternDict = lenDict[patternLen]
+		
+		# Key duplicate not accepted unless "allowDuplicate" flag is on
+		if (pattern in patternDict):
+			if (allowDuplicatePattern is False):
+				messages.append( (SimpleLoggerLevel.ERROR, "Pattern '%s' already defined in pattern list!", (pattern,)) )
+				# Duplicate: moving on
+				continue
+			else:
+				messages.append( (SimpleLoggerLevel.WARNING, "Found duplicate pattern '%s', replacing existing", (pattern,)) )
+		patternDict[pattern] = probability
+	
+	return (lenDict, nbRows, nbFiltered, messages)
+
 
 class DictionnaryLoader(object):
 	
-	def __init__(self, loggerObj, allowDuplicatePattern=False):
+	def __init__(self, loggerObj, allowDuplicatePattern=False, compactStorage=False, filterObj=None):
 		
 		if (not isinstance(loggerObj, SimpleLogger)):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
@@ -16,14 +93,30 @@ class DictionnaryLoader(object):
 		
 		self._duplicateOk = allowDuplicatePattern
 		
+		# Optional DictionnaryFilter: rows are filtered while parsed, buckets
+		# once every file given to loadPatternsFromCsvPaths is merged
+		if ( (filterObj is not None) and (not isinstance(filterObj, DictionnaryFilter)) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "filterObj not of a DictionnaryFilter instance!")
+		self._filter = filterObj
+		
 		# Dict of dicts
 		# 	key  : string len
 		#	value: patterns dict for this len
 		# Pattern dict is:
 		#	key  : pattern
 		#	value: probability
+		# With compactStorage, pattern dicts are read-only CompactPatternStore
+		# (same access, a fraction of the memory); each load rebuilds the
+		# buckets it touched.
+		self._compactStorage = compactStorage
 		self._patternLenDict = {}
 		
+		# Frozen samplers, built once loading is done
+		# 	key  : string len
+		#	value: WeightedSampler over the patterns of this len
+		# Emptied each time a new file is loaded
+		self._samplerLenDict = {}
+		
 	
 	def getPatternDictForLength(self, length):
 		if (length not in self._patternLenDict):
@@ -32,54 +125,192 @@ class DictionnaryLoader(object):
 			return self._patternLenDict[length]
 	
 	
+	def getPatternLengths(self):
+		return sorted(self._patternLenDict.keys())
+	
+	
+	def allowDuplicatePattern(self):
+		return self._duplicateOk
+	
+	
+	def isCompactStorage(self):
+		return self._compactStorage
+	
+	
+	def getFilter(self):
+		return self._filter
+	
+	
+	def getNumberOfPatterns(self):
+		return sum( len(patternDict) for patternDict in self._patternLenDict.values() )
+	
+	
+	def getMemoryUsage(self):
+		# Approximate bytes used by the patterns and their probabilities
+		# (samplers excluded)
+		memoryUsage = sys.getsizeof(self._patternLenDict)
+		for patternDict in self._patternLenDict.values():
+			if (isinstance(patternDict, CompactPatternStore)):
+				memoryUsage += patternDict.getMemoryUsage()
+			else:
+				memoryUsage += sys.getsizeof(patternDict) + sum( (sys.getsizeof(pattern) + sys.getsizeof(probability)) for (pattern, probability) in patternDict.items() )
+		return memoryUsage
+	
+	
+	def setPatternDictForLength(self, length, patternDict):
+		# Replace the whole bucket (ex: when loading from a compiled cache)
+		if (self._compactStorage):
+			patternDict = CompactPatternStore.fromDict(patternDict)
+		self._patternLenDict[length] = patternDict
+		self._samplerLenDict.pop(length, None)
+	
+	
+	def getSamplerForLength(self, length):
+		# Lazily freeze the bucket on first access
+		if (length not in self._samplerLenDict):
+			patternDict = self.getPatternDictForLength(length)
+			if (isinstance(patternDict, CompactPatternStore)):
+				# Patterns are decoded when picked, not copied
+				self._samplerLenDict[length] = WeightedSampler(patternDict.getPatterns(), patternDict.getWeights())
+			else:
+				self._samplerLenDict[length] = WeightedSampler(patternDict.keys(), patternDict.values())
+		return self._samplerLenDict[length]
+	
+	
+	def freezeSamplers(self):
+		# Build every sampler at once; call it when all dictionnaries are loaded
+		# so the cost is not paid inside the generation loop
+		for length in self._patternLenDict:
+			self.getSamplerForLength(length)
+	
+	
 	def loadPatternFromCsvPath(self, csvPath):
-		if ( (not os.path.exists(csvPath)) or
-		     (not os.access(csvPath, os.R_OK) ) ):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "File '" + str(csvPath) + "' does not exists or is not readable")
+		self.loadPatternsFromCsvPaths([csvPath])
+	
+	
+	def _iterateChunks(self, csvPaths, chunkSize):
+		# (file index, start, end) of every chunk, files in order
+		for fileIndex, csvPath in enumerate(csvPaths):
+			fileSize = os.path.getsize(csvPath)
+			for start in range(0, max(fileSize, 1), chunkSize):
+				yield (fileIndex, start, min(start + chunkSize, fileSize))
+	
+	
+	def loadPatternsFromCsvPaths(self, csvPaths, numberOfWorkers=1, chunkSize=CSV_CHUNK_SIZE):
+		# Files are cut in chunks of about chunkSize bytes, parsed by a pool
+		# of numberOfWorkers processes (or here, with 1) and merged in file
+		# order, so the result is the same as loading the files one by one.
+		# At most two chunks per worker are pending at once.
+		# Patterns are about to change: previous samplers are no longer valid
+		self._samplerLenDict.clear()
+		
+		for csvPath in csvPaths:
+			if ( (not os.path.exists(csvPath)) or
+			     (not os.access(csvPath, os.R_OK) ) ):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "File '" + str(csvPath) + "' does not exists or is not readable")
+		if ( (not isinstance(numberOfWorkers, int)) or (numberOfWorkers < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfWorkers must be an integer greater or equal to 1")
+		
+		encoding = locale.getpreferredencoding(False)
+		chunks = self._iterateChunks(csvPaths, chunkSize)
+		if (numberOfWorkers == 1):
+			results = ( _parseCsvChunk(csvPaths[fileIndex], start, end, self._duplicateOk, encoding, self._filter) for (fileIndex, start, end) in chunks )
+			self._mergeChunks(csvPaths, self._iterateChunks(csvPaths, chunkSize), results)
+			self._filterBuckets()
+			return
+		
+		with concurrent.futures.ProcessPoolExecutor(max_workers=numberOfWorkers) as executor:
+			pending = collections.deque()
+			def iterateResults():
+				for (fileIndex, start, end) in chunks:
+					if (len(pending) >= (2 * numberOfWorkers)):
+						yield pending.popleft().result()
+					pending.append(executor.submit(_parseCsvChunk, csvPaths[fileIndex], start, end, self._duplicateOk, encoding, self._filter))
+				while (len(pending) > 0):
+					yield pending.popleft().result()
+			self._mergeChunks(csvPaths, self._iterateChunks(csvPaths, chunkSize), iterateResults())
+		self._filterBuckets()
+	
+	
+	def _filterBuckets(self):
+		# Bucket filters (top patterns per length, renormalization) need the
+		# final probabilities, so they run once duplicates are resolved
+		if ( (self._filter is None) or (not self._filter.hasBucketFilters()) ):
+			return
+		nbPatterns = self.getNumberOfPatterns()
+		for (patternLen, patternDict) in self._patternLenDict.items():
+			patternDict = self._filter.filterBucket(patternDict)
+			if (self._compactStorage):
+				patternDict = CompactPatternStore.fromDict(patternDict)
+			self._patternLenDict[patternLen] = patternDict
+		self._samplerLenDict.clear()
+		if (self._logger.isEnabledFor(SimpleLoggerLevel.INFO)):
+			self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Filtered buckets: %d of %d pattern(s) kept, using %d bytes", self.getNumberOfPatterns(), nbPatterns, self.getMemoryUsage())
+	
+	
+	def _mergePatternDict(self, patternDict, newDict):
+		# Add newDict patterns to patternDict, with the duplicate rules used
+		# while reading a file; set operations keep this at C speed
+		duplicates = patternDict.keys() & newDict.keys()
+		if (len(duplicates) > 0):
+			if (self._duplicateOk is False):
+				if (self._logger.isEnabledFor(SimpleLoggerLevel.ERROR)):
+					for pattern in newDict:
+						if (pattern in duplicates):
+							self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Pattern '%s' already defined in pattern list!", pattern)
+				# Duplicate: first definition is kept
+				newDict = { pattern : probability for (pattern, probability) in newDict.items() if (pattern not in duplicates) }
+			elif (self._logger.isEnabledFor(SimpleLoggerLevel.WARNING)):
+				for pattern in newDict:
+					if (pattern in duplicates):
+						self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Found duplicate pattern '%s', replacing existing", pattern)
+		# Replaced patterns keep their position, new ones are appended
+		patternDict.update(newDict)
+	
+	
+	def _mergeChunks(self, csvPaths, chunks, results):
+		# Merge parsed chunks in order, with the same duplicate rules as
+		# inside a chunk; compact buckets are rebuilt after each file
 		
-		csvfile = open(csvPath, "r")
-		if (csvfile is None):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Error while opening path '" + str(csvPath) + "'")
+		# Compact buckets are read-only: rows go to plain dicts first
+		if (self._compactStorage):
+			loadedLenDict = {}
+		else:
+			loadedLenDict = self._patternLenDict
 		
-		reader = csv.reader(csvfile, delimiter=',')
-		# A row is expected to be a list [percent, char]
-		for row in reader:
+		fileStartTime = time.perf_counter()
+		nbRows = 0
+		nbFiltered = 0
+		for ( (fileIndex, start, end), (chunkLenDict, chunkRows, chunkFiltered, messages) ) in zip(chunks, results):
+			csvPath = csvPaths[fileIndex]
+			for (level, message, args) in messages:
+				self._logger.printMessage(self, level, message, *args)
 			
-			# Make sure we are dealing with string
-			if (not isinstance(row[1], str)):
-				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Read value '" + str(row[1]) + "' is not a recognized string!")
-				# Skip that pattern, move to next one
-				continue
-			pattern = row[1]
+			for (patternLen, chunkDict) in chunkLenDict.items():
+				if (patternLen not in loadedLenDict):
+					loadedLenDict[patternLen] = chunkDict
+				else:
+					self._mergePatternDict(loadedLenDict[patternLen], chunkDict)
+			nbRows += chunkRows
+			nbFiltered += chunkFiltered
 			
-			# Make sure we are dealing with percentage
-			try:
-				probability = float(row[0])
-				if ( (probability < 0.0) or (probability > 1.0) ):
-					raise ValueError("Not a recognized percentage (0.0 to 1.0) !")
-			except ValueError as err:
-				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Probability '" + str(probability) + "' for pattern '" + pattern + "' is not a recognized float OR is not between 0.0 and 1.0!")
-				# Bad value / bad type, move on
+			if (end < os.path.getsize(csvPath)):
 				continue
+			# Last chunk of this file
+			if (self._compactStorage):
+				for (patternLen, patternDict) in loadedLenDict.items():
+					if (patternLen in self._patternLenDict):
+						mergedDict = dict(self._patternLenDict[patternLen].items())
+						self._mergePatternDict(mergedDict, patternDict)
+						patternDict = mergedDict
+					self._patternLenDict[patternLen] = CompactPatternStore.fromDict(patternDict)
+				loadedLenDict.clear()
 			
-			patternLen = len(pattern)
-			if (patternLen not in self._patternLenDict):
-				self._patternLenDict[patternLen] = {}
-			
-			patternDict = self._patternLenDict[patternLen]
-			
-			# Key duplicate not accepted unless "allowDuplicate" flag is on
-			if (pattern in patternDict):
-				if (self._duplicateOk is False):
-					self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Pattern '" + pattern + "' already defined in pattern list!")
-					# Duplicate: moving on
-					continue
-				else:
-					self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Found duplicate pattern '" + pattern + "', replacing existing")
-			patternDict[pattern] = probability
-		
-			
-	
+			if (self._logger.isEnabledFor(SimpleLoggerLevel.INFO)):
+				self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded '%s': %d row(s) (%d filtered out) in %.2fs; %d pattern(s) in %d bucket(s), using %d bytes", csvPath, nbRows, nbFiltered, time.perf_counter() - fileStartTime, self.getNumberOfPatterns(), len(self._patternLenDict), self.getMemoryUsage())
+			fileStartTime = time.perf_counter()
+			nbRows = 0
+			nbFiltered = 0
 
 
 if __name__ == '__main__':
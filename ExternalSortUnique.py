@@ -0,0 +1,222 @@
+#!/usr/bin/env python3.6
+
+import os
+import bz2
+import gzip
+import lzma
+import time
+import heapq
+import shutil
+import tempfile
+import concurrent.futures
+
+from SimpleLogger import *
+
+
+# Record separator used when preserving order:
+#	first pass : word + "\0" + ordinal
+#	second pass: ordinal + "\0" + word
+# "\0" sorts before any other byte, so "ab\0..." < "abc\0..."
+ORDER_SEPARATOR = b"\0"
+# Ordinals are fixed width hexadecimal, so byte order is numeric order
+ORDINAL_WIDTH = 16
+
+
+def _recordKey(record, byPrefix):
+	if (byPrefix):
+		return record.split(ORDER_SEPARATOR, 1)[0]
+	return record
+
+
+def _uniqueSorted(records, byPrefix):
+	# Yield records of a sorted iterable, dropping those with the same key
+	# as the previous one (with byPrefix, the first, lowest ordinal, is kept)
+	previousKey = None
+	for record in records:
+		key = _recordKey(record, byPrefix)
+		if (key != previousKey):
+			previousKey = key
+			yield record
+
+
+def _sortRun(records, runPath, unique, byPrefix):
+	# Run in a worker process: sort one chunk and spill it to runPath
+	records.sort()
+	if (unique):
+		records = _uniqueSorted(records, byPrefix)
+	with open(runPath, "wb") as runFile:
+		nbRecords = 0
+		for record in records:
+			runFile.write(record + b"\n")
+			nbRecords += 1
+	return nbRecords
+
+
+def _readRecords(fileObj):
+	for line in fileObj:
+		yield line.rstrip(b"\r\n")
+
+
+class ExternalSortUnique(object):
+
+	# Sort and deduplicate wordlists larger than memory
+	#
+	# 1. Input lines are read in chunks of about memoryLimit / (workers + 1)
+	#    bytes; each chunk is sorted, deduplicated and spilled to a run file
+	#    by a pool of worker processes.
+	# 2. Runs are merged (heapq.merge, at most maximumOpenRuns at once, in
+	#    several passes if needed), dropping duplicates.
+	#
+	# Lines are compared as bytes. With preserveOrder, each line is tagged
+	# with its ordinal; the first occurrence of each line is kept, then a
+	# second sort on the ordinal restores generation order.
+
+	# Python objects overhead per record kept in memory (bytes + list slot)
+	RECORD_OVERHEAD = 41
+	INPUT_OPENERS = {
+		".gz"  : gzip.open,
+		".bz2" : bz2.open,
+		".xz"  : lzma.open,
+		".lzma": lzma.open,
+	}
+
+	def __init__(self, loggerObj, memoryLimit=(256*1024*1024), numberOfWorkers=1, temporaryDirectory=None, preserveOrder=False, maximumOpenRuns=256):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if ( (not isinstance(numberOfWorkers, int)) or (numberOfWorkers < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfWorkers must be an integer greater or equal to 1")
+		self._nbWorkers = numberOfWorkers
+
+		if ( (not isinstance(memoryLimit, int)) or (memoryLimit < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "memoryLimit must be an integer greater or equal to 1")
+		# Parent holds one chunk being read, each worker one being sorted
+		self._chunkSize = max(1, memoryLimit // (numberOfWorkers + 1))
+
+		if ( (not isinstance(maximumOpenRuns, int)) or (maximumOpenRuns < 2) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumOpenRuns must be an integer greater or equal to 2")
+		self._maxOpenRuns = maximumOpenRuns
+
+		self._tmpDir = temporaryDirectory
+		self._preserveOrder = preserveOrder
+		self._runDir = None
+		self._nbRuns = 0
+
+
+	def _openInput(self, path):
+		opener = self.INPUT_OPENERS.get(os.path.splitext(path)[1].lower(), open)
+		return opener(path, "rb")
+
+
+	def _newRunPath(self):
+		self._nbRuns += 1
+		return os.path.join(self._runDir, "run" + str(self._nbRuns).zfill(6))
+
+
+	def _spillRuns(self, records, unique, byPrefix):
+		# Sort records (an iterable of bytes) into run files; return their paths
+		runPaths = []
+		pending = []
+		with concurrent.futures.ProcessPoolExecutor(max_workers=self._nbWorkers) as executor:
+			chunk = []
+			chunkSize = 0
+			for record in records:
+				chunk.append(record)
+				chunkSize += len(record) + self.RECORD_OVERHEAD
+				if (chunkSize >= self._chunkSize):
+					# Bound memory: at most one chunk per worker in flight
+					if (len(pending) >= self._nbWorkers):
+						pending.pop(0).result()
+					runPath = self._newRunPath()
+					pending.append(executor.submit(_sortRun, chunk, runPath, unique, byPrefix))
+					runPaths.append(runPath)
+					chunk = []
+					chunkSize = 0
+			if (len(chunk) > 0):
+				runPath = self._newRunPath()
+				pending.append(executor.submit(_sortRun, chunk, runPath, unique, byPrefix))
+				runPaths.append(runPath)
+			for future in pending:
+				future.result()
+		return runPaths
+
+
+	def _mergeRuns(self, runPaths, unique, byPrefix):
+		# Yield the merged (and deduplicated) records of runPaths
+		# Runs are first merged by groups until few enough are left
+		while (len(runPaths) > self._maxOpenRuns):
+			self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Merging " + str(len(runPaths)) + " runs by groups of " + str(self._maxOpenRuns))
+			mergedPaths = []
+			for start in range(0, len(runPaths), self._maxOpenRuns):
+				group = runPaths[start:start+self._maxOpenRuns]
+				mergedPath = self._newRunPath()
+				with open(mergedPath, "wb") as mergedFile:
+					for record in self._mergeGroup(group, unique, byPrefix):
+						mergedFile.write(record + b"\n")
+				mergedPaths.append(mergedPath)
+			runPaths = mergedPaths
+
+		for record in self._mergeGroup(runPaths, unique, byPrefix):
+			yield record
+
+
+	def _mergeGroup(self, runPaths, unique, byPrefix):
+		runFiles = [ open(runPath, "rb") for runPath in runPaths ]
+		try:
+			records = heapq.merge(*[ _readRecords(runFile) for runFile in runFiles ])
+			if (unique):
+				records = _uniqueSorted(records, byPrefix)
+			for record in records:
+				yield record
+		finally:
+			for runFile in runFiles:
+				runFile.close()
+			# Merged runs are not needed anymore
+			for runPath in runPaths:
+				os.remove(runPath)
+
+
+	def _readInputs(self, inputPaths):
+		# Yield every line of every input, tagged with its ordinal if needed
+		ordinal = 0
+		for inputPath in inputPaths:
+			with self._openInput(inputPath) as inputFile:
+				for record in _readRecords(inputFile):
+					if (self._preserveOrder):
+						record = record + ORDER_SEPARATOR + format(ordinal, "0" + str(ORDINAL_WIDTH) + "x").encode("ascii")
+					ordinal += 1
+					yield record
+		self._nbInputRecords = ordinal
+
+
+	def sortUnique(self, inputPaths, outputPath):
+		startTime = time.perf_counter()
+		self._runDir = tempfile.mkdtemp(prefix="sortunique-", dir=self._tmpDir)
+		self._nbRuns = 0
+		self._nbInputRecords = 0
+		nbOutputRecords = 0
+
+		try:
+			# Pass 1: sorted, deduplicated runs
+			runPaths = self._spillRuns(self._readInputs(inputPaths), True, self._preserveOrder)
+			self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Read " + str(self._nbInputRecords) + " line(s) into " + str(len(runPaths)) + " sorted run(s) in " + format(time.perf_counter() - startTime, ".2f") + "s")
+
+			uniqueRecords = self._mergeRuns(runPaths, True, self._preserveOrder)
+			if (self._preserveOrder):
+				# Pass 2: back to generation order, sorting on the ordinal
+				swappedRecords = ( (ordinal + ORDER_SEPARATOR + word) for (word, ordinal) in (record.rsplit(ORDER_SEPARATOR, 1) for record in uniqueRecords) )
+				runPaths = self._spillRuns(swappedRecords, False, False)
+				uniqueRecords = ( record.split(ORDER_SEPARATOR, 1)[1] for record in self._mergeRuns(runPaths, False, False) )
+
+			with open(outputPath, "wb", buffering=(1024*1024)) as outputFile:
+				for record in uniqueRecords:
+					outputFile.write(record + b"\n")
+					nbOutputRecords += 1
+		finally:
+			shutil.rmtree(self._runDir, ignore_errors=True)
+			self._runDir = None
+
+		elapsedTime = time.perf_counter() - startTime
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Wrote " + str(nbOutputRecords) + " unique line(s) out of " + str(self._nbInputRecords) + " to '" + str(outputPath) + "' in " + format(elapsedTime, ".2f") + "s")
+		return (self._nbInputRecords, nbOutputRecords)
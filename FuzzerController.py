@@ -1,6 +1,8 @@
 #!/usr/bin/env python3.6
 
 import os
+import random
+import inspect
 import importlib
 import operator
 
@@ -22,17 +24,31 @@ class FuzzerController(object):
 	#
 	#     Fuzzer/InBetweenWord/
 	#     Fuzzer/InBetweenWord/MoreFuzzer.py
+	#
+	# Each module defines a class of the same name, built as
+	#	SomeFuzzer(loggerObj=..., randomObj=...)
+	# randomObj is optional: a seeded random.Random the fuzzer should draw
+	# from, so --seed and checkpoints cover it. Fuzzers whose constructor
+	# only takes loggerObj are still loaded, but their draws are neither
+	# seeded nor saved in checkpoints.
 	FUZZER_SUBDIR_NAME = "Fuzzers"
 	NEW_SEQUENCE_PATH = "NewSequence"
 	COMPLETE_SEQUENCE_PATH = "CompleteSequence"
 	NEW_WORD_IN_SEQUENCE_PATH = "NewWordInSequence"
 	BETWEEN_WORDS_IN_SEQUENCE_PATH = "BetweenWordsInSequence"
 	
-	def __init__(self, loggerObj):
+	def __init__(self, loggerObj, seed=None):
 		if (not isinstance(loggerObj, SimpleLogger)):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
 		self._logger = loggerObj
 		
+		# Each fuzzer get its own random generator, seeded from
+		# the controller seed and the fuzzer module name
+		#	key  : module name
+		#	value: random.Random instance given to the fuzzer
+		self._seed = seed
+		self._randomObjs = {}
+		
 		# Fuzzers are kept in dict like:
 		# 	fuzzerObj : nb chars it add / remove
 		self._newSequenceFuzzers = {}
@@ -40,11 +56,28 @@ class FuzzerController(object):
 		self._newWordInSequenceFuzzers = {}
 		self._betweenWordsInSequenceFuzzers = {}
 		
+		# Per hook lookup tables, indexed by characters budget
+		# Built by buildLookupTables() once fuzzers are loaded
+		self._lookupMaxChars = -1
+		self._newSequenceTable = None
+		self._completeSequenceTable = None
+		self._newWordInSequenceTable = None
+		self._betweenWordsInSequenceTable = None
+		
 		# Dynamically import all Fuzzers
 		self.__importAllFuzzerModules()
 		
 	
 	
+	def _acceptsRandomObj(self, fuzzerClass):
+		# True when the constructor takes randomObj (by name or **kwargs)
+		try:
+			parameters = inspect.signature(fuzzerClass).parameters
+		except (TypeError, ValueError):
+			return False
+		return ( ("randomObj" in parameters) or any( (parameter.kind == inspect.Parameter.VAR_KEYWORD) for parameter in parameters.values() ) )
+	
+	
 	def __importAndCreateFuzzer(self, directoryName, moduleName):
 		
 		newFuzzerObj = None
@@ -59,7 +92,15 @@ class FuzzerController(object):
 			try:
 				newMod = importlib.import_module(moduleRealName)
 				newClass = getattr(newMod, moduleShortname)
-				newFuzzerObj = newClass(loggerObj=self._logger)
+				if (self._acceptsRandomObj(newClass)):
+					randomObj = random.Random()
+					randomObj.seed(self._getComponentSeed(moduleRealName))
+					newFuzzerObj = newClass(loggerObj=self._logger, randomObj=randomObj)
+					self._randomObjs[moduleRealName] = randomObj
+				else:
+					newFuzzerObj = newClass(loggerObj=self._logger)
+					if (self._seed is not None):
+						self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Fuzzer '" + str(moduleRealName) + "' takes no randomObj; its output is not reproducible with --seed")
 			except Exception as err:
 				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Dynamic import of Fuzzer failed, got error: '" + str(err) + "'")
 		
@@ -72,33 +113,59 @@ class FuzzerController(object):
 		
 		fuzzerObj = None
 		modulePath = os.path.join(self.FUZZER_SUBDIR_NAME, self.NEW_SEQUENCE_PATH)
-		for moduleName in os.listdir(modulePath):
+		for moduleName in sorted(os.listdir(modulePath)):
 			fuzzerObj = self.__importAndCreateFuzzer(modulePath, moduleName)
 			if (fuzzerObj is not None):
 				self._newSequenceFuzzers[fuzzerObj] = fuzzerObj.getNumberCharactersAdded()
 		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded " + str(len(self._newSequenceFuzzers)) + " fuzzer(s) from '" + str(self.NEW_SEQUENCE_PATH) + "'")
 		
 		modulePath = os.path.join(self.FUZZER_SUBDIR_NAME, self.COMPLETE_SEQUENCE_PATH)
-		for moduleName in os.listdir(modulePath):
+		for moduleName in sorted(os.listdir(modulePath)):
 			fuzzerObj = self.__importAndCreateFuzzer(self.COMPLETE_SEQUENCE_PATH, moduleName)
 			if (fuzzerObj is not None):
 				self._completeSequenceFuzzers[fuzzerObj] = fuzzerObj.getNumberCharactersAdded()
 		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded " + str(len(self._completeSequenceFuzzers)) + " fuzzer(s) from '" + str(self.COMPLETE_SEQUENCE_PATH) + "'")
 		
 		modulePath = os.path.join(self.FUZZER_SUBDIR_NAME, self.NEW_WORD_IN_SEQUENCE_PATH)
-		for moduleName in os.listdir(modulePath):
+		for moduleName in sorted(os.listdir(modulePath)):
 			fuzzerObj = self.__importAndCreateFuzzer(self.NEW_WORD_IN_SEQUENCE_PATH, moduleName)
 			if (fuzzerObj is not None):
 				self._newWordInSequenceFuzzers[fuzzerObj] = fuzzerObj.getNumberCharactersAdded()
 		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded " + str(len(self._newWordInSequenceFuzzers)) + " fuzzer(s) from '" + str(self.NEW_WORD_IN_SEQUENCE_PATH) + "'")
 		
 		modulePath = os.path.join(self.FUZZER_SUBDIR_NAME, self.BETWEEN_WORDS_IN_SEQUENCE_PATH)
-		for moduleName in os.listdir(modulePath):
+		for moduleName in sorted(os.listdir(modulePath)):
 			fuzzerObj = self.__importAndCreateFuzzer(modulePath, moduleName)
 			if (fuzzerObj is not None):
 				self._betweenWordsInSequenceFuzzers[fuzzerObj] = fuzzerObj.getNumberCharactersAdded()
 		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Loaded " + str(len(self._betweenWordsInSequenceFuzzers)) + " fuzzer(s) from '" + str(self.BETWEEN_WORDS_IN_SEQUENCE_PATH) + "'")
 
+	def _getComponentSeed(self, componentName):
+		# No seed: let random use system entropy
+		if (self._seed is None):
+			return None
+		return str(self._seed) + ":" + componentName
+	
+	
+	def setSeed(self, seed):
+		# Reseed every fuzzer random generator
+		self._seed = seed
+		for moduleName, randomObj in self._randomObjs.items():
+			randomObj.seed(self._getComponentSeed(moduleName))
+	
+	
+	def getRandomStates(self):
+		return { moduleName : randomObj.getstate() for moduleName, randomObj in self._randomObjs.items() }
+	
+	
+	def setRandomStates(self, states):
+		for moduleName, state in states.items():
+			if (moduleName not in self._randomObjs):
+				self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "No fuzzer '" + str(moduleName) + "' loaded; ignoring its random state")
+				continue
+			self._randomObjs[moduleName].setstate(state)
+	
+	
 	def _getFuzzersFromCharactersAdded(self, fuzzerDict, maxCharsFuzzerAdd):
 		fuzzersList = []
 		fuzzerTuples = sorted(fuzzerDict.items(), key=operator.itemgetter(1))
@@ -107,18 +174,36 @@ class FuzzerController(object):
 				fuzzersList.append(fuzzer)
 		return fuzzersList
 
+	def buildLookupTables(self, maxCharacters):
+		# Precompute, for each hook, the eligible fuzzers for every
+		# character budget 0..maxCharacters, so hot loop lookups are
+		# a single index instead of a sort
+		self._lookupMaxChars = maxCharacters
+		self._newSequenceTable = self._buildLookupTable(self._newSequenceFuzzers, maxCharacters)
+		self._completeSequenceTable = self._buildLookupTable(self._completeSequenceFuzzers, maxCharacters)
+		self._newWordInSequenceTable = self._buildLookupTable(self._newWordInSequenceFuzzers, maxCharacters)
+		self._betweenWordsInSequenceTable = self._buildLookupTable(self._betweenWordsInSequenceFuzzers, maxCharacters)
+	
+	def _buildLookupTable(self, fuzzerDict, maxCharacters):
+		return tuple( tuple(self._getFuzzersFromCharactersAdded(fuzzerDict, budget)) for budget in range(maxCharacters + 1) )
+	
+	def _lookupFuzzers(self, lookupTable, fuzzerDict, maxCharsFuzzerAdd):
+		# Budgets outside the precomputed range use the slow path
+		if ( (lookupTable is not None) and (0 <= maxCharsFuzzerAdd <= self._lookupMaxChars) ):
+			return lookupTable[maxCharsFuzzerAdd]
+		return tuple(self._getFuzzersFromCharactersAdded(fuzzerDict, maxCharsFuzzerAdd))
+	
 	def getNewSequenceFuzzers(self, maxCharsFuzzerAdd):
-		return self._getFuzzersFromCharactersAdded(self._newSequenceFuzzers, maxCharsFuzzerAdd)
+		return self._lookupFuzzers(self._newSequenceTable, self._newSequenceFuzzers, maxCharsFuzzerAdd)
 	
 	def getCompleteSequenceFuzzers(self, maxCharsFuzzerAdd):
-		return self._getFuzzersFromCharactersAdded(self._completeSequenceFuzzers, maxCharsFuzzerAdd)
+		return self._lookupFuzzers(self._completeSequenceTable, self._completeSequenceFuzzers, maxCharsFuzzerAdd)
 	
 	def getNewWordInSequenceFuzzers(self, maxCharsFuzzerAdd):
-		return self._getFuzzersFromCharactersAdded(self._newWordInSequenceFuzzers, maxCharsFuzzerAdd)
+		return self._lookupFuzzers(self._newWordInSequenceTable, self._newWordInSequenceFuzzers, maxCharsFuzzerAdd)
 	
 	def getBetweenWordInSequenceFuzzers(self, maxCharsFuzzerAdd):
-		return self._getFuzzersFromCharactersAdded(self._betweenWordsInSequenceFuzzers, maxCharsFuzzerAdd)
-
+		return self._lookupFuzzers(self._betweenWordsInSequenceTable, self._betweenWordsInSequenceFuzzers, maxCharsFuzzerAdd)
 
 if __name__ == '__main__':
 	myLogger = SimpleLogger(defaultLevel=SimpleLoggerLevel.INFO, 
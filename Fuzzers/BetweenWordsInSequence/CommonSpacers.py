@@ -12,11 +12,16 @@ class CommonSpacers(object):
 	#	_         : 5%
 	#
 	# It adds one char to the sequence
-	def __init__(self, loggerObj):
+	def __init__(self, loggerObj, randomObj=None):
 		if (not isinstance(loggerObj, SimpleLogger)):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
 		self._logger = loggerObj
 		
+		# Own random generator so runs can be seeded / resumed
+		if (randomObj is None):
+			randomObj = random.Random()
+		self._random = randomObj
+		
 		self._fuzzingList = {
 			' ':0.75,
 			'-':0.2,
@@ -47,7 +52,7 @@ class CommonSpacers(object):
 		# Copy the dict to avoid destroying the master copy as we go
 		fuzzingChoices = self._fuzzingList.copy()
 		while (nbFuzzingChoiceToApply > 0):
-			newFuzzing = random.choices(population=list(fuzzingChoices.keys()), weights=list(fuzzingChoices.values()), k=1)[0]
+			newFuzzing = self._random.choices(population=list(fuzzingChoices.keys()), weights=list(fuzzingChoices.values()), k=1)[0]
 			fuzzedWords.append(wordBefore + newFuzzing + wordCurrent)
 			
 			# Remove picked choice, decrement choice left
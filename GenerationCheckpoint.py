@@ -0,0 +1,75 @@
+#!/usr/bin/env python3.6
+
+import os
+import time
+import pickle
+
+from SimpleLogger import *
+
+class GenerationCheckpoint(object):
+	
+	# Periodically save a generator state to disk so an interrupted
+	# run can be resumed.
+	# The state is a dict given by the generator (random states, counters,
+	# deduplication content, writers offsets); it is pickled to a temporary
+	# file, then atomically renamed over the previous checkpoint.
+	CHECKPOINT_VERSION = 2
+	
+	def __init__(self, loggerObj, checkpointPath, intervalSeconds=60.0, runParameters=None):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+		
+		if ( (intervalSeconds is None) or (intervalSeconds <= 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "intervalSeconds must be greater than 0")
+		
+		self._path = checkpointPath
+		self._interval = intervalSeconds
+		self._lastSave = time.monotonic()
+		# Parameters that must match between the saved run and the resumed one
+		# (ex: number of letters, seed)
+		if (runParameters is None):
+			runParameters = {}
+		self._runParameters = runParameters
+	
+	
+	def getPath(self):
+		return self._path
+	
+	
+	def isDue(self):
+		return ((time.monotonic() - self._lastSave) >= self._interval)
+	
+	
+	def save(self, state):
+		content = {
+			"version"   : self.CHECKPOINT_VERSION,
+			"parameters": self._runParameters,
+			"state"     : state,
+		}
+		tmpPath = self._path + ".tmp"
+		with open(tmpPath, "wb") as tmpFile:
+			pickle.dump(content, tmpFile, protocol=pickle.HIGHEST_PROTOCOL)
+			tmpFile.flush()
+			os.fsync(tmpFile.fileno())
+		os.replace(tmpPath, self._path)
+		
+		self._lastSave = time.monotonic()
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Checkpoint saved to '" + str(self._path) + "'")
+	
+	
+	def load(self):
+		if ( (not os.path.exists(self._path)) or (not os.access(self._path, os.R_OK)) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Checkpoint '" + str(self._path) + "' does not exists or is not readable")
+		
+		with open(self._path, "rb") as checkpointFile:
+			content = pickle.load(checkpointFile)
+		
+		if (content.get("version") != self.CHECKPOINT_VERSION):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Checkpoint '" + str(self._path) + "' version " + str(content.get("version")) + " not supported")
+		
+		for name, value in self._runParameters.items():
+			if (content["parameters"].get(name) != value):
+				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Checkpoint parameter '" + str(name) + "' was '" + str(content["parameters"].get(name)) + "', now '" + str(value) + "'; resumed run will differ")
+		
+		return content["state"]
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3.6
+
+import sys
+import json
+import time
+
+from SimpleLogger import *
+
+class GeneratorMetrics(object):
+
+	# Counters and timers filled by SequenceGenerator while it runs
+	# The generator only calls these methods when it was given a metrics
+	# object, so a run without metrics pays nothing but a None check.
+	#
+	# Every progressInterval seconds (0: never) a progress line is printed:
+	# rate, and ETA against the sequences and storage limits.
+	# With statsOutputPath, every counter is saved as JSON at the end.
+
+	HOOK_NEW_SEQUENCE = "newSequence"
+	HOOK_NEW_WORD = "newWordInSequence"
+	HOOK_BETWEEN_WORDS = "betweenWordsInSequence"
+	HOOK_COMPLETE_SEQUENCE = "completeSequence"
+	HOOKS = (HOOK_NEW_SEQUENCE, HOOK_NEW_WORD, HOOK_BETWEEN_WORDS, HOOK_COMPLETE_SEQUENCE)
+
+	def __init__(self, loggerObj, progressInterval=0.0, statsOutputPath=None, target=sys.stderr):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (progressInterval < 0.0):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "progressInterval must be positive")
+		self._progressInterval = progressInterval
+		self._statsOutputPath = statsOutputPath
+		self._target = target
+
+		# Counters
+		self._wordsPicked = 0
+		self._sequencesWritten = 0
+		self._duplicatesRejected = 0
+		self._fuzzerOutputs = { hook : 0 for hook in self.HOOKS }
+		# Timers (seconds)
+		self._pickingTime = 0.0
+		self._fuzzingTime = { hook : 0.0 for hook in self.HOOKS }
+		self._writingTime = 0.0
+
+		# Limits, to compute the ETA
+		self._maxSequences = 0
+		self._maxBytes = 0
+		self._sequencesAtStart = 0
+		self._startTime = None
+		self._nextReportTime = None
+
+
+	def start(self, maximumNumberOfSequences, maximumBytes, sequencesAlreadyDone=0):
+		self._maxSequences = maximumNumberOfSequences
+		self._maxBytes = maximumBytes
+		self._sequencesAtStart = sequencesAlreadyDone
+		self._startTime = time.perf_counter()
+		if (self._progressInterval > 0.0):
+			self._nextReportTime = self._startTime + self._progressInterval
+
+
+	def addPicking(self, nbWords, seconds):
+		self._wordsPicked += nbWords
+		self._pickingTime += seconds
+
+
+	def addFuzzing(self, hook, nbOutputs, seconds):
+		self._fuzzerOutputs[hook] += nbOutputs
+		self._fuzzingTime[hook] += seconds
+
+
+	def addDuplicates(self, nbDuplicates):
+		self._duplicatesRejected += nbDuplicates
+
+
+	def addWriting(self, nbSequences, seconds):
+		self._sequencesWritten += nbSequences
+		self._writingTime += seconds
+
+
+	def _formatDuration(self, seconds):
+		if (seconds is None):
+			return "?"
+		seconds = int(seconds)
+		return str(seconds // 3600) + ":" + str((seconds // 60) % 60).zfill(2) + ":" + str(seconds % 60).zfill(2)
+
+
+	def getStats(self, storageUsed=0):
+		elapsedTime = time.perf_counter() - self._startTime
+		rate = self._sequencesWritten / max(elapsedTime, 1e-9)
+		bytesRate = storageUsed / max(elapsedTime, 1e-9)
+
+		# ETA: whichever limit is reached first
+		eta = None
+		if ( (rate > 0.0) and (self._maxSequences < sys.maxsize) ):
+			eta = (self._maxSequences - self._sequencesAtStart - self._sequencesWritten) / rate
+		if ( (bytesRate > 0.0) and (self._maxBytes < sys.maxsize) ):
+			storageEta = (self._maxBytes - storageUsed) / bytesRate
+			if ( (eta is None) or (storageEta < eta) ):
+				eta = storageEta
+
+		return {
+			"elapsedSeconds"    : elapsedTime,
+			"etaSeconds"        : (max(0.0, eta) if (eta is not None) else None),
+			"sequencesWritten"  : self._sequencesWritten,
+			"sequencesPerSecond": rate,
+			"storageUsed"       : storageUsed,
+			"wordsPicked"       : self._wordsPicked,
+			"duplicatesRejected": self._duplicatesRejected,
+			"fuzzerOutputs"     : dict(self._fuzzerOutputs),
+			"pickingSeconds"    : self._pickingTime,
+			"fuzzingSeconds"    : dict(self._fuzzingTime),
+			"writingSeconds"    : self._writingTime,
+		}
+
+
+	def report(self, storageUsed=0):
+		# Called once per generator iteration; prints when due
+		if ( (self._nextReportTime is None) or (time.perf_counter() < self._nextReportTime) ):
+			return
+		self._nextReportTime = time.perf_counter() + self._progressInterval
+		self.printProgress(storageUsed)
+
+
+	def printProgress(self, storageUsed=0):
+		stats = self.getStats(storageUsed)
+		line = "[" + self._formatDuration(stats["elapsedSeconds"]) + "] " + format(stats["sequencesWritten"], ",") + " sequence(s)"
+		if (self._maxSequences < sys.maxsize):
+			line += " / " + format(self._maxSequences - self._sequencesAtStart, ",")
+		line += ", " + format(stats["sequencesPerSecond"], ",.0f") + "/s"
+		line += ", " + format(storageUsed / (1024*1024), ",.1f") + " MB"
+		line += ", " + format(stats["duplicatesRejected"], ",") + " duplicate(s)"
+		line += ", ETA " + self._formatDuration(stats["etaSeconds"])
+		print(line, file=self._target, flush=True)
+
+
+	def finish(self, storageUsed=0):
+		stats = self.getStats(storageUsed)
+		if (self._progressInterval > 0.0):
+			self.printProgress(storageUsed)
+
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Time spent: picking " + format(stats["pickingSeconds"], ".2f") + "s, fuzzing " + format(sum(stats["fuzzingSeconds"].values()), ".2f") + "s, writing " + format(stats["writingSeconds"], ".2f") + "s")
+
+		if (self._statsOutputPath is not None):
+			with open(self._statsOutputPath, "w") as statsFile:
+				json.dump(stats, statsFile, indent=1)
+			self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Statistics saved to '" + str(self._statsOutputPath) + "'")
+		return stats
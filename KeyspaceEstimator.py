@@ -0,0 +1,203 @@
+#!/usr/bin/env python3.6
+
+import sys
+import math
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+from FuzzerController import *
+from SequenceEnumerator import *
+from LettersDistributionFrequency import *
+
+class KeyspaceEstimator(object):
+
+	# Estimate what a run can produce, without generating anything
+	#
+	# Dynamic programming over the number of letters:
+	#	count[t]  : number of ways to build t letters from dictionnary words
+	#	            (and fuzzers added characters)
+	#	mass[t]   : probability mass of the word-only sequences of t letters
+	#	square[t] : sum of squared probabilities (collision probability)
+	# built from prefixes: count[t] = sum(count[t-l] * nbWords(l)).
+	#
+	# Counts are number of constructions: strings spelled by several
+	# compositions are counted once per composition (upper bound).
+	# Probabilities follow SequenceEnumerator (and generator) model.
+	def __init__(self,
+		     loggerObj,
+		     dictionnaryLoaderObj,
+		     fuzzerObj,
+		     numberOfLetters,
+		     lettersDistributionFrequencyObj,
+		     topCandidates=10000):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (not isinstance(fuzzerObj, FuzzerController)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "fuzzerObj not of a FuzzerController instance!")
+		self._fuzzerCtrl = fuzzerObj
+
+		if ( (not isinstance(numberOfLetters, int)) or (numberOfLetters < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfLetters must be an integer greater or equal to 1")
+		self._nbLetters = numberOfLetters
+
+		if ( (not isinstance(topCandidates, int)) or (topCandidates < 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "topCandidates must be a positive integer")
+		self._topCandidates = topCandidates
+
+		# Enumerator gives us the usable lengths, probabilities and top candidates
+		self._enumerator = SequenceEnumerator(loggerObj=loggerObj,
+		                                      dictionnaryLoaderObj=dictionnaryLoaderObj,
+		                                      writerObj=None,
+		                                      numberOfLetters=numberOfLetters,
+		                                      lettersDistributionFrequencyObj=lettersDistributionFrequencyObj,
+		                                      maximumNumberOfSequences=1,
+		                                      maximumBytesSizeForAllSequences=1)
+
+
+	def _getFuzzersChoices(self, fuzzersList):
+		# List of (nb chars added, nb of different outputs) for each fuzzer
+		fuzzersChoices = []
+		for fuzzer in fuzzersList:
+			nbChoices = 1
+			if (hasattr(fuzzer, "getNumberOfFuzzingChoices")):
+				nbChoices = fuzzer.getNumberOfFuzzingChoices()
+			fuzzersChoices.append( (fuzzer.getNumberCharactersAdded(), nbChoices) )
+		return fuzzersChoices
+
+
+	def computeKeyspace(self):
+		# Return (word-only keyspace, keyspace with fuzzers)
+		nbLetters = self._nbLetters
+		usableLengths = self._enumerator.getUsableLengths()
+		bucketSizes = { length : len(self._enumerator.getWordProbabilities(length)) for length in usableLengths }
+
+		newWordFuzzers = self._getFuzzersChoices(self._fuzzerCtrl.getNewWordInSequenceFuzzers(nbLetters))
+		betweenFuzzers = self._getFuzzersChoices(self._fuzzerCtrl.getBetweenWordInSequenceFuzzers(nbLetters))
+
+		plainCount = [0] * (nbLetters + 1)
+		fuzzedCount = [0] * (nbLetters + 1)
+		plainCount[0] = 1
+
+		# First word (and new word hook)
+		for length in usableLengths:
+			fuzzedCount[length] += bucketSizes[length]
+			for (charsAdded, nbChoices) in newWordFuzzers:
+				if ( (length + charsAdded) <= nbLetters ):
+					fuzzedCount[length + charsAdded] += bucketSizes[length] * nbChoices
+
+		# Following words (and between words hook), by increasing prefix size
+		for prefixLen in range(1, nbLetters + 1):
+			for length in usableLengths:
+				total = prefixLen + length
+				if (total > nbLetters):
+					break
+				fuzzedCount[total] += fuzzedCount[prefixLen] * bucketSizes[length]
+				for (charsAdded, nbChoices) in betweenFuzzers:
+					if ( (total + charsAdded) <= nbLetters ):
+						fuzzedCount[total + charsAdded] += fuzzedCount[prefixLen] * bucketSizes[length] * nbChoices
+
+		for total in range(1, nbLetters + 1):
+			for length in usableLengths:
+				if (length > total):
+					break
+				plainCount[total] += plainCount[total - length] * bucketSizes[length]
+
+		return (plainCount[nbLetters], fuzzedCount[nbLetters])
+
+
+	def computeProbabilityMoments(self):
+		# Return (mass, squared mass) of word-only complete sequences;
+		# lengths are only drawn when they can be completed, so mass is 1.0
+		# (0.0 when nothing can be built)
+		nbLetters = self._nbLetters
+		usableLengths = self._enumerator.getUsableLengths()
+		lengthTable = self._enumerator.getLengthTable()
+		wordsSquare = { length : sum( (p * p) for p in self._enumerator.getWordProbabilities(length) ) for length in usableLengths }
+
+		# Indexed by letters left
+		mass = [0.0] * (nbLetters + 1)
+		square = [0.0] * (nbLetters + 1)
+		mass[0] = 1.0
+		square[0] = 1.0
+		for lettersLeft in range(1, nbLetters + 1):
+			for length in lengthTable.getLengthsForBudget(lettersLeft):
+				lengthProbability = lengthTable.getLengthProbability(length, lettersLeft)
+				mass[lettersLeft] += lengthProbability * mass[lettersLeft - length]
+				square[lettersLeft] += (lengthProbability ** 2) * wordsSquare[length] * square[lettersLeft - length]
+
+		return (mass[nbLetters], square[nbLetters])
+
+
+	@staticmethod
+	def _probabilityDrawnOnce(probability, nbSamples):
+		# 1 - (1-p)^N, accurate for tiny p
+		if (probability >= 1.0):
+			return 1.0
+		return -math.expm1(nbSamples * math.log1p(-probability))
+
+
+	def estimate(self, nbSamples):
+		(plainKeyspace, fuzzedKeyspace) = self.computeKeyspace()
+		(mass, square) = self.computeProbabilityMoments()
+
+		result = {
+			"wordOnlyKeyspace"   : plainKeyspace,
+			"keyspaceWithFuzzers": fuzzedKeyspace,
+			"completedMass"      : mass,
+			"samples"            : nbSamples,
+			"topCandidates"      : 0,
+			"topCandidatesMass"  : 0.0,
+			"expectedDistinct"   : 0.0,
+			"duplicateRate"      : 0.0,
+		}
+		if ( (plainKeyspace == 0) or (mass <= 0.0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "No sequence of " + str(self._nbLetters) + " letters can be built!")
+			return result
+
+		# Head: exact, from the most probable candidates
+		# (probabilities are conditioned on the draw completing)
+		headCount = 0
+		headMass = 0.0
+		headSquare = 0.0
+		expectedDistinct = 0.0
+		if (self._topCandidates > 0):
+			for (sequence, probability) in self._enumerator.iterateCandidates():
+				probability = probability / mass
+				headCount += 1
+				headMass += probability
+				headSquare += probability * probability
+				expectedDistinct += self._probabilityDrawnOnce(probability, nbSamples)
+				if (headCount >= self._topCandidates):
+					break
+
+		# Tail: spread remaining mass over an "effective" number of candidates
+		# matching its collision probability (mass^2 / sum(p^2))
+		tailMass = max(0.0, 1.0 - headMass)
+		tailSquare = max(0.0, (square / (mass * mass)) - headSquare)
+		tailCount = plainKeyspace - headCount
+		if ( (tailMass > 0.0) and (tailCount > 0) ):
+			effectiveTailCount = tailCount
+			if (tailSquare > 0.0):
+				effectiveTailCount = min(tailCount, (tailMass * tailMass) / tailSquare)
+			expectedDistinct += effectiveTailCount * self._probabilityDrawnOnce(tailMass / effectiveTailCount, nbSamples)
+
+		result["topCandidates"] = headCount
+		result["topCandidatesMass"] = headMass
+		result["expectedDistinct"] = expectedDistinct
+		result["duplicateRate"] = 1.0 - (expectedDistinct / nbSamples)
+		return result
+
+
+	def printEstimate(self, nbSamples, target=sys.stdout):
+		result = self.estimate(nbSamples)
+		print("Letters                    : " + str(self._nbLetters), file=target)
+		print("Keyspace (words only)      : " + str(result["wordOnlyKeyspace"]), file=target)
+		print("Keyspace (with fuzzers)    : " + str(result["keyspaceWithFuzzers"]), file=target)
+		print("Draws completing a sequence: " + format(result["completedMass"], ".6f"), file=target)
+		print("Top " + str(result["topCandidates"]) + " candidates mass : " + format(result["topCandidatesMass"], ".6f"), file=target)
+		print("Samples                    : " + str(nbSamples), file=target)
+		print("Expected distinct          : " + format(result["expectedDistinct"], ".1f"), file=target)
+		print("Expected duplicate rate    : " + format(result["duplicateRate"], ".6f"), file=target)
+		return result
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3.6
+
+from SimpleLogger import *
+from WeightedSampler import *
+from DictionnaryLoader import *
+from LettersDistributionFrequency import *
+
+class LengthCompositionTable(object):
+
+	# Word length model shared by the generator, enumerator, estimator and
+	# NumPy sampler
+	#
+	# A length is usable when its frequency is > 0 and its dictionnary
+	# bucket has words. For every budget of letters left (0..numberOfLetters):
+	#	_completable[budget]: budget can be spelled exactly with usable lengths
+	#	_samplers[budget]   : usable lengths that fit AND leave a completable
+	#	                      budget, weighted by their frequency
+	# built by dynamic programming on the budget. Picking a length is then a
+	# single draw: no rejection, and every draw can be completed.
+	#
+	# P(length | budget) is the frequency renormalized over that restricted
+	# set. Budgets that can't be completed (only reachable when fuzzers add
+	# characters) have no sampler: the sequence is a dead end. Users check
+	# isCompletable(numberOfLetters) to know if anything can be built at all.
+
+	def __init__(self, loggerObj, dictionnaryLoaderObj, lettersDistributionFrequencyObj, numberOfLetters):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (not isinstance(dictionnaryLoaderObj, DictionnaryLoader)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "dictionnaryLoaderObj not of a DictionnaryLoader instance!")
+		if (not isinstance(lettersDistributionFrequencyObj, LettersDistributionFrequency)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "lettersDistributionSample not of a LettersDistributionFrequency instance!")
+		if ( (not isinstance(numberOfLetters, int)) or (numberOfLetters < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfLetters must be an integer greater or equal to 1")
+		self._nbLetters = numberOfLetters
+
+		self._lengthFrequency = {}
+		for length, frequency in lettersDistributionFrequencyObj.getDistributionDict().items():
+			if ( (length <= 0) or (length > numberOfLetters) or (frequency <= 0.0) ):
+				continue
+			if (sum(dictionnaryLoaderObj.getPatternDictForLength(length).values()) <= 0.0):
+				continue
+			self._lengthFrequency[length] = frequency
+		self._usableLengths = sorted(self._lengthFrequency.keys())
+
+		self._completable = [False] * (numberOfLetters + 1)
+		self._completable[0] = True
+		self._lengths = [()] * (numberOfLetters + 1)
+		self._totalFrequency = [0.0] * (numberOfLetters + 1)
+		self._samplers = [None] * (numberOfLetters + 1)
+		for budget in range(1, numberOfLetters + 1):
+			lengths = tuple( length for length in self._usableLengths if ( (length <= budget) and (self._completable[budget - length]) ) )
+			if (len(lengths) == 0):
+				continue
+			frequencies = [ self._lengthFrequency[length] for length in lengths ]
+			self._completable[budget] = True
+			self._lengths[budget] = lengths
+			self._totalFrequency[budget] = sum(frequencies)
+			self._samplers[budget] = WeightedSampler(lengths, frequencies)
+
+
+	def getNumberOfLetters(self):
+		return self._nbLetters
+
+
+	def getUsableLengths(self):
+		return self._usableLengths
+
+
+	def isCompletable(self, budget):
+		return ( (0 <= budget <= self._nbLetters) and (self._completable[budget]) )
+
+
+	def getLengthsForBudget(self, budget):
+		# Usable lengths that can be drawn with this budget, increasing order
+		if (not self.isCompletable(budget)):
+			return ()
+		return self._lengths[budget]
+
+
+	def getLengthProbability(self, length, budget):
+		# P(length | budget); 0.0 if length can't be drawn with that budget
+		if ( (not self.isCompletable(budget)) or (length > budget) or (length not in self._lengthFrequency) or (not self._completable[budget - length]) ):
+			return 0.0
+		return self._lengthFrequency[length] / self._totalFrequency[budget]
+
+
+	def getSampler(self, budget):
+		# WeightedSampler over getLengthsForBudget(budget), or None (dead end)
+		if (not self.isCompletable(budget)):
+			return None
+		return self._samplers[budget]
@@ -40,19 +40,18 @@ class LettersDistributionFrequency(object):
 		     (not os.access(csvPath, os.R_OK) ) ):
 			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "File '" + str(csvPath) + "' does not exists or is not readable")
 		
-		csvfile = open(csvPath, "r")
-		if (csvfile is None):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Error while opening path '" + str(csvPath) + "'")
+		# Small file (one row per length): read it all and close it
+		with open(csvPath, "r") as csvfile:
+			rows = list(csv.reader(csvfile, delimiter=','))
 		
-		reader = csv.reader(csvfile, delimiter=',')
 		# A row is expected to be a list [percent, number]
-		for row in reader:
+		for row in rows:
 			
 			# Make sure we are dealing with int
 			try:
 				number = int(row[1])
 			except ValueError as err:
-				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Read value '" + str(row[1]) + "' is not a recognized integer!")
+				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Read value '%s' is not a recognized integer!", row[1])
 				# If we didn't raise, skip that and continue forward
 				continue
 			
@@ -62,18 +61,18 @@ class LettersDistributionFrequency(object):
 				if ( (probability < 0.0) or (probability > 1.0) ):
 					raise ValueError("Not a recognized percentage (0.0 to 1.0) !")
 			except ValueError as err:
-				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Probability '" + str(probability) + "' for pattern '" + pattern + "' is not a recognized float OR is not between 0.0 and 1.0!")
+				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Probability '%s' for pattern '%s' is not a recognized float OR is not between 0.0 and 1.0!", row[0], number)
 				# Bad value / bad type, move on
 				continue
 			
 			# Duplicate not accepted unless "allowDuplicate" flag is on
 			if (number in letterProbabilityDistribution):
 				if (self._duplicateOk is False):
-					self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Pattern '" + pattern + "' already defined in pattern list!")
+					self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Pattern '%s' already defined in pattern list!", number)
 					# Duplicated : skip
 					continue
 				else:
-					self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Found duplicate pattern '" + pattern + "', replacing existing")
+					self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Found duplicate pattern '%s', replacing existing", number)
 			
 			# Assign number:prob to the dict
 			letterProbabilityDistribution[number] = probability
@@ -85,6 +84,9 @@ class LettersDistributionFrequency(object):
 	def getDistributionDict(self):
 		return self._probabilityLetterList
 	
+	def setDistributionDict(self, distributionDict):
+		self._probabilityLetterList = dict(distributionDict)
+	
 	def getLettersList(self):
 		return list(self._probabilityLetterList.keys())
 	
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3.6
+
+import array
+import random
+import bisect
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+
+class MarkovBatchSampler(object):
+
+	# Character level Markov chain trained on the dictionnary patterns
+	#
+	# Every pattern adds its probability to the transitions it contains:
+	# the next character (or the end of the word) following each context of
+	# the `order` previous characters. Words are padded with START so the
+	# first characters have a context too. A sequence is built character by
+	# character; when END is drawn a new word starts, until numberOfLetters
+	# characters are produced (the last word may be cut).
+	#
+	# Same interface as NumpyBatchSampler, so SequenceGenerator uses it as a
+	# batched backend (new word and between words fuzzers are not applied).
+	#
+	# Transitions are frozen in flat arrays, one row per context:
+	#	_contexts[context]           : row index
+	#	_rowStarts[row]..[row+1]     : slice of the row transitions
+	#	_nextChars[i], _cumWeights[i]: next character, cumulative weight in the row
+	# Every context reachable while sampling has a row, so there are no dead
+	# ends and no back off is needed.
+
+	START = "\0"
+	END = "\0"
+
+	def __init__(self, loggerObj, dictionnaryLoaderObj, numberOfLetters, order=3, seed=None):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (not isinstance(dictionnaryLoaderObj, DictionnaryLoader)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "dictionnaryLoaderObj not of a DictionnaryLoader instance!")
+		if ( (not isinstance(numberOfLetters, int)) or (numberOfLetters < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfLetters must be an integer greater or equal to 1")
+		if ( (not isinstance(order, int)) or (order < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "order must be an integer greater or equal to 1")
+		self._nbLetters = numberOfLetters
+		self._order = order
+		self._startContext = self.START * order
+
+		self._random = random.Random()
+		self.setSeed(seed)
+
+		self._train(dictionnaryLoaderObj)
+
+
+	def _train(self, dictionnaryLoaderObj):
+		# context -> { next character : summed probability }
+		transitions = {}
+		nbPatterns = 0
+		for length in dictionnaryLoaderObj.getPatternLengths():
+			for (pattern, probability) in dictionnaryLoaderObj.getPatternDictForLength(length).items():
+				if ( (length <= 0) or (probability <= 0.0) or (self.START in pattern) ):
+					continue
+				nbPatterns += 1
+				paddedPattern = self._startContext + pattern
+				for index in range(len(pattern)):
+					context = paddedPattern[index:index+self._order]
+					nextChars = transitions.setdefault(context, {})
+					nextChars[pattern[index]] = nextChars.get(pattern[index], 0.0) + probability
+				nextChars = transitions.setdefault(paddedPattern[-self._order:], {})
+				nextChars[self.END] = nextChars.get(self.END, 0.0) + probability
+
+		if (self._startContext not in transitions):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "No pattern to train the Markov chain on!")
+
+		# Freeze in flat arrays; contexts sorted so the layout is reproducible
+		self._contexts = {}
+		self._rowStarts = array.array("I", [0])
+		nextCharsList = []
+		self._cumWeights = array.array("d")
+		for context in sorted(transitions):
+			self._contexts[context] = len(self._contexts)
+			cumWeight = 0.0
+			for (nextChar, weight) in sorted(transitions[context].items()):
+				cumWeight += weight
+				nextCharsList.append(nextChar)
+				self._cumWeights.append(cumWeight)
+			self._rowStarts.append(len(self._cumWeights))
+		self._nextChars = "".join(nextCharsList)
+
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Markov chain of order %d trained on %d pattern(s): %d context(s), %d transition(s)", self._order, nbPatterns, len(self._contexts), len(self._nextChars))
+
+
+	def getOrder(self):
+		return self._order
+
+
+	def getNumberOfContexts(self):
+		return len(self._contexts)
+
+
+	def getMemoryUsage(self):
+		# Arrays only; the context dictionnary is not counted
+		return (self._rowStarts.itemsize * len(self._rowStarts)) + (self._cumWeights.itemsize * len(self._cumWeights)) + len(self._nextChars.encode("utf-32-le"))
+
+
+	def setSeed(self, seed):
+		# Same derivation as the other components: seed + component name
+		if (seed is None):
+			self._random.seed()
+		else:
+			self._random.seed(str(seed) + ":MarkovBatchSampler")
+
+
+	def getState(self):
+		return self._random.getstate()
+
+
+	def setState(self, state):
+		self._random.setstate(state)
+
+
+	def sampleBatch(self, batchSize):
+		# Locals: this is the generation inner loop
+		contexts = self._contexts
+		rowStarts = self._rowStarts
+		nextChars = self._nextChars
+		cumWeights = self._cumWeights
+		randomFloat = self._random.random
+		bisectRight = bisect.bisect_right
+		startContext = self._startContext
+		end = self.END
+		nbLetters = self._nbLetters
+
+		sequences = []
+		for sequenceIndex in range(batchSize):
+			chars = []
+			context = startContext
+			while (len(chars) < nbLetters):
+				row = contexts[context]
+				(lo, hi) = (rowStarts[row], rowStarts[row+1] - 1)
+				# "hi" excludes the last element: protects against float rounding
+				nextChar = nextChars[bisectRight(cumWeights, randomFloat() * cumWeights[hi], lo, hi)]
+				if (nextChar == end):
+					context = startContext
+				else:
+					chars.append(nextChar)
+					context = context[1:] + nextChar
+			sequences.append("".join(chars))
+		return sequences
+
+
+if __name__ == '__main__':
+
+	import time
+
+	myLogger = SimpleLogger(defaultLevel=SimpleLoggerLevel.INFO,
+	                        printOnStderrLevel=SimpleLoggerLevel.WARNING,
+	                        throwOnLevel=SimpleLoggerLevel.CRITICAL)
+
+	myWords = DictionnaryLoader(loggerObj=myLogger)
+	myWords.setPatternDictForLength(5, { "hello": 0.4, "world": 0.3, "horse": 0.2, "worse": 0.1 })
+	myWords.setPatternDictForLength(4, { "help": 0.5, "hold": 0.5 })
+
+	mySampler = MarkovBatchSampler(myLogger, myWords, 10, order=2, seed=1)
+	print(mySampler.sampleBatch(10))
+
+	start = time.perf_counter()
+	nbSampled = len(mySampler.sampleBatch(100000))
+	print(format(nbSampled / (time.perf_counter() - start), ".0f") + " sequences/s")
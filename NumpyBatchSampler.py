@@ -0,0 +1,183 @@
+#!/usr/bin/env python3.6
+
+import hashlib
+import functools
+
+# NumPy is optional: without it, the generator keeps the pure-Python path
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+from LettersDistributionFrequency import *
+from LengthCompositionTable import *
+
+class NumpyBatchSampler(object):
+
+	# Draw whole batches of sequences at once with NumPy
+	#
+	# Instead of one random.choices() per word, every step draws the lengths
+	# of all unfinished sequences of the batch, grouped by letters left, then
+	# the words of each length, grouped by length. Cumulative probabilities
+	# are computed once here and searched with numpy.searchsorted().
+	#
+	# Same model as SequenceGenerator._pickWord: length drawn from the
+	# LengthCompositionTable of the letters left (lengths that fit and can
+	# still be completed), word drawn from the bucket of that length. Every
+	# sequence of the batch is completed.
+
+	@staticmethod
+	def isAvailable():
+		return (numpy is not None)
+
+
+	@staticmethod
+	def _seedToInt(seed):
+		# NumPy wants an integer; derive one from any seed (and this component name)
+		if (seed is None):
+			return None
+		return int.from_bytes(hashlib.sha256((str(seed) + ":NumpyBatchSampler").encode("utf-8")).digest()[:16], "little")
+
+
+	def __init__(self, loggerObj, dictionnaryLoaderObj, lettersDistributionFrequencyObj, numberOfLetters, seed=None):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (numpy is None):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "NumpyBatchSampler requires numpy, which is not installed")
+
+		if (not isinstance(dictionnaryLoaderObj, DictionnaryLoader)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "dictionnaryLoaderObj not of a DictionnaryLoader instance!")
+		if (not isinstance(lettersDistributionFrequencyObj, LettersDistributionFrequency)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "lettersDistributionSample not of a LettersDistributionFrequency instance!")
+		if ( (not isinstance(numberOfLetters, int)) or (numberOfLetters < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfLetters must be an integer greater or equal to 1")
+		self._nbLetters = numberOfLetters
+
+		self._rng = numpy.random.default_rng(self._seedToInt(seed))
+
+		lengthTable = LengthCompositionTable(loggerObj=self._logger,
+		                                     dictionnaryLoaderObj=dictionnaryLoaderObj,
+		                                     lettersDistributionFrequencyObj=lettersDistributionFrequencyObj,
+		                                     numberOfLetters=numberOfLetters)
+		if (not lengthTable.isCompletable(numberOfLetters)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "No combination of word lengths gives " + str(numberOfLetters) + " letters!")
+
+		# Per length bucket:
+		#	_words[length]      : numpy object array of the words
+		#	_wordsCumProb[length]: cumulative probabilities (last is 1.0)
+		self._words = {}
+		self._wordsCumProb = {}
+		for length in lengthTable.getUsableLengths():
+			patternDict = dictionnaryLoaderObj.getPatternDictForLength(length)
+			weights = numpy.fromiter(patternDict.values(), dtype=numpy.float64, count=len(patternDict))
+			self._words[length] = numpy.array(list(patternDict.keys()), dtype=object)
+			self._wordsCumProb[length] = numpy.cumsum(weights / weights.sum())
+
+		# Per letters left (1..numberOfLetters), from the length table:
+		#	_lengths[left]       : lengths that can be drawn
+		#	_lengthsCumProb[left]: their cumulative probabilities
+		self._lengths = [None] * (numberOfLetters + 1)
+		self._lengthsCumProb = [None] * (numberOfLetters + 1)
+		for lettersLeft in range(1, numberOfLetters + 1):
+			lengths = lengthTable.getLengthsForBudget(lettersLeft)
+			if (len(lengths) == 0):
+				continue
+			probabilities = numpy.array([ lengthTable.getLengthProbability(length, lettersLeft) for length in lengths ], dtype=numpy.float64)
+			self._lengths[lettersLeft] = numpy.array(lengths, dtype=numpy.int64)
+			self._lengthsCumProb[lettersLeft] = numpy.cumsum(probabilities)
+
+
+	def setSeed(self, seed):
+		self._rng = numpy.random.default_rng(self._seedToInt(seed))
+
+
+	def getState(self):
+		return self._rng.bit_generator.state
+
+
+	def setState(self, state):
+		self._rng.bit_generator.state = state
+
+
+	def _draw(self, cumProb, size):
+		# Index drawn from cumulative probabilities; clip protects float rounding
+		indexes = numpy.searchsorted(cumProb, self._rng.random(size), side="right")
+		return numpy.minimum(indexes, len(cumProb) - 1)
+
+
+	def sampleBatch(self, batchSize):
+		lettersLeft = numpy.full(batchSize, self._nbLetters, dtype=numpy.int64)
+		stepsWords = []
+
+		while (True):
+			pending = (lettersLeft > 0)
+			if (not pending.any()):
+				break
+
+			stepLengths = numpy.zeros(batchSize, dtype=numpy.int64)
+			for left in numpy.unique(lettersLeft[pending]):
+				# Every reachable letters left can be completed: no dead end
+				rows = numpy.nonzero(pending & (lettersLeft == left))[0]
+				stepLengths[rows] = self._lengths[left][self._draw(self._lengthsCumProb[left], len(rows))]
+
+			stepWords = numpy.full(batchSize, "", dtype=object)
+			for length in numpy.unique(stepLengths[stepLengths > 0]):
+				rows = numpy.nonzero(stepLengths == length)[0]
+				stepWords[rows] = self._words[length][self._draw(self._wordsCumProb[length], len(rows))]
+
+			stepsWords.append(stepWords)
+			lettersLeft = lettersLeft - stepLengths
+
+		if (len(stepsWords) == 0):
+			return []
+		# Element-wise string concatenation of every step
+		sequences = functools.reduce(numpy.add, stepsWords)
+		return sequences.tolist()
+
+
+if __name__ == '__main__':
+
+	import time
+	import random
+	import string
+
+	myLogger = SimpleLogger(defaultLevel=SimpleLoggerLevel.INFO,
+	                        printOnStderrLevel=SimpleLoggerLevel.WARNING,
+	                        throwOnLevel=SimpleLoggerLevel.CRITICAL)
+
+	# Synthetic dictionnary: up to 50000 random words per length 1..10
+	myWords = DictionnaryLoader(loggerObj=myLogger)
+	for length in range(1, 11):
+		myWords.setPatternDictForLength(length, { "".join(random.choices(string.ascii_lowercase, k=length)) : random.random() for index in range(50000) })
+	myFrequency = LettersDistributionFrequency(loggerObj=myLogger)
+	nbLetters = 12
+	nbSequences = 200000
+
+	# Pure-Python path (same draws as SequenceGenerator._pickWord: one
+	# length from the composition table, one word of that length)
+	myTable = LengthCompositionTable(myLogger, myWords, myFrequency, nbLetters)
+	myRandom = random.Random(1)
+	myWords.freezeSamplers()
+	start = time.perf_counter()
+	for i in range(nbSequences):
+		sequence = ""
+		left = nbLetters
+		while (left > 0):
+			length = myTable.getSampler(left).pick(myRandom)
+			sequence += myWords.getSamplerForLength(length).pick(myRandom)
+			left -= length
+	pythonRate = nbSequences / (time.perf_counter() - start)
+
+	mySampler = NumpyBatchSampler(myLogger, myWords, myFrequency, nbLetters, seed=1)
+	start = time.perf_counter()
+	nbSampled = 0
+	while (nbSampled < nbSequences):
+		nbSampled += len(mySampler.sampleBatch(10000))
+	numpyRate = nbSampled / (time.perf_counter() - start)
+
+	print("python : " + format(pythonRate, ".0f") + " sequences/s")
+	print("numpy  : " + format(numpyRate, ".0f") + " sequences/s (x" + format(numpyRate / pythonRate, ".1f") + ")")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3.6
+
+import os
+import sys
+import queue
+import random
+import multiprocessing
+
+from SimpleLogger import *
+from WriterController import *
+from Writers.QueueWriter import *
+
+class ParallelSequenceGenerator(object):
+	
+	# Run several SequenceGenerator in forked processes
+	#
+	# Loaded dictionnaries / letters frequency are created BEFORE the fork
+	# and are shared (copy-on-write) by all workers; nothing is re-parsed.
+	#
+	# Two output modes:
+	#	merge : workers send their sequences to the parent process through a
+	#	        bounded queue; the parent deduplicates them globally, enforces
+	#	        the limits and writes through the configured writers.
+	#	shard : each worker writes to its own writers (ex: one file per worker)
+	#	        with an even share of the limits. Duplicates across shards
+	#	        are possible.
+	OUTPUT_MERGE = "merge"
+	OUTPUT_SHARD = "shard"
+	
+	# Batches waiting in the queue, per worker
+	QUEUE_BATCHES_PER_WORKER = 4
+	
+	def __init__(self,
+		     loggerObj,
+		     generatorFactory,
+		     numberOfWorkers,
+		     outputMode=OUTPUT_MERGE,
+		     writerObj=None,
+		     writerFactory=None,
+		     deduplicatorObj=None,
+		     maximumNumberOfSequences=0,
+		     maximumBytesSizeForAllSequences=0):
+		# generatorFactory(workerIndex, writerObj, maxSequences, maxBytes, stopEventObj)
+		#	return a SequenceGenerator to run in the worker process
+		# writerFactory(workerIndex)
+		#	return a WriterController for that worker (shard mode only)
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+		
+		if ( (not isinstance(numberOfWorkers, int)) or (numberOfWorkers < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfWorkers must be an integer greater or equal to 1")
+		self._nbWorkers = numberOfWorkers
+		
+		self._generatorFactory = generatorFactory
+		
+		if (outputMode == self.OUTPUT_MERGE):
+			if (not isinstance(writerObj, WriterController)):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "writerObj not of a WriterController instance!")
+			if (deduplicatorObj is None):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "deduplicatorObj is required in '" + self.OUTPUT_MERGE + "' mode!")
+		elif (outputMode == self.OUTPUT_SHARD):
+			if (writerFactory is None):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "writerFactory is required in '" + self.OUTPUT_SHARD + "' mode!")
+		else:
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unknown output mode '" + str(outputMode) + "'")
+		self._outputMode = outputMode
+		self._writer = writerObj
+		self._writerFactory = writerFactory
+		self._deduplicator = deduplicatorObj
+		
+		self._maxNbSequence = maximumNumberOfSequences
+		self._maxSizeBytes = maximumBytesSizeForAllSequences
+		
+		# Workers share everything loaded by the parent through fork()
+		try:
+			self._context = multiprocessing.get_context("fork")
+		except ValueError as err:
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Parallel generation requires the 'fork' start method, not available on this platform")
+	
+	
+	@staticmethod
+	def getShardPath(filepath, workerIndex):
+		# "out.txt" -> "out.w01.txt"
+		(root, ext) = os.path.splitext(filepath)
+		return root + ".w" + str(workerIndex + 1).zfill(2) + ext
+	
+	
+	def _splitLimit(self, limit, workerIndex):
+		# Even share of a global limit; first workers get the remainder
+		# No limit (sys.maxsize) stays no limit
+		if (limit >= sys.maxsize):
+			return limit
+		share = limit // self._nbWorkers
+		if (workerIndex < (limit % self._nbWorkers)):
+			share = share + 1
+		return share
+	
+	
+	def _runWorker(self, workerIndex, queueObj, stopEventObj):
+		# Running in the forked process from here
+		# The global random state is a copy of the parent one: reseed it so
+		# each worker get its own independent stream
+		random.seed()
+		
+		exitCode = 0
+		try:
+			if (self._outputMode == self.OUTPUT_MERGE):
+				writerCtrl = WriterController(loggerObj=self._logger)
+				writerCtrl.addWriter(QueueWriter(loggerObj=self._logger, queueObj=queueObj, workerIndex=workerIndex))
+				# Parent process enforces the limits
+				maxSequences = self._maxNbSequence
+				maxBytes = self._maxSizeBytes
+			else:
+				writerCtrl = self._writerFactory(workerIndex)
+				maxSequences = self._splitLimit(self._maxNbSequence, workerIndex)
+				maxBytes = self._splitLimit(self._maxSizeBytes, workerIndex)
+			
+			if ( (maxSequences > 0) and (maxBytes > 0) ):
+				generator = self._generatorFactory(workerIndex, writerCtrl, maxSequences, maxBytes, stopEventObj)
+				generator.generateSequences()
+			else:
+				writerCtrl.close()
+		except Exception as err:
+			sys.stderr.write("Worker " + str(workerIndex) + " failed: " + str(err) + "\n")
+			exitCode = 1
+		finally:
+			# Make sure everything reach the parent before exiting
+			# (os._exit() does not run the logger exit flush)
+			self._logger.flush()
+			if (queueObj is not None):
+				queueObj.close()
+				queueObj.join_thread()
+		
+		os._exit(exitCode)
+	
+	
+	def _mergeResults(self, queueObj, stopEventObj, processes):
+		
+		sequencesLeft = self._maxNbSequence
+		if (self._maxSizeBytes < sys.maxsize):
+			self._writer.setStorageLimit(self._maxSizeBytes)
+		workersRunning = len(processes)
+		
+		while (workersRunning > 0):
+			try:
+				(workerIndex, wordsList) = queueObj.get(timeout=1.0)
+			except queue.Empty:
+				# Make sure a dead worker does not block us forever
+				workersRunning = len([ process for process in processes if process.is_alive() ])
+				if (workersRunning == 0):
+					break
+				continue
+			
+			if (wordsList is None):
+				workersRunning = workersRunning - 1
+				continue
+			
+			# Once limits are reached, keep draining so workers do not
+			# block on a full queue while stopping
+			if ( (sequencesLeft <= 0) or (not self._writer.hasStorageLeft()) ):
+				continue
+			
+			newSequences = []
+			for sequence in wordsList:
+				if ( (sequencesLeft <= 0) or (not self._writer.hasStorageLeft()) ):
+					break
+				# Recorded as seen only once the writers accepted it
+				if ( (sequence not in self._deduplicator) and (self._writer.reserve(sequence)) ):
+					self._deduplicator.add(sequence)
+					newSequences.append(sequence)
+					sequencesLeft = sequencesLeft - 1
+			
+			# Storage refused: written anyway, writers may find room again
+			if ( (len(newSequences) > 0) or (not self._writer.hasStorageLeft()) ):
+				self._writer.write(newSequences)
+			
+			if ( (sequencesLeft <= 0) or (not self._writer.hasStorageLeft()) ):
+				self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Limits reached; stopping workers")
+				stopEventObj.set()
+		
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Merged " + str(self._maxNbSequence - sequencesLeft) + " sequence(s); deduplication using " + str(self._deduplicator.getMemoryUsage()) + " bytes")
+		self._writer.close()
+	
+	
+	def generateSequences(self):
+		
+		stopEventObj = self._context.Event()
+		queueObj = None
+		if (self._outputMode == self.OUTPUT_MERGE):
+			queueObj = self._context.Queue(maxsize=(self._nbWorkers * self.QUEUE_BATCHES_PER_WORKER))
+		else:
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Shard output: duplicates across the " + str(self._nbWorkers) + " shards are NOT removed")
+		
+		# Buffered log lines would otherwise be copied into every worker
+		self._logger.flush()
+		processes = []
+		for workerIndex in range(self._nbWorkers):
+			process = self._context.Process(target=self._runWorker, args=(workerIndex, queueObj, stopEventObj))
+			process.start()
+			processes.append(process)
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Started " + str(self._nbWorkers) + " worker(s) in '" + self._outputMode + "' mode")
+		
+		if (self._outputMode == self.OUTPUT_MERGE):
+			self._mergeResults(queueObj, stopEventObj, processes)
+		
+		failedWorkers = 0
+		for process in processes:
+			process.join()
+			if (process.exitcode != 0):
+				failedWorkers = failedWorkers + 1
+		
+		if (failedWorkers > 0):
+			self._logger.printMessage(self, SimpleLoggerLevel.ERROR, str(failedWorkers) + " worker(s) failed!")
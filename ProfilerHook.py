@@ -0,0 +1,125 @@
+#!/usr/bin/env python3.6
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+
+from SimpleLogger import *
+
+class ProfilerHook(object):
+
+	# Run the generation under cProfile and save the result
+	#	<outputPath>      : raw pstats file (python -m pstats <outputPath>)
+	#	<outputPath>.txt  : hot functions summary, also printed on stderr
+	#
+	# With maximumDuration (seconds, 0: no limit), getStopEvent() is set
+	# once the duration is elapsed; generators given this event stop at
+	# their next iteration. Bound the number of sequences with -m as usual.
+	#
+	# Fuzzer plugins are grouped by hook (their Fuzzers/ sub directory), so
+	# the summary shows which plugin burns CPU.
+	# Only the calling thread is profiled (not writer threads nor workers).
+
+	FUZZERS_DIRECTORY = "Fuzzers"
+	FUZZER_ENTRY_POINT = "applyFuzzing"
+
+	def __init__(self, loggerObj, outputPath, maximumDuration=0.0, topFunctions=25, target=sys.stderr):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (maximumDuration < 0.0):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumDuration must be positive")
+		if ( (not isinstance(topFunctions, int)) or (topFunctions < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "topFunctions must be an integer greater or equal to 1")
+
+		self._outputPath = outputPath
+		self._maxDuration = maximumDuration
+		self._topFunctions = topFunctions
+		self._target = target
+		self._stopEvent = threading.Event()
+
+
+	def getStopEvent(self):
+		return self._stopEvent
+
+
+	def getSummaryPath(self):
+		return self._outputPath + ".txt"
+
+
+	def run(self, function, *args):
+		timer = None
+		if (self._maxDuration > 0.0):
+			timer = threading.Timer(self._maxDuration, self._stopEvent.set)
+			timer.daemon = True
+			timer.start()
+
+		profiler = cProfile.Profile()
+		startTime = time.perf_counter()
+		try:
+			result = profiler.runcall(function, *args)
+		finally:
+			elapsedTime = time.perf_counter() - startTime
+			if (timer is not None):
+				timer.cancel()
+			profiler.create_stats()
+			self._saveResults(profiler, elapsedTime)
+		return result
+
+
+	def getFuzzerTimes(self, stats):
+		# { hook : { plugin : [calls, selfSeconds, cumulativeSeconds] } }
+		# Cumulative time is the one of the plugin entry point (applyFuzzing)
+		fuzzerTimes = {}
+		for ( (filename, lineNumber, functionName), (primitiveCalls, nbCalls, selfTime, cumulativeTime, callers) ) in stats.stats.items():
+			pathParts = os.path.normpath(filename).split(os.sep)
+			if ( (len(pathParts) < 3) or (pathParts[-3] != self.FUZZERS_DIRECTORY) ):
+				continue
+			(hook, plugin) = (pathParts[-2], os.path.splitext(pathParts[-1])[0])
+			if (plugin == "__init__"):
+				continue
+			times = fuzzerTimes.setdefault(hook, {}).setdefault(plugin, [0, 0.0, 0.0])
+			times[1] += selfTime
+			if (functionName == self.FUZZER_ENTRY_POINT):
+				times[0] += nbCalls
+				times[2] += cumulativeTime
+		return fuzzerTimes
+
+
+	def _formatSummary(self, stats, elapsedTime):
+		summary = io.StringIO()
+		summary.write("Profiled " + format(elapsedTime, ".2f") + "s\n")
+
+		summary.write("\nFuzzer plugins, by hook:\n")
+		fuzzerTimes = self.getFuzzerTimes(stats)
+		if (len(fuzzerTimes) == 0):
+			summary.write("\t(no fuzzer called)\n")
+		for hook in sorted(fuzzerTimes):
+			for (plugin, (nbCalls, selfTime, cumulativeTime)) in sorted(fuzzerTimes[hook].items(), key=lambda item: -item[1][2]):
+				summary.write("\t" + hook + "/" + plugin + ": " + str(nbCalls) + " call(s), " + format(cumulativeTime, ".3f") + "s total, " + format(selfTime, ".3f") + "s in the plugin code (" + format(100.0 * cumulativeTime / max(elapsedTime, 1e-9), ".1f") + "%)\n")
+
+		# pstats prints to its stream; sort_stats returns the same object
+		stats.stream = summary
+		summary.write("\nTop " + str(self._topFunctions) + " functions by own time:\n")
+		stats.sort_stats("time").print_stats(self._topFunctions)
+		summary.write("Top " + str(self._topFunctions) + " functions by cumulative time:\n")
+		stats.sort_stats("cumulative").print_stats(self._topFunctions)
+		return summary.getvalue()
+
+
+	def _saveResults(self, profiler, elapsedTime):
+		profiler.dump_stats(self._outputPath)
+
+		summary = self._formatSummary(pstats.Stats(profiler), elapsedTime)
+		with open(self.getSummaryPath(), "w") as summaryFile:
+			summaryFile.write(summary)
+		print(summary, file=self._target, flush=True)
+
+		if (self._stopEvent.is_set()):
+			self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Profiling duration of " + format(self._maxDuration, ".2f") + "s reached; generation stopped")
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Profile saved to '" + str(self._outputPath) + "', summary to '" + str(self.getSummaryPath()) + "'")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3.6
+
+import sys
+import heapq
+
+from SimpleLogger import *
+from DictionnaryLoader import *
+from WriterController import *
+from LettersDistributionFrequency import *
+from LengthCompositionTable import *
+
+class SequenceEnumerator(object):
+
+	# Deterministic, exhaustive alternative to SequenceGenerator
+	#
+	# A candidate is a composition of word lengths summing to numberOfLetters
+	# (ex: 3+5) and one word per length. Its probability follows the same
+	# model as the generator:
+	#	P(length | letters left) = frequency(length) renormalized over the
+	#	                           lengths that fit and can be completed
+	#	                           (LengthCompositionTable)
+	#	P(word | length)         = weight(word) / sum(weights of that length)
+	#
+	# Candidates are walked best-first with a priority queue: words of each
+	# length are sorted by decreasing probability and a candidate is a tuple of
+	# ranks in those lists. A candidate children increment one rank at or after
+	# the last incremented position, so every rank tuple is reached exactly once
+	# and always after its parent (which is at least as probable).
+	#
+	# Different compositions can spell the same string ("ab"+"c", "a"+"bc");
+	# only the canonical one (longest first word) is emitted, so each string
+	# is written exactly once without any deduplication set.
+
+	# Sequences handed to the writers at once
+	WRITE_BATCH_SIZE = 10000
+
+	def __init__(self,
+		     loggerObj,
+		     dictionnaryLoaderObj,
+		     writerObj,
+		     numberOfLetters,
+		     lettersDistributionFrequencyObj,
+		     maximumNumberOfSequences=0,
+		     maximumBytesSizeForAllSequences=0):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		if (not isinstance(dictionnaryLoaderObj, DictionnaryLoader)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "dictionnaryLoaderObj not of a DictionnaryLoader instance!")
+		self._wordsObj = dictionnaryLoaderObj
+
+		# writerObj may be None when only iterateCandidates() is used
+		if ( (writerObj is not None) and (not isinstance(writerObj, WriterController)) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "writerObj not of a WriterController instance!")
+		self._writer = writerObj
+
+		if ( (not isinstance(numberOfLetters, int)) or (numberOfLetters < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "numberOfLetters must be an integer greater or equal to 1")
+		self._nbLetters = numberOfLetters
+
+		if (not isinstance(lettersDistributionFrequencyObj, LettersDistributionFrequency)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "lettersDistributionSample not of a LettersDistributionFrequency instance!")
+		self._lettersFrequencyObj = lettersDistributionFrequencyObj
+
+		if ( (not isinstance(maximumNumberOfSequences, int)) or (maximumNumberOfSequences < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumNumberOfSequences must be an integer greater or equal to 1")
+		self._maxNbSequence = maximumNumberOfSequences
+
+		if ( (not isinstance(maximumBytesSizeForAllSequences, int)) or (maximumBytesSizeForAllSequences < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumBytesSizeForAllSequences must be an integer greater or equal to 1")
+		self._maxSizeBytes = maximumBytesSizeForAllSequences
+
+		self._prepareBuckets()
+
+
+	def _prepareBuckets(self):
+		# For each usable length (frequency > 0 and at least one word):
+		#	_sortedWords[length]       : words sorted by decreasing probability
+		#	_sortedProbability[length] : matching P(word | length)
+		self._lengthTable = LengthCompositionTable(loggerObj=self._logger,
+		                                           dictionnaryLoaderObj=self._wordsObj,
+		                                           lettersDistributionFrequencyObj=self._lettersFrequencyObj,
+		                                           numberOfLetters=self._nbLetters)
+		self._usableLengths = self._lengthTable.getUsableLengths()
+		self._sortedWords = {}
+		self._sortedProbability = {}
+
+		for length in self._usableLengths:
+			patternDict = self._wordsObj.getPatternDictForLength(length)
+			totalWeight = sum(patternDict.values())
+			sortedPatterns = sorted(patternDict.items(), key=lambda item: (-item[1], item[0]))
+			self._sortedWords[length] = [ pattern for pattern, weight in sortedPatterns ]
+			self._sortedProbability[length] = [ (weight / totalWeight) for pattern, weight in sortedPatterns ]
+
+
+	def getUsableLengths(self):
+		return self._usableLengths
+	
+	
+	def getLengthTable(self):
+		return self._lengthTable
+	
+	
+	def getWordProbabilities(self, length):
+		# P(word | length) for every word of that length, decreasing order
+		return self._sortedProbability.get(length, [])
+	
+	
+	def getLengthProbability(self, length, lettersLeft):
+		# P(length | letters left), restricted to usable lengths that fit
+		# and leave a completable number of letters
+		return self._lengthTable.getLengthProbability(length, lettersLeft)
+
+
+	def _iterateCompositions(self):
+		# Yield (composition, lengths probability) for every composition
+		# of nbLetters made of usable lengths; the table only offers lengths
+		# that can be completed, so no branch is a dead end
+		stack = [ ((), self._nbLetters, 1.0) ]
+		while (len(stack) > 0):
+			(composition, lettersLeft, probability) = stack.pop()
+			if (lettersLeft == 0):
+				yield (composition, probability)
+				continue
+			for length in self._lengthTable.getLengthsForBudget(lettersLeft):
+				stack.append( (composition + (length,), lettersLeft - length, probability * self.getLengthProbability(length, lettersLeft)) )
+
+
+	def _candidateProbability(self, lengthsProbability, composition, ranks):
+		probability = lengthsProbability
+		for length, rank in zip(composition, ranks):
+			probability = probability * self._sortedProbability[length][rank]
+		return probability
+
+
+	def _isCanonical(self, sequence, composition):
+		# Canonical spelling is the one with the longest first word, then the
+		# longest second word, and so on.
+		# completable[i]: sequence[i:] can be split in usable dictionnary words
+		sequenceLen = len(sequence)
+		completable = [False] * (sequenceLen + 1)
+		completable[sequenceLen] = True
+		for start in range(sequenceLen - 1, -1, -1):
+			for length in self._usableLengths:
+				if ( (start + length) > sequenceLen ):
+					break
+				if ( completable[start + length] and (sequence[start:start+length] in self._wordsObj.getPatternDictForLength(length)) ):
+					completable[start] = True
+					break
+
+		start = 0
+		for usedLength in composition:
+			for length in self._usableLengths:
+				if ( (length <= usedLength) or ((start + length) > sequenceLen) ):
+					continue
+				if ( completable[start + length] and (sequence[start:start+length] in self._wordsObj.getPatternDictForLength(length)) ):
+					# A longer word fits here: this is not the canonical spelling
+					return False
+			start = start + usedLength
+		return True
+
+
+	def iterateCandidates(self):
+		# Yield (sequence, probability) in decreasing probability order
+		compositions = list(self._iterateCompositions())
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Enumerating " + str(len(compositions)) + " composition(s) of " + str(self._nbLetters) + " letters")
+
+		# Heap entries: (-probability, composition index, ranks, pivot)
+		heap = []
+		for index, (composition, lengthsProbability) in enumerate(compositions):
+			ranks = (0,) * len(composition)
+			heap.append( (-self._candidateProbability(lengthsProbability, composition, ranks), index, ranks, 0) )
+		heapq.heapify(heap)
+
+		while (len(heap) > 0):
+			(negProbability, index, ranks, pivot) = heapq.heappop(heap)
+			(composition, lengthsProbability) = compositions[index]
+
+			sequence = "".join( self._sortedWords[length][rank] for length, rank in zip(composition, ranks) )
+			if (self._isCanonical(sequence, composition)):
+				yield (sequence, -negProbability)
+
+			# Children: increment one rank at or after the pivot
+			for position in range(pivot, len(composition)):
+				if ( (ranks[position] + 1) < len(self._sortedWords[composition[position]]) ):
+					childRanks = ranks[:position] + (ranks[position] + 1,) + ranks[position+1:]
+					heapq.heappush(heap, (-self._candidateProbability(lengthsProbability, composition, childRanks), index, childRanks, position) )
+
+
+	def generateSequences(self):
+
+		sequencesLeft = self._maxNbSequence
+		if (self._maxSizeBytes < sys.maxsize):
+			self._writer.setStorageLimit(self._maxSizeBytes)
+		batch = []
+
+		for (sequence, probability) in self.iterateCandidates():
+			if (sequencesLeft <= 0):
+				break
+			if (not self._writer.reserve(sequence)):
+				# Writers may find room again once the batch is written
+				# (compressed output); the order is kept, or we stop here
+				self._writer.write(batch)
+				batch.clear()
+				if (not self._writer.reserve(sequence)):
+					break
+			batch.append(sequence)
+			sequencesLeft = sequencesLeft - 1
+
+			if (len(batch) >= self.WRITE_BATCH_SIZE):
+				self._writer.write(batch)
+				batch.clear()
+
+		if (len(batch) > 0):
+			self._writer.write(batch)
+
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Enumerated " + str(self._maxNbSequence - sequencesLeft) + " sequence(s)")
+		self._writer.close()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3.6
 
 import sys
+import time
 import random
 
 from collections import deque
@@ -10,6 +11,10 @@ from DictionnaryLoader import *
 from WriterController import *
 from FuzzerController import *
 from LettersDistributionFrequency import *
+from LengthCompositionTable import *
+from Deduplicators.DeduplicatorInterface import *
+from Deduplicators.SetDeduplicator import *
+from GeneratorMetrics import *
 
 class SequenceGenerator(object):
 	def __init__(self, 
@@ -20,7 +25,14 @@ class SequenceGenerator(object):
 		     numberOfLetters,
 		     lettersDistributionFrequencyObj=None,
 		     maximumNumberOfSequences=0,
-		     maximumBytesSizeForAllSequences=0):
+		     maximumBytesSizeForAllSequences=0,
+		     deduplicatorObj=None,
+		     stopEventObj=None,
+		     randomObj=None,
+		     checkpointObj=None,
+		     batchSamplerObj=None,
+		     batchSize=10000,
+		     metricsObj=None):
 		if (not isinstance(loggerObj, SimpleLogger)):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
 		self._logger = loggerObj
@@ -45,10 +57,20 @@ class SequenceGenerator(object):
 		# If the distribution wasn't given, use the default (linear) one
 		# Note: this WON'T give the best result!
 		if (lettersDistributionFrequencyObj is None):
-			lettersDistributionFrequencyObj = LettersDistributionFrequency(loggerObj=myLogger)
+			lettersDistributionFrequencyObj = LettersDistributionFrequency(loggerObj=self._logger)
 		if (not isinstance(lettersDistributionFrequencyObj, LettersDistributionFrequency)):
 			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "lettersDistributionSample not of a LettersDistributionFrequency instance!")
 		self._lettersFrequencyObj = lettersDistributionFrequencyObj
+		# Length to draw for each number of letters left; only words are
+		# picked here without a batch sampler (which has its own model)
+		self._lengthTable = None
+		if (batchSamplerObj is None):
+			self._lengthTable = LengthCompositionTable(loggerObj=self._logger, 
+			                                           dictionnaryLoaderObj=self._wordsObj, 
+			                                           lettersDistributionFrequencyObj=self._lettersFrequencyObj, 
+			                                           numberOfLetters=self._nbLetters)
+			if (not self._lengthTable.isCompletable(self._nbLetters)):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "No combination of word lengths gives %d letters!", self._nbLetters)
 		
 		if ( (not isinstance(maximumNumberOfSequences, int)) or (maximumNumberOfSequences < 1) ):
 			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumNumberOfSequences must be an integer greater or equal to 1")
@@ -56,88 +78,128 @@ class SequenceGenerator(object):
 		
 		if ( (not isinstance(maximumBytesSizeForAllSequences, int)) or (maximumBytesSizeForAllSequences < 1) ):
 			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumBytesSizeForAllSequences must be an integer greater or equal to 1")
-		# Calculate max size for the sequences (based on nbLetters)
-		self._maxSizeBytes = (maximumBytesSizeForAllSequences * self._nbLetters)
+		# Writers account for the bytes they really write (encoding,
+		# separators, compression); each of them holds up to that size
+		# No limit (sys.maxsize): writers skip the per sequence accounting
+		self._maxSizeBytes = maximumBytesSizeForAllSequences
+		if (self._maxSizeBytes < sys.maxsize):
+			self._writer.setStorageLimit(self._maxSizeBytes)
+		
+		# Exact in-memory set is the default deduplication engine
+		if (deduplicatorObj is None):
+			deduplicatorObj = SetDeduplicator(loggerObj=self._logger)
+		if (not isinstance(deduplicatorObj, DeduplicatorInterface)):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "deduplicatorObj not of a DeduplicatorInterface instance!")
+		self._deduplicator = deduplicatorObj
+		
+		# Optional event (threading/multiprocessing) used to stop generation
+		# from outside, checked once per outer iteration
+		self._stopEvent = stopEventObj
+		
+		# Own random generator so runs can be seeded / resumed
+		if (randomObj is None):
+			randomObj = random.Random()
+		self._random = randomObj
+		
+		# Optional periodic checkpoint (GenerationCheckpoint)
+		self._checkpoint = checkpointObj
+		# Counter restored by restoreState(), if any
+		self._restoredSequencesLeft = None
+		
+		# Hooks are queried with a budget between 0 and nbLetters
+		self._fuzzerCtrl.buildLookupTables(self._nbLetters)
+		
+		# Optional batched sampling backend (NumpyBatchSampler)
+		# Whole sequences are drawn at once; word level hooks are not applied
+		self._batchSampler = batchSamplerObj
+		self._batchSize = batchSize
+		if ( (batchSamplerObj is not None) and 
+		     ( (len(self._fuzzerCtrl.getNewWordInSequenceFuzzers(self._nbLetters)) > 0) or (len(self._fuzzerCtrl.getBetweenWordInSequenceFuzzers(self._nbLetters)) > 0) ) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "Batched sampling: new word and between words fuzzers are NOT applied")
+		
+		# Optional counters / progress (GeneratorMetrics); every use is
+		# guarded so a run without metrics pays nothing more
+		if ( (metricsObj is not None) and (not isinstance(metricsObj, GeneratorMetrics)) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "metricsObj not of a GeneratorMetrics instance!")
+		self._metrics = metricsObj
+		
+		# Freeze the weighted samplers now so _pickWord only does lookups
+		if (batchSamplerObj is None):
+			self._wordsObj.freezeSamplers()
+	
 	
+	def getState(self, sequencesLeft):
+		# Only valid between two outer iterations, when nothing is pending
+		# (storage used is restored from the writers states)
+		return {
+			"random"          : self._random.getstate(),
+			"fuzzers"         : self._fuzzerCtrl.getRandomStates(),
+			"sequencesLeft"   : sequencesLeft,
+			"deduplicator"    : self._deduplicator.getState(),
+			"writers"         : self._writer.getState(),
+			"batchSampler"    : (self._batchSampler.getState() if (self._batchSampler is not None) else None),
+		}
 	
-	def _checkIterationsLeft(self, sequencesLeft, spaceLeft, newlyGeneratedSequences):
-		# compute size left with the newly generated sequences
-		for sequence in newlyGeneratedSequences:
-			# Decrement storage space left
-			spaceLeft = spaceLeft - len(sequence)
-			# Decrement number of sequence left
-			sequencesLeft = sequencesLeft - 1
-		return sequencesLeft, spaceLeft
 	
+	def restoreState(self, state):
+		self._random.setstate(state["random"])
+		self._fuzzerCtrl.setRandomStates(state["fuzzers"])
+		self._deduplicator.setState(state["deduplicator"])
+		self._writer.setState(state["writers"])
+		if ( (self._batchSampler is not None) and (state.get("batchSampler") is not None) ):
+			self._batchSampler.setState(state["batchSampler"])
+		self._restoredSequencesLeft = state["sequencesLeft"]
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Resuming with " + str(state["sequencesLeft"]) + " sequence(s) left")
 	
 	
 	def _pickWord(self, maxNbLetters):
-		
-		pickedNbLetters = 0
-		while ( (pickedNbLetters <= 0) or (pickedNbLetters > maxNbLetters) ):
-			# Get starting sequence
-			randomPick = random.choices(population=self._lettersFrequencyObj.getLettersList(), weights=self._lettersFrequencyObj.getLettersProbability(), k=1)
-			# TODO
-			# Do we want to re-loop if sequence size not available?
-			# To investigate...
-			if (not randomPick):
-				# Make sure there is actually a distribution for that size!
-				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "No distribution value found!")
-				return None
-			else:
-				pickedNbLetters = randomPick[0]
-				letterLeftAfterPick = maxNbLetters - pickedNbLetters
-		
-		wordsForLetter = self._wordsObj.getPatternDictForLength(pickedNbLetters)
-		# *** FIXME ***
-		# Might not have pattern for that size...
-		# Need to better handle case where myPatterns is empty!
-		if (not wordsForLetter):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "No word of " + str(pickedNbLetters) + " returned!")
+		# One draw of a length that fits and can still be completed, then
+		# one draw of a word of that length
+		# None when maxNbLetters can't be completed (fuzzers added characters)
+		lengthSampler = self._lengthTable.getSampler(maxNbLetters)
+		if (lengthSampler is None):
 			return None
 		
-		wordsList = list(wordsForLetter.keys())
-		wordProbabilityList = list(wordsForLetter.values())
-		# Pick a word
-		chosenWord = random.choices(population=wordsList, weights=wordProbabilityList, k=1)[0]
-		
-		return chosenWord
+		return self._wordsObj.getSamplerForLength(lengthSampler.pick(self._random)).pick(self._random)
 	
-	def _sortCompletedSequence(self, sequencesToSort, completedSet, incompletedDeque, nbSequencesLeft, sequenceSizeLeft):
+	def _sortCompletedSequence(self, sequencesToSort, deduplicator, newlyCompletedList, incompletedDeque, nbSequencesLeft):
 		
 		sequenceAdded = 0
 		
-		# *** FIXME ***
-		# Lost of performance!
-		# We do not need to loop, applyFuzzing() could simply return a tuple (size, word)
 		for sequence in sequencesToSort:
-			# If we reached limit on number of sequences, 
+			# If we reached limit on number of sequences or storage,
 			#   don't bother checking and skip loop
-			if ( (nbSequencesLeft > 0) and (sequenceSizeLeft > 0) ):
+			if ( (nbSequencesLeft > 0) and (self._writer.hasStorageLeft()) ):
 				charLeft = self._nbLetters - len(sequence)
 				
 				if (charLeft > 0):
 					incompletedDeque.append( (sequence, charLeft) )
 				else:
-					# Only insert non-duplicated
-					if (sequence not in completedSet):
-						completedSet.add(sequence)
-						sequenceAdded = sequenceAdded + 1
-						nbSequencesLeft = nbSequencesLeft - 1
-						# FIXME
-						# Is this bytes calculation always valid?
-						sequenceSizeLeft = sequenceSizeLeft - self._nbLetters
+					# Only insert non-duplicated, and only if every writer
+					# has room for it; a sequence refused by the writers is
+					# not recorded as seen, so a resumed run can still emit it
+					if (sequence not in deduplicator):
+						if (self._writer.reserve(sequence)):
+							# Only new sequences are handed to the writers
+							deduplicator.add(sequence)
+							newlyCompletedList.append(sequence)
+							sequenceAdded = sequenceAdded + 1
+							nbSequencesLeft = nbSequencesLeft - 1
+					elif (self._metrics is not None):
+						self._metrics.addDuplicates(1)
 		
 		# Everything is sorted, empty the list
 		sequencesToSort.clear()
 		
-		return (sequenceAdded, nbSequencesLeft, sequenceSizeLeft)
+		return (sequenceAdded, nbSequencesLeft)
 	
 	
 	
 	def generateSequences(self):
 		
-		completeSequences = set()
+		# Sequences completed during the current iteration only;
+		# this is what get streamed to the writers
+		newlyCompletedSequences = list()
 		incompleteSequences = deque()
 		newSequences = list()
 		
@@ -148,62 +210,137 @@ class SequenceGenerator(object):
 		
 		# Setup limits conditions (number of sequences and total sequence storage size)
 		sequencesLeft = self._maxNbSequence
-		sequenceSizeLeft = self._maxSizeBytes
+		if (self._restoredSequencesLeft is not None):
+			sequencesLeft = self._restoredSequencesLeft
+		startSequencesLeft = sequencesLeft
+		startTime = time.perf_counter()
+		
+		metrics = self._metrics
+		if (metrics is not None):
+			metrics.start(self._maxNbSequence, self._maxSizeBytes, self._maxNbSequence - sequencesLeft)
 		
-		while ((sequencesLeft > 0) and (sequenceSizeLeft > 0) ):
+		while ( (sequencesLeft > 0) and (self._writer.hasStorageLeft()) ):
+			
+			if ( (self._stopEvent is not None) and (self._stopEvent.is_set()) ):
+				self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Stop requested; ending generation")
+				break
 			
 			# ***    HOOK     ***
 			# *** NEW SEQUENCE  ***
+			if (metrics is not None):
+				(hookStart, nbBefore) = (time.perf_counter(), len(newSequences))
 			for fuzzer in self._fuzzerCtrl.getNewSequenceFuzzers(self._nbLetters):
 				newSequences.extend(fuzzer.applyFuzzing() )
+			if (metrics is not None):
+				metrics.addFuzzing(GeneratorMetrics.HOOK_NEW_SEQUENCE, len(newSequences) - nbBefore, time.perf_counter() - hookStart)
 			
-			# Seed word to build on from
-			newWord = self._pickWord(self._nbLetters)
-			newSequences.append(newWord)
-			
-			# ***  HOOK      ***
-			# *** NEW WORD   ***
-			for fuzzer in self._fuzzerCtrl.getNewWordInSequenceFuzzers(self._nbLetters - len(newWord) ):
-				newSequences.extend(fuzzer.applyFuzzing(newWord))
-			
-			# Sort completed / uncompleted
-			(completedWordAdded, sequencesLeft, sequenceSizeLeft) = self._sortCompletedSequence(newSequences, completeSequences, incompleteSequences, sequencesLeft, sequenceSizeLeft)
-			
-			completedWordAdded = 0
-			# Loop while incomplete sequence exists in the list
-			while ( len(incompleteSequences) > 0):
-				
-				(previousWord, nbCharLeft) = incompleteSequences.pop()
-				
-				newWord = self._pickWord(nbCharLeft)
-				newWordSequence = previousWord + newWord
-				newSequences.append(newWordSequence)
+			if (self._batchSampler is not None):
+				# Batched backend: complete sequences only
+				if (metrics is not None):
+					(hookStart, nbBefore) = (time.perf_counter(), len(newSequences))
+				newSequences.extend(self._batchSampler.sampleBatch(self._batchSize))
+				if (metrics is not None):
+					metrics.addPicking(len(newSequences) - nbBefore, time.perf_counter() - hookStart)
+				(completedWordAdded, sequencesLeft) = self._sortCompletedSequence(newSequences, self._deduplicator, newlyCompletedSequences, incompleteSequences, sequencesLeft)
+			else:
+				# Seed word to build on from
+				if (metrics is not None):
+					hookStart = time.perf_counter()
+				newWord = self._pickWord(self._nbLetters)
+				newSequences.append(newWord)
 				
-				# ***        HOOK           ***
-				# *** BETWEEN WORD SEQUENCE ***
-				spaceLeftFuzzer = self._nbLetters - len(newWordSequence)
-				for fuzzer in self._fuzzerCtrl.getBetweenWordInSequenceFuzzers( spaceLeftFuzzer ):
-					newSequences.extend(fuzzer.applyFuzzing(previousWord, newWord) )
+				# ***  HOOK      ***
+				# *** NEW WORD   ***
+				if (metrics is not None):
+					metrics.addPicking(1, time.perf_counter() - hookStart)
+					(hookStart, nbBefore) = (time.perf_counter(), len(newSequences))
+				for fuzzer in self._fuzzerCtrl.getNewWordInSequenceFuzzers(self._nbLetters - len(newWord) ):
+					newSequences.extend(fuzzer.applyFuzzing(newWord))
+				if (metrics is not None):
+					metrics.addFuzzing(GeneratorMetrics.HOOK_NEW_WORD, len(newSequences) - nbBefore, time.perf_counter() - hookStart)
 				
 				# Sort completed / uncompleted
-				(completedWordAdded, sequencesLeft, sequenceSizeLeft) = self._sortCompletedSequence(newSequences, completeSequences, incompleteSequences, sequencesLeft, sequenceSizeLeft)
+				(completedWordAdded, sequencesLeft) = self._sortCompletedSequence(newSequences, self._deduplicator, newlyCompletedSequences, incompleteSequences, sequencesLeft)
 				
-				# If we completed at least ONE word, 
-				# Then add back our starting word to incomplete sequence
-				if (completedWordAdded > 0):
-					incompleteSequences.append( (previousWord, nbCharLeft)  )
-				
-			# No more incomplete sequence, apply final fuzzing on complete sequences
-			nonFuzzedCompleteSequences = set(completeSequences)
+				completedWordAdded = 0
+				# Loop while incomplete sequence exists in the list
+				while ( len(incompleteSequences) > 0):
+					
+					(previousWord, nbCharLeft) = incompleteSequences.pop()
+					
+					if (metrics is not None):
+						hookStart = time.perf_counter()
+					newWord = self._pickWord(nbCharLeft)
+					if (newWord is None):
+						# Dead end: drop that sequence
+						continue
+					newWordSequence = previousWord + newWord
+					newSequences.append(newWordSequence)
+					
+					# ***        HOOK           ***
+					# *** BETWEEN WORD SEQUENCE ***
+					if (metrics is not None):
+						metrics.addPicking(1, time.perf_counter() - hookStart)
+						(hookStart, nbBefore) = (time.perf_counter(), len(newSequences))
+					spaceLeftFuzzer = self._nbLetters - len(newWordSequence)
+					for fuzzer in self._fuzzerCtrl.getBetweenWordInSequenceFuzzers( spaceLeftFuzzer ):
+						newSequences.extend(fuzzer.applyFuzzing(previousWord, newWord) )
+					if (metrics is not None):
+						metrics.addFuzzing(GeneratorMetrics.HOOK_BETWEEN_WORDS, len(newSequences) - nbBefore, time.perf_counter() - hookStart)
+					
+					# Sort completed / uncompleted
+					(completedWordAdded, sequencesLeft) = self._sortCompletedSequence(newSequences, self._deduplicator, newlyCompletedSequences, incompleteSequences, sequencesLeft)
+					
+					# If we completed at least ONE word, 
+					# Then add back our starting word to incomplete sequence
+					if (completedWordAdded > 0):
+						incompleteSequences.append( (previousWord, nbCharLeft)  )
+					
+			# No more incomplete sequence, apply final fuzzing on the sequences
+			# completed during this iteration (older ones were already fuzzed)
+			nonFuzzedCompleteSequences = list(newlyCompletedSequences)
 			# ***        HOOK       ***
 			# *** COMPLETE SEQUENCE ***
+			if (metrics is not None):
+				(hookStart, nbBefore) = (time.perf_counter(), len(newSequences))
 			for sequence in nonFuzzedCompleteSequences:
 				for fuzzer in self._fuzzerCtrl.getCompleteSequenceFuzzers(0):
-					completeSequences.union(fuzzer.applyFuzzing(sequence) )
+					newSequences.extend(fuzzer.applyFuzzing(sequence) )
+			if (metrics is not None):
+				metrics.addFuzzing(GeneratorMetrics.HOOK_COMPLETE_SEQUENCE, len(newSequences) - nbBefore, time.perf_counter() - hookStart)
+			# Fuzzed sequences go through the same duplicate and limits checks
+			(completedWordAdded, sequencesLeft) = self._sortCompletedSequence(newSequences, self._deduplicator, newlyCompletedSequences, incompleteSequences, sequencesLeft)
+			incompleteSequences.clear()
+			
+			# Stream only the newly completed sequences to the writers,
+			# keeping I/O proportional to new output instead of total output
+			# (storage refused: written anyway, writers may find room again)
+			if ( (len(newlyCompletedSequences) > 0) or (not self._writer.hasStorageLeft()) ):
+				if (metrics is not None):
+					hookStart = time.perf_counter()
+				self._writer.write(newlyCompletedSequences)
+				if (metrics is not None):
+					metrics.addWriting(len(newlyCompletedSequences), time.perf_counter() - hookStart)
+				newlyCompletedSequences.clear()
+			
+			# Nothing is pending between two iterations: safe place to checkpoint
+			if ( (self._checkpoint is not None) and (self._checkpoint.isDue()) ):
+				self._checkpoint.save(self.getState(sequencesLeft))
+			
+			if (metrics is not None):
+				metrics.report(self._writer.getStorageUsed())
+		
+		elapsedTime = time.perf_counter() - startTime
+		nbGenerated = startSequencesLeft - sequencesLeft
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Generated " + str(nbGenerated) + " sequence(s) in " + format(elapsedTime, ".2f") + "s (" + format(nbGenerated / max(elapsedTime, 1e-9), ".0f") + " sequences/s)")
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Deduplication kept " + str(self._deduplicator.getCount()) + " sequence(s) using " + str(self._deduplicator.getMemoryUsage()) + " bytes")
 		
-			# Let writer save/print the result
-			self._writer.write(completeSequences)
+		if (self._checkpoint is not None):
+			self._checkpoint.save(self.getState(sequencesLeft))
 		
 		# We are done, close the writers
 		self._writer.close()
+		
+		if (metrics is not None):
+			metrics.finish(self._writer.getStorageUsed())
 		
\ No newline at end of file
@@ -3,6 +3,7 @@
 import os
 import sys
 import enum
+import atexit
 
 # Enum is Python >= 3.4!
 class SimpleLoggerLevel(enum.IntEnum):
@@ -14,10 +15,21 @@ class SimpleLoggerLevel(enum.IntEnum):
 
 class SimpleLogger(object):
 	
+	# Messages can be formatted lazily, only if they are going to be shown:
+	#	printMessage(self, level, "No word of %d letters", nbLetters)
+	#	printMessage(self, level, lambda: expensiveDescription())
+	# and costly checks can be skipped with isEnabledFor(level).
+	#
+	# With bufferSize > 0, printed lines are kept in memory and written
+	# bufferSize lines at once (or on flush() / exit) instead of one
+	# print per line. Lines going to stderr flush the buffer, so errors
+	# are never delayed nor shown out of order.
+	
 	def __init__(self, 
 	             defaultLevel=SimpleLoggerLevel.ERROR, 
 	             printOnStderrLevel=SimpleLoggerLevel.ERROR, 
-	             throwOnLevel=SimpleLoggerLevel.CRITICAL):
+	             throwOnLevel=SimpleLoggerLevel.CRITICAL,
+	             bufferSize=0):
 		
 		# Sanity checks
 		if (not isinstance(defaultLevel, SimpleLoggerLevel)):
@@ -30,6 +42,15 @@ class SimpleLogger(object):
 		self._defaultLevel = defaultLevel
 		self._stderrLevel  = printOnStderrLevel
 		self._throwLevel   = throwOnLevel
+		# Lowest level doing anything (printing or throwing)
+		self._enabledLevel = min(self._defaultLevel, self._throwLevel)
+		
+		if ( (not isinstance(bufferSize, int)) or (bufferSize < 0) ):
+			raise Exception("bufferSize must be a positive integer")
+		self._bufferSize = bufferSize
+		self._buffer = []
+		if (bufferSize > 0):
+			atexit.register(self.flush)
 	
 	def getDefaultLevel(self):
 		return self._defaultLevel
@@ -38,6 +59,7 @@ class SimpleLogger(object):
 		if (not isinstance(newLevel, SimpleLoggerLevel)):
 			raise Exception("newLevel is not of type SimpleLoggerLevel")
 		self._defaultLevel = newLevel
+		self._enabledLevel = min(self._defaultLevel, self._throwLevel)
 	
 	def getPrintOnStderrLevel(self):
 		return self._stderrLevel
@@ -54,11 +76,46 @@ class SimpleLogger(object):
 		if (not isinstance(newLevel, SimpleLoggerLevel)):
 			raise Exception("newLevel is not of type SimpleLoggerLevel")
 		self._throwLevel = newLevel
+		self._enabledLevel = min(self._defaultLevel, self._throwLevel)
+	
+	def getBufferSize(self):
+		return self._bufferSize
+	
+	def isEnabledFor(self, level):
+		# Whether a message of this level would be printed or thrown
+		return (level >= self._enabledLevel)
 	
-	def printMessage(self, caller, level, message):
+	def flush(self):
+		if (len(self._buffer) == 0):
+			return
+		# Consecutive lines for the same target are written at once
+		buffered = self._buffer
+		self._buffer = []
+		start = 0
+		for index in range(1, len(buffered) + 1):
+			if ( (index == len(buffered)) or (buffered[index][0] is not buffered[start][0]) ):
+				target = buffered[start][0]
+				target.write("".join( line for (lineTarget, line) in buffered[start:index] ))
+				target.flush()
+				start = index
+	
+	def printMessage(self, caller, level, message, *args):
+		# Fast exit first: nothing is formatted for disabled levels
+		if (level < self._enabledLevel):
+			if (not isinstance(level, SimpleLoggerLevel)):
+				raise Exception("level is not of type SimpleLoggerLevel")
+			return
 		if (not isinstance(level, SimpleLoggerLevel)):
 			raise Exception("level is not of type SimpleLoggerLevel")
 		
+		if (callable(message)):
+			message = message()
+		elif (len(args) > 0):
+			message = message % args
+		
+		if (level >= self._throwLevel):
+			self.flush()
+			raise Exception(message)
 		if (level < self._defaultLevel):
 			return
 		
@@ -67,13 +124,15 @@ class SimpleLogger(object):
 		else:
 			target=sys.stdout
 		
-		if (level >= self._throwLevel):
-			raise Exception(message)
+		line = str(caller.__class__.__name__) + ":\t " + str(message) + "\n"
+		if ( (self._bufferSize == 0) or (target is sys.stderr) ):
+			self.flush()
+			# Same output as print(name + ":\t", message)
+			target.write(line)
 		else:
-			# This should be backward compatible with python 2.X
-			# Didn't test, though
-			print(str(caller.__class__.__name__) + ":\t", message, file=target)
-
+			self._buffer.append( (target, line) )
+			if (len(self._buffer) >= self._bufferSize):
+				self.flush()
 
 if __name__ == '__main__':
 	myObject = SimpleLogger(defaultLevel=SimpleLoggerLevel.INFO, 
@@ -82,5 +141,7 @@ if __name__ == '__main__':
 	myObject.printMessage(myObject, SimpleLoggerLevel.DEBUG,   "Test1: will NOT show")
 	myObject.printMessage(myObject, SimpleLoggerLevel.WARNING, "Test2: will show")
 	myObject.printMessage(myObject, SimpleLoggerLevel.ERROR,   "Test3: will show on stderr")
+	myObject.printMessage(myObject, SimpleLoggerLevel.INFO,    "Test%d: will show, %s", 5, "formatted")
+	myObject.printMessage(myObject, SimpleLoggerLevel.DEBUG,   lambda: "Test6: will NOT show, NOR be built")
 	myObject.printMessage(myObject, SimpleLoggerLevel.CRITICAL,"Test4: will throw")
 	
\ No newline at end of file
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3.6
+
+import os
+import sys
+import argparse
+
+from SimpleLogger import *
+from CommandLineUIBase import *
+from ExternalSortUnique import *
+
+class SortUniqueUI(CommandLineUIBase):
+
+	# Command line front end of ExternalSortUnique: merge generated
+	# wordlists (ex: from several machines, or runs without deduplication)
+	# into one without duplicates, using bounded memory.
+
+	def __init__(self):
+		self._loggerObj = None
+
+	def __parseArguments(self):
+
+		parser = argparse.ArgumentParser(
+			description="Sort and remove duplicates from wordlists larger than memory",
+			epilog="\nExample:\n " + str(sys.argv[0]) + " -i part1.txt -i part2.txt.gz -o merged.txt -j 4 --memory-limit 2G")
+		parser.add_argument("-v", "--verbose", action="store_true", help="Turn on verbose mode; additionnal messages are going to be printed on stdout.")
+		parser.add_argument("-i", "--input", type=str, action="append", required=True, help="Wordlist to read (one password per line; .gz, .bz2, .xz and .lzma are decompressed). Can be given multiple time.")
+		parser.add_argument("-o", "--output", type=str, required=True, help="Path of the sorted, duplicate free wordlist.")
+		parser.add_argument("-j", "--workers", type=int, default=1, help="Number of processes sorting runs in parallel. Default: 1.")
+		parser.add_argument("--memory-limit", type=str, default="256M", help="Approximate memory used for sorting. Support K, M, G, T format. Default: 256M.")
+		parser.add_argument("--temporary-directory", type=str, help="Where sorted runs are spilled. Default: system temporary directory.")
+		parser.add_argument("--preserve-order", action="store_true", help="Keep the first occurrence of each password, in input order, instead of sorting the output.")
+		parser.add_argument("--maximum-open-runs", type=int, default=256, help="Runs merged at once; more runs are merged in several passes. Default: 256.")
+		parser.add_argument("--logging-levels", type=str, help="Use given logging level instead of default ones. Format is 'N1,N2,N3' where N1 stdout level, N2 stderr level and N3 exit level (Ex:'2,3,4' or 'WARNING,ERROR,CRITICAL')")
+
+		args = parser.parse_args()
+
+		self._loggerObj = self._createLogger(args)
+
+		for inputPath in args.input:
+			if (not os.path.isfile(inputPath)):
+				self._loggerObj.printMessage(self, SimpleLoggerLevel.CRITICAL, "Input '" + str(inputPath) + "' does not exist or is not a file")
+		if (os.path.abspath(args.output) in [ os.path.abspath(inputPath) for inputPath in args.input ]):
+			self._loggerObj.printMessage(self, SimpleLoggerLevel.CRITICAL, "Output '" + str(args.output) + "' is also an input")
+
+		sorter = ExternalSortUnique(loggerObj=self._loggerObj,
+		                            memoryLimit=self._parseSizeString(args.memory_limit, "--memory-limit", self._loggerObj),
+		                            numberOfWorkers=args.workers,
+		                            temporaryDirectory=args.temporary_directory,
+		                            preserveOrder=args.preserve_order,
+		                            maximumOpenRuns=args.maximum_open_runs)
+
+		return (sorter, args.input, args.output)
+
+
+	def run(self):
+		(sorter, inputPaths, outputPath) = self.__parseArguments()
+		sorter.sortUnique(inputPaths, outputPath)
+
+
+
+if __name__ == '__main__':
+	sortUniqueUI = SortUniqueUI()
+	sortUniqueUI.run()
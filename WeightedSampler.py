@@ -0,0 +1,56 @@
+#!/usr/bin/env python3.6
+
+import array
+import random
+import bisect
+import itertools
+import collections.abc
+
+class WeightedSampler(object):
+
+	# Immutable weighted sampler
+	# Cumulative weights are computed ONCE at creation;
+	# each pick is then a single random draw + bisect (O(log n))
+	# instead of random.choices() recomputing them (O(n)) on every call.
+	__slots__ = ("_population", "_cumWeights", "_totalWeight", "_lastIndex")
+
+	def __init__(self, population, weights):
+		# Keep an immutable copy of population (read-only sequences, such as
+		# CompactPatternList, are kept as is); weights are only needed
+		# through their cumulative sum, stored as a flat array of doubles
+		if ( (not isinstance(population, collections.abc.Sequence)) or (isinstance(population, collections.abc.MutableSequence)) ):
+			population = tuple(population)
+		self._population = population
+		self._cumWeights = array.array("d", itertools.accumulate(weights))
+
+		if (len(self._population) != len(self._cumWeights)):
+			raise Exception("WeightedSampler: population and weights must have the same size!")
+
+		if (len(self._cumWeights) > 0):
+			self._totalWeight = self._cumWeights[-1]
+		else:
+			self._totalWeight = 0.0
+		self._lastIndex = len(self._cumWeights) - 1
+
+
+	def __len__(self):
+		return len(self._population)
+
+
+	def pick(self, randomObj=random):
+		if (self._totalWeight <= 0.0):
+			return None
+		# Same algorithm as random.choices(cum_weights=...)
+		# The "hi" bound protect against float rounding on the last element
+		index = bisect.bisect(self._cumWeights, randomObj.random() * self._totalWeight, 0, self._lastIndex)
+		return self._population[index]
+
+
+if __name__ == '__main__':
+
+	mySampler = WeightedSampler(["a", "b", "c"], [0.7, 0.2, 0.1])
+
+	counts = {"a":0, "b":0, "c":0}
+	for i in range(100000):
+		counts[mySampler.pick()] += 1
+	print(str(counts))
@@ -1,17 +1,182 @@
 #!/usr/bin/env python3.6
 
+import queue
+import threading
+
 from SimpleLogger import *
 from Writers.WriterInterface import *
 
 class WriterController(object):
 	
-	def __init__(self, loggerObj):
+	# In asynchronous mode, each writer gets its own thread fed through a
+	# bounded queue: write() returns as soon as the batch is queued, and
+	# blocks (backpressure) only when a writer is queueSize batches behind.
+	# Threads are started on first write, so a controller created before
+	# a fork() is still usable in the parent.
+	
+	def __init__(self, loggerObj, asynchronous=False, queueSize=16):
 		if (not isinstance(loggerObj, SimpleLogger)):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
 		self._logger = loggerObj
 		
+		if ( (not isinstance(queueSize, int)) or (queueSize < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "queueSize must be an integer greater or equal to 1")
+		self._asynchronous = asynchronous
+		self._queueSize = queueSize
+		
 		self._writerList = set()
 		
+		# Asynchronous mode: writer -> (queue, thread), and the first error
+		# raised by a writer thread
+		self._writerThreads = {}
+		self._threadError = None
+		
+		# Storage limit, per writer (None: no limit)
+		# _storageUsed[writer]: bytes written, plus reserved ones not yet
+		# reported by the writer
+		self._storageLimit = None
+		self._storageUsed = {}
+		self._storageFull = False
+		# Word refused while some writer only had an upper bound of its
+		# storage (ex: compressed output); see _reclaimStorage()
+		self._refusedWord = None
+		
+	
+	def isAsynchronous(self):
+		return self._asynchronous
+	
+	
+	def _writerLoop(self, writerObj, batchQueue):
+		while (True):
+			wordsList = batchQueue.get()
+			try:
+				if (wordsList is None):
+					return
+				# After an error, keep draining so write() never blocks forever
+				if (self._threadError is None):
+					writerObj.write(wordsList)
+			except Exception as err:
+				self._threadError = (writerObj, err)
+			finally:
+				batchQueue.task_done()
+	
+	
+	def _startThreads(self):
+		for writer in self._writerList:
+			if (writer in self._writerThreads):
+				continue
+			batchQueue = queue.Queue(maxsize=self._queueSize)
+			writerThread = threading.Thread(target=self._writerLoop, args=(writer, batchQueue), name="Writer-" + writer.__class__.__name__, daemon=True)
+			writerThread.start()
+			self._writerThreads[writer] = (batchQueue, writerThread)
+	
+	
+	def _stopThread(self, writerObj):
+		(batchQueue, writerThread) = self._writerThreads.pop(writerObj)
+		batchQueue.put(None)
+		writerThread.join()
+	
+	
+	def _checkThreadError(self):
+		if (self._threadError is not None):
+			(writerObj, err) = self._threadError
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "writer object '" + str(writerObj) + "' failed: " + str(err))
+	
+	
+	def flush(self):
+		# Wait until every queued batch was handed to its writer
+		for (batchQueue, writerThread) in self._writerThreads.values():
+			batchQueue.join()
+		self._checkThreadError()
+		self._syncStorage()
+	
+	
+	def setStorageLimit(self, maximumBytes):
+		# Each writer using storage may hold up to maximumBytes
+		self._storageLimit = maximumBytes
+		self._storageUsed = {}
+		for writer in self._writerList:
+			self._storageUsed[writer] = (writer.getBytesWritten() or 0)
+		self._storageFull = False
+		self._refusedWord = None
+	
+	
+	def _syncStorage(self):
+		# Replace estimations by what writers really wrote
+		# (ex: compressed size); only when nothing is queued
+		if (self._storageLimit is None):
+			return
+		for writer in self._writerList:
+			bytesWritten = writer.getBytesWritten()
+			if (bytesWritten is not None):
+				self._storageUsed[writer] = bytesWritten
+	
+	
+	def _getRecordSizes(self, word):
+		# [ (writer, record size) ] if every writer has room for word, else None
+		recordSizes = []
+		for writer in self._writerList:
+			recordSize = writer.getRecordSize(word)
+			if (recordSize > 0):
+				if ( (self._storageUsed.get(writer, 0) + recordSize) > self._storageLimit ):
+					return None
+				recordSizes.append( (writer, recordSize) )
+		return recordSizes
+	
+	
+	def reserve(self, word):
+		# Return True and account for word if every writer has room for it;
+		# otherwise storage is full and nothing else should be written
+		# (until the next write() finds room again, see _reclaimStorage())
+		if (self._storageLimit is None):
+			return True
+		if (self._storageFull):
+			return False
+		
+		recordSizes = self._getRecordSizes(word)
+		if (recordSizes is None):
+			self._storageFull = True
+			self._refusedWord = word
+			return False
+		for (writer, recordSize) in recordSizes:
+			self._storageUsed[writer] = self._storageUsed.get(writer, 0) + recordSize
+		return True
+	
+	
+	def _reclaimStorage(self):
+		# A word was refused on upper bounds: make them exact (ex: close the
+		# current compressed stream) and accept words again if the refused
+		# one fits now. Each round writes at least one more word, and the
+		# room left shrinks with the compression ratio, until nothing fits.
+		# Only called when every reserved word was written.
+		if (self._refusedWord is None):
+			return
+		refusedWord = self._refusedWord
+		self._refusedWord = None
+		if (self._asynchronous):
+			self.flush()
+		tightened = False
+		for writer in self._writerList:
+			if (writer.tightenStorage()):
+				tightened = True
+		if (not tightened):
+			return
+		self._syncStorage()
+		if (self._getRecordSizes(refusedWord) is not None):
+			self._storageFull = False
+	
+	
+	def hasStorageLeft(self):
+		return (not self._storageFull)
+	
+	
+	def getStorageUsed(self):
+		# Highest storage used by a writer
+		# Without limit nothing is accounted: ask the writers
+		if (self._storageLimit is None):
+			return max( [ (writer.getBytesWritten() or 0) for writer in self._writerList ], default=0 )
+		return max(self._storageUsed.values(), default=0)
+		
 	
 	def addWriter(self, writerObj):
 		if (not isinstance(writerObj, WriterInterface)):
@@ -27,6 +192,8 @@ class WriterController(object):
 		if (writerObj not in self._writerList):
 			self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "writer object '" + str(writerObj) + "' not in writer list")
 		
+		if (writerObj in self._writerThreads):
+			self._stopThread(writerObj)
 		self._writerList.remove(writerObj)
 	
 	
@@ -35,10 +202,53 @@ class WriterController(object):
 	
 	
 	def write(self, wordsList):
+		# Empty list: nothing to write, only look for storage again
+		if (len(wordsList) == 0):
+			self._reclaimStorage()
+			return
+		
+		if (not self._asynchronous):
+			for writer in self._writerList:
+				writer.write(wordsList)
+			self._syncStorage()
+			self._reclaimStorage()
+			return
+		
+		self._checkThreadError()
+		if (len(self._writerThreads) != len(self._writerList)):
+			self._startThreads()
+		# Caller may reuse its list; writers share one immutable copy
+		wordsTuple = tuple(wordsList)
+		for (batchQueue, writerThread) in self._writerThreads.values():
+			batchQueue.put(wordsTuple)
+		self._reclaimStorage()
+	
+	
+	def getState(self):
+		# Writers states only make sense once queued batches are written
+		self.flush()
+		writerStates = {}
+		for writer in self._writerList:
+			state = writer.getState()
+			if (state is not None):
+				writerStates[writer.getStateKey()] = state
+		return writerStates
+	
+	
+	def setState(self, writerStates):
+		self.flush()
 		for writer in self._writerList:
-			writer.write(wordsList)
+			key = writer.getStateKey()
+			if (key in writerStates):
+				writer.setState(writerStates[key])
+			elif (writer.getState() is not None):
+				self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "No saved state for writer '" + str(key) + "'; it will restart from its current position")
+		self._syncStorage()
 	
 	
 	def close(self):
+		for writer in list(self._writerThreads.keys()):
+			self._stopThread(writer)
 		for writer in self._writerList:
-			writer.close()
\ No newline at end of file
+			writer.close()
+		self._checkThreadError()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3.6
+
+import os
+import bz2
+import gzip
+import lzma
+import time
+
+from Writers.WriterInterface import *
+
+class BlockFileWriter(WriterInterface):
+
+	# High throughput file writer
+	# Batches are joined and encoded at once, kept in memory until blockSize
+	# bytes are pending, then written in a single call (or os.writev() of
+	# the pending chunks when useWritev is set).
+	# Output is compressed on the fly according to the file extension.
+	COMPRESSIONS = {
+		".gz"  : (lambda fileObj: gzip.GzipFile(fileobj=fileObj, mode="wb")),
+		".bz2" : (lambda fileObj: bz2.BZ2File(fileObj, mode="wb")),
+		".xz"  : (lambda fileObj: lzma.LZMAFile(fileObj, mode="wb")),
+		".lzma": (lambda fileObj: lzma.LZMAFile(fileObj, mode="wb", format=lzma.FORMAT_ALONE)),
+	}
+
+	# Compressed size bound of n input bytes, for any content (incompressible
+	# data included): n + (n >> COMPRESSED_EXPANSION_SHIFT) + overhead of
+	# the stream (headers, trailers, block tables)
+	COMPRESSED_EXPANSION_SHIFT = 5
+	COMPRESSED_STREAM_OVERHEADS = { ".gz": 64, ".bz2": 512, ".xz": 128, ".lzma": 64 }
+
+	# Maximum chunks given to one os.writev() call (POSIX IOV_MAX minimum)
+	MAX_WRITEV_CHUNKS = 1024
+
+	def __init__(self, loggerObj, blockSize=(1024*1024), useWritev=False, encoding="utf-8"):
+		super().__init__(loggerObj)
+
+		if ( (not isinstance(blockSize, int)) or (blockSize < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "blockSize must be an integer greater or equal to 1")
+		self._blockSize = blockSize
+		self._encoding = encoding
+		self._useWritev = useWritev
+
+		self._filepath = None
+		self._rawHandler = None
+		self._compressedHandler = None
+
+		self._pendingChunks = []
+		self._pendingSize = 0
+		# File size once closed (getBytesWritten() after close())
+		self._closedBytes = None
+
+		# Statistics
+		self._bytesWritten = 0
+		self._timeSpent = 0.0
+
+		# Compressed output: the compressor holds data we can't measure, so
+		# the size of the current stream is bounded from the input given to
+		# it since it started (see getBytesWritten() and tightenStorage())
+		self._openCompressed = None
+		self._streamOverhead = 0
+		self._streamStartBytes = 0
+		self._streamStartInput = 0
+
+
+	def open(self, filepath, overwrite=True):
+
+		self._checkDestinationPath(filepath)
+
+		self._filepath = filepath
+		# Unbuffered: we do the buffering ourselves
+		if (overwrite):
+			self._rawHandler = open(filepath, "wb", buffering=0)
+		else:
+			self._rawHandler = open(filepath, "ab", buffering=0)
+
+		extension = os.path.splitext(filepath)[1].lower()
+		self._openCompressed = self.COMPRESSIONS.get(extension)
+		if (self._openCompressed is not None):
+			# Appending to a compressed file adds a new stream, which all
+			# three formats read back as one
+			self._streamOverhead = self.COMPRESSED_STREAM_OVERHEADS[extension]
+			self._startStream()
+			if (self._useWritev):
+				self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "os.writev() not used for compressed output '" + str(filepath) + "'")
+				self._useWritev = False
+
+		if ( (self._useWritev) and (not hasattr(os, "writev")) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "os.writev() not available on this platform")
+			self._useWritev = False
+
+
+	def _startStream(self):
+		# Size taken before the compressor writes its header
+		self._streamStartBytes = self._rawHandler.tell()
+		self._streamStartInput = self._bytesWritten
+		self._compressedHandler = self._openCompressed(self._rawHandler)
+
+
+	def _writevAll(self, chunks):
+		fileno = self._rawHandler.fileno()
+		for start in range(0, len(chunks), self.MAX_WRITEV_CHUNKS):
+			group = chunks[start:start+self.MAX_WRITEV_CHUNKS]
+			written = os.writev(fileno, group)
+			# Partial write: finish the remaining bytes by hand
+			remaining = b"".join(group)[written:]
+			while (len(remaining) > 0):
+				written = os.write(fileno, remaining)
+				remaining = remaining[written:]
+
+
+	def _flushPending(self):
+		if (self._pendingSize == 0):
+			return
+
+		if (self._compressedHandler is not None):
+			self._compressedHandler.write(b"".join(self._pendingChunks))
+		elif (self._useWritev):
+			self._writevAll(self._pendingChunks)
+		else:
+			self._rawHandler.write(b"".join(self._pendingChunks))
+
+		self._pendingChunks.clear()
+		self._pendingSize = 0
+
+
+	def write(self, wordsList):
+		if (len(wordsList) == 0):
+			return
+
+		startTime = time.perf_counter()
+
+		# One join and one encode for the whole batch
+		chunk = ("\n".join(wordsList) + "\n").encode(self._encoding)
+		self._pendingChunks.append(chunk)
+		self._pendingSize += len(chunk)
+		self._bytesWritten += len(chunk)
+
+		if (self._pendingSize >= self._blockSize):
+			self._flushPending()
+
+		self._timeSpent += time.perf_counter() - startTime
+
+
+	def getRecordSize(self, word):
+		recordSize = len(word.encode(self._encoding)) + 1
+		if (self._compressedHandler is None):
+			return recordSize
+		# Share of the compressed size bound; rounded up so records always
+		# add up to at least the bound of their total
+		return recordSize + (recordSize >> self.COMPRESSED_EXPANSION_SHIFT) + 1
+
+
+	def getBytesWritten(self):
+		# File size once pending bytes are written
+		if (self._rawHandler is None):
+			return self._closedBytes
+		if (self._compressedHandler is None):
+			return self._rawHandler.tell() + self._pendingSize
+		# Compressed: upper bound of the file size once the current stream is
+		# closed, whatever the compressor still holds
+		streamInput = self._bytesWritten - self._streamStartInput
+		return self._streamStartBytes + streamInput + (streamInput >> self.COMPRESSED_EXPANSION_SHIFT) + self._streamOverhead
+
+
+	def tightenStorage(self):
+		# Close the current compressed stream so its real size is on disk,
+		# and go on in a new stream: getBytesWritten() becomes exact again
+		if ( (self._compressedHandler is None) or (self._bytesWritten == self._streamStartInput) ):
+			return False
+		self._flushPending()
+		self._compressedHandler.close()
+		self._startStream()
+		return True
+
+
+	def getUncompressedBytesWritten(self):
+		# Pending bytes included
+		return self._bytesWritten
+
+
+	def getStateKey(self):
+		return os.path.abspath(self._filepath)
+
+
+	def getState(self):
+		# Everything up to the returned offset is on disk
+		self._flushPending()
+		if (self._compressedHandler is not None):
+			self._compressedHandler.flush()
+		return { "offset": self._rawHandler.tell(), "compressed": (self._compressedHandler is not None) }
+
+
+	def setState(self, state):
+		if ( state.get("compressed") or (self._compressedHandler is not None) ):
+			# A truncated compressed stream can't be appended to
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Compressed output '" + str(self._filepath) + "' can not be resumed")
+		# Drop what was written after the checkpoint; it will be generated again
+		self._flushPending()
+		self._rawHandler.truncate(state["offset"])
+		self._rawHandler.seek(0, os.SEEK_END)
+		self._bytesWritten = state["offset"]
+
+
+	def close(self):
+		startTime = time.perf_counter()
+		self._flushPending()
+		if (self._compressedHandler is not None):
+			self._compressedHandler.close()
+			self._compressedHandler = None
+		diskBytes = self._rawHandler.tell()
+		self._rawHandler.close()
+		self._rawHandler = None
+		self._closedBytes = diskBytes
+		self._timeSpent += time.perf_counter() - startTime
+
+		throughput = (self._bytesWritten / (1024*1024)) / max(self._timeSpent, 1e-9)
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Wrote " + str(self._bytesWritten) + " bytes (" + str(diskBytes) + " on disk) to '" + str(self._filepath) + "' in " + format(self._timeSpent, ".2f") + "s (" + format(throughput, ".1f") + " MB/s)")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3.6
+
+import os
+import mmap
+import codecs
+import struct
+
+from Writers.WriterInterface import *
+
+class FixedWidthRecordWriter(WriterInterface):
+
+	# Binary output: every password is one record of recordWidth bytes,
+	# right padded with "\0", without any separator.
+	# Record i starts at HEADER_SIZE + (i * recordWidth), so files can be
+	# memory mapped and indexed, sorted or deduplicated as fixed size blobs.
+	#
+	# Header (HEADER_SIZE bytes, little endian):
+	#	magic    : 4 bytes  "WGFW"
+	#	version  : uint32
+	#	width    : uint32   bytes per record
+	#	count    : uint64   number of records (written on close)
+	#	encoding : 16 bytes codec name, "\0" padded
+	MAGIC = b"WGFW"
+	VERSION = 1
+	HEADER_FORMAT = "<4sIIQ16s"
+	HEADER_SIZE = 64
+
+	def __init__(self, loggerObj, recordWidth, encoding="utf-8", bufferSize=(1024*1024)):
+		super().__init__(loggerObj)
+
+		if ( (not isinstance(recordWidth, int)) or (recordWidth < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "recordWidth must be an integer greater or equal to 1")
+		self._recordWidth = recordWidth
+
+		try:
+			# Normalized name ("UTF8" -> "utf-8"), so readers compare equal
+			self._encoding = codecs.lookup(encoding).name
+		except LookupError as err:
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Unknown encoding '" + str(encoding) + "'")
+		if (len(self._encoding.encode("ascii")) > 16):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Encoding name '" + str(self._encoding) + "' too long for the header")
+		self._bufferSize = bufferSize
+
+		self._fileHandler = None
+		self._filepath = None
+		self._count = 0
+		self._tooLongCount = 0
+
+
+	@classmethod
+	def packHeader(cls, recordWidth, count, encoding):
+		header = struct.pack(cls.HEADER_FORMAT, cls.MAGIC, cls.VERSION, recordWidth, count, encoding.encode("ascii"))
+		return header.ljust(cls.HEADER_SIZE, b"\0")
+
+
+	@classmethod
+	def unpackHeader(cls, headerBytes):
+		# Return (recordWidth, count, encoding), or None if not a valid header
+		if (len(headerBytes) < cls.HEADER_SIZE):
+			return None
+		(magic, version, recordWidth, count, encoding) = struct.unpack_from(cls.HEADER_FORMAT, headerBytes)
+		if ( (magic != cls.MAGIC) or (version != cls.VERSION) ):
+			return None
+		return (recordWidth, count, encoding.rstrip(b"\0").decode("ascii"))
+
+
+	def open(self, filepath, overwrite=True):
+
+		self._checkDestinationPath(filepath)
+
+		self._filepath = filepath
+		self._count = 0
+		if ( (not overwrite) and (os.path.isfile(filepath)) and (os.path.getsize(filepath) > 0) ):
+			self._fileHandler = open(filepath, "r+b", buffering=self._bufferSize)
+			header = self.unpackHeader(self._fileHandler.read(self.HEADER_SIZE))
+			if (header is None):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Can't append to '" + str(filepath) + "': not a fixed width records file")
+			(recordWidth, count, encoding) = header
+			if ( (recordWidth != self._recordWidth) or (encoding != self._encoding) ):
+				self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Can't append to '" + str(filepath) + "': records are " + str(recordWidth) + " bytes " + encoding + ", not " + str(self._recordWidth) + " bytes " + self._encoding)
+			# Count from the size: header count is not updated if a run crashed
+			self._count = (os.path.getsize(filepath) - self.HEADER_SIZE) // self._recordWidth
+			self._fileHandler.truncate(self.HEADER_SIZE + (self._count * self._recordWidth))
+			self._fileHandler.seek(0, os.SEEK_END)
+		else:
+			self._fileHandler = open(filepath, "wb", buffering=self._bufferSize)
+			self._fileHandler.write(self.packHeader(self._recordWidth, 0, self._encoding))
+
+
+	def write(self, wordsList):
+		recordWidth = self._recordWidth
+		records = [ word.encode(self._encoding) for word in wordsList ]
+		if (any( (len(record) > recordWidth) for record in records )):
+			if (self._tooLongCount == 0):
+				self._logger.printMessage(self, SimpleLoggerLevel.ERROR, "Passwords longer than %d bytes are not written to '%s'", recordWidth, self._filepath)
+			nbRecords = len(records)
+			records = [ record for record in records if (len(record) <= recordWidth) ]
+			self._tooLongCount += nbRecords - len(records)
+
+		self._fileHandler.write(b"".join( (record if (len(record) == recordWidth) else record.ljust(recordWidth, b"\0")) for record in records ))
+		self._count += len(records)
+
+
+	def getRecordSize(self, word):
+		# Too long passwords are not written
+		recordSize = len(word.encode(self._encoding))
+		if (recordSize > self._recordWidth):
+			return 0
+		return self._recordWidth
+
+
+	def getBytesWritten(self):
+		return self.HEADER_SIZE + (self._count * self._recordWidth)
+
+
+	def getStateKey(self):
+		return os.path.abspath(self._filepath)
+
+
+	def getState(self):
+		self._fileHandler.flush()
+		return { "offset": self._fileHandler.tell(), "count": self._count }
+
+
+	def setState(self, state):
+		# Drop what was written after the checkpoint; it will be generated again
+		self._fileHandler.flush()
+		self._fileHandler.truncate(state["offset"])
+		self._fileHandler.seek(0, os.SEEK_END)
+		self._count = state["count"]
+
+
+	def close(self):
+		self._fileHandler.seek(0)
+		self._fileHandler.write(self.packHeader(self._recordWidth, self._count, self._encoding))
+		self._fileHandler.close()
+		self._fileHandler = None
+
+		if (self._tooLongCount > 0):
+			self._logger.printMessage(self, SimpleLoggerLevel.ERROR, str(self._tooLongCount) + " password(s) longer than " + str(self._recordWidth) + " bytes were not written to '" + str(self._filepath) + "'")
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Wrote " + str(self._count) + " record(s) of " + str(self._recordWidth) + " bytes to '" + str(self._filepath) + "'")
+
+
+
+class FixedWidthRecordReader(object):
+
+	# Memory mapped, random access reader for FixedWidthRecordWriter files
+	#	with FixedWidthRecordReader(logger, "out.bin") as records:
+	#		print(len(records), records[0], records[-1])
+
+	def __init__(self, loggerObj, filepath):
+		if (not isinstance(loggerObj, SimpleLogger)):
+			raise Exception("loggerObj not of a SimpleLogger instance!")
+		self._logger = loggerObj
+
+		self._fileHandler = open(filepath, "rb")
+		header = FixedWidthRecordWriter.unpackHeader(self._fileHandler.read(FixedWidthRecordWriter.HEADER_SIZE))
+		if (header is None):
+			self._fileHandler.close()
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "'" + str(filepath) + "' is not a fixed width records file")
+		(self._recordWidth, headerCount, self._encoding) = header
+
+		fileSize = os.path.getsize(filepath)
+		self._count = (fileSize - FixedWidthRecordWriter.HEADER_SIZE) // self._recordWidth
+		if (headerCount != self._count):
+			self._logger.printMessage(self, SimpleLoggerLevel.WARNING, "'" + str(filepath) + "' header says " + str(headerCount) + " record(s) but holds " + str(self._count) + " (file not closed properly?)")
+
+		self._mappedFile = None
+		if (fileSize > 0):
+			self._mappedFile = mmap.mmap(self._fileHandler.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+	def getRecordWidth(self):
+		return self._recordWidth
+
+
+	def getEncoding(self):
+		return self._encoding
+
+
+	def getRawRecord(self, index):
+		# Record bytes, padding included
+		if (index < 0):
+			index += self._count
+		if ( (index < 0) or (index >= self._count) ):
+			raise IndexError("record index out of range")
+		start = FixedWidthRecordWriter.HEADER_SIZE + (index * self._recordWidth)
+		return self._mappedFile[start:start+self._recordWidth]
+
+
+	def __len__(self):
+		return self._count
+
+
+	def __getitem__(self, index):
+		# Strip after decoding: with UTF-16/32, "\0" bytes belong to characters
+		return self.getRawRecord(index).decode(self._encoding).rstrip("\0")
+
+
+	def __iter__(self):
+		for index in range(self._count):
+			yield self[index]
+
+
+	def close(self):
+		if (self._mappedFile is not None):
+			self._mappedFile.close()
+			self._mappedFile = None
+		self._fileHandler.close()
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
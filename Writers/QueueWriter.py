@@ -0,0 +1,25 @@
+#!/usr/bin/env python3.6
+
+from Writers.WriterInterface import *
+
+class QueueWriter(WriterInterface):
+	
+	# Forward batches to a (multiprocessing) queue
+	# Used by worker processes to hand their sequences to the parent process
+	# Each item put in the queue is a tuple (workerIndex, wordsList);
+	# wordsList is None once the writer is closed.
+	def __init__(self, loggerObj, queueObj, workerIndex):
+		super().__init__(loggerObj)
+		self._queue = queueObj
+		self._workerIndex = workerIndex
+	
+	def open(self, filepath, overwrite=True):
+		# No open required for queue writer
+		pass
+	
+	def write(self, wordsList):
+		# Copy the list, the generator reuse its own
+		self._queue.put( (self._workerIndex, list(wordsList)) )
+	
+	def close(self):
+		self._queue.put( (self._workerIndex, None) )
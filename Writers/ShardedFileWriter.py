@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.6
+
+import os
+import json
+import bisect
+import itertools
+import threading
+import concurrent.futures
+
+from Writers.WriterInterface import *
+from Writers.BlockFileWriter import *
+
+class ShardedFileWriter(WriterInterface):
+
+	# Split the output in numbered shards ("out.txt" -> "out.00001.txt", ...)
+	# A shard is closed once it holds maximumPasswordsPerShard passwords or
+	# maximumBytesPerShard bytes (uncompressed), and a new one is started.
+	#
+	# "out.manifest.json" lists every closed shard with its passwords count
+	# and sizes; it is rewritten (atomically) each time a shard is closed, so
+	# consumers can pick shards as soon as they show up in it.
+	#
+	# With parallelShards > 1, that many shards are open at once: each batch
+	# is cut in parallelShards parts written concurrently (compression and
+	# I/O release the GIL) by a thread pool.
+
+	MANIFEST_VERSION = 1
+	SHARD_INDEX_WIDTH = 5
+
+	def __init__(self, loggerObj, maximumPasswordsPerShard=0, maximumBytesPerShard=0, parallelShards=1, blockSize=(1024*1024), useWritev=False, encoding="utf-8"):
+		super().__init__(loggerObj)
+
+		if ( (not isinstance(maximumPasswordsPerShard, int)) or (maximumPasswordsPerShard < 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumPasswordsPerShard must be a positive integer")
+		if ( (not isinstance(maximumBytesPerShard, int)) or (maximumBytesPerShard < 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "maximumBytesPerShard must be a positive integer")
+		if ( (maximumPasswordsPerShard == 0) and (maximumBytesPerShard == 0) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Either maximumPasswordsPerShard or maximumBytesPerShard must be set")
+		if ( (not isinstance(parallelShards, int)) or (parallelShards < 1) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "parallelShards must be an integer greater or equal to 1")
+
+		self._maxPasswords = maximumPasswordsPerShard
+		self._maxBytes = maximumBytesPerShard
+		self._nbParallel = parallelShards
+		self._blockSize = blockSize
+		self._useWritev = useWritev
+		self._encoding = encoding
+
+		self._filepath = None
+		self._overwrite = True
+		self._executor = None
+		# Compressed shards: overhead of a compressed stream (0: not compressed)
+		self._streamOverhead = 0
+
+		# One entry per parallel slot: currently open shard, or None
+		#	{ "index", "path", "writer", "passwords", "bytes" }
+		self._openShards = [None] * parallelShards
+
+		# Shared between slots
+		self._lock = threading.Lock()
+		self._nextShardIndex = 1
+		self._closedShards = []
+
+
+	def _splitPath(self):
+		# "out.txt.gz" -> ("out", ".txt.gz")
+		(root, ext) = os.path.splitext(self._filepath)
+		if (ext.lower() in BlockFileWriter.COMPRESSIONS):
+			(root, innerExt) = os.path.splitext(root)
+			ext = innerExt + ext
+		return (root, ext)
+
+
+	def getShardPath(self, shardIndex):
+		# "out.txt" -> "out.00001.txt", "out.txt.gz" -> "out.00001.txt.gz"
+		(root, ext) = self._splitPath()
+		return root + "." + str(shardIndex).zfill(self.SHARD_INDEX_WIDTH) + ext
+
+
+	def getManifestPath(self):
+		(root, ext) = self._splitPath()
+		return root + ".manifest.json"
+
+
+	def open(self, filepath, overwrite=True):
+
+		self._checkDestinationPath(filepath)
+
+		self._filepath = filepath
+		self._overwrite = overwrite
+		self._streamOverhead = BlockFileWriter.COMPRESSED_STREAM_OVERHEADS.get(os.path.splitext(filepath)[1].lower(), 0)
+		if (self._nbParallel > 1):
+			self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._nbParallel)
+
+		# Appending: continue after the shards already listed in the manifest
+		if ( (not overwrite) and (os.path.isfile(self.getManifestPath())) ):
+			with open(self.getManifestPath(), "r") as manifestFile:
+				self._closedShards = json.load(manifestFile)["shards"]
+			self._nextShardIndex = max( [ shard["index"] for shard in self._closedShards ] + [0] ) + 1
+
+
+	def _openShard(self):
+		with self._lock:
+			shardIndex = self._nextShardIndex
+			self._nextShardIndex += 1
+
+		shardPath = self.getShardPath(shardIndex)
+		writer = BlockFileWriter(loggerObj=self._logger, blockSize=self._blockSize, useWritev=self._useWritev, encoding=self._encoding)
+		writer.open(filepath=shardPath, overwrite=True)
+		return { "index": shardIndex, "path": shardPath, "writer": writer, "passwords": 0, "bytes": 0 }
+
+
+	def _closeShard(self, shard):
+		shard["writer"].close()
+		entry = {
+			"index"    : shard["index"],
+			"path"     : os.path.basename(shard["path"]),
+			"passwords": shard["passwords"],
+			"bytes"    : shard["bytes"],
+			"diskBytes": os.path.getsize(shard["path"]),
+		}
+		with self._lock:
+			self._closedShards.append(entry)
+			self._writeManifest()
+
+
+	def _writeManifest(self):
+		# Called with self._lock held
+		manifest = {
+			"version"  : self.MANIFEST_VERSION,
+			"encoding" : self._encoding,
+			"shards"   : sorted(self._closedShards, key=lambda shard: shard["index"]),
+			"passwords": sum( shard["passwords"] for shard in self._closedShards ),
+			"bytes"    : sum( shard["bytes"] for shard in self._closedShards ),
+		}
+		tmpPath = self.getManifestPath() + ".tmp"
+		with open(tmpPath, "w") as manifestFile:
+			json.dump(manifest, manifestFile, indent=1)
+		os.replace(tmpPath, self.getManifestPath())
+
+
+	def _writeToSlot(self, slot, wordsList):
+		# Only one thread at a time works on a given slot
+		if (self._maxBytes > 0):
+			# wordsOffsets[i]: bytes of wordsList[:i]
+			wordsOffsets = [0]
+			wordsOffsets.extend(itertools.accumulate( (len(word.encode(self._encoding)) + 1) for word in wordsList ))
+
+		start = 0
+		while (start < len(wordsList)):
+			shard = self._openShards[slot]
+			if (shard is None):
+				shard = self._openShard()
+				self._openShards[slot] = shard
+
+			# Words going in this shard: up to the passwords limit...
+			end = len(wordsList)
+			if (self._maxPasswords > 0):
+				end = min(end, start + self._maxPasswords - shard["passwords"])
+			# ... and the bytes limit (a password longer than the limit
+			# still goes alone in an empty shard)
+			if (self._maxBytes > 0):
+				bytesLeft = self._maxBytes - shard["bytes"]
+				end = min(end, bisect.bisect_right(wordsOffsets, wordsOffsets[start] + bytesLeft) - 1)
+				if ( (end == start) and (shard["passwords"] == 0) ):
+					end = start + 1
+
+			shard["writer"].write(wordsList[start:end])
+			shard["passwords"] += (end - start)
+			shard["bytes"] = shard["writer"].getUncompressedBytesWritten()
+			start = end
+
+			# Stopped before the end of the batch, or limit reached exactly
+			if ( (start < len(wordsList)) or
+			     ((self._maxPasswords > 0) and (shard["passwords"] >= self._maxPasswords)) or
+			     ((self._maxBytes > 0) and (shard["bytes"] >= self._maxBytes)) ):
+				self._closeShard(shard)
+				self._openShards[slot] = None
+
+
+	def write(self, wordsList):
+		if (len(wordsList) == 0):
+			return
+
+		if (self._executor is None):
+			self._writeToSlot(0, wordsList)
+			return
+
+		# Cut the batch in one contiguous part per slot
+		partSize = (len(wordsList) + self._nbParallel - 1) // self._nbParallel
+		futures = []
+		for slot in range(self._nbParallel):
+			part = wordsList[slot*partSize:(slot+1)*partSize]
+			if (len(part) > 0):
+				futures.append(self._executor.submit(self._writeToSlot, slot, part))
+		for future in futures:
+			# Re-raise any error from the slot thread
+			future.result()
+
+
+	def getRecordSize(self, word):
+		recordSize = len(word.encode(self._encoding)) + 1
+		if (self._streamOverhead == 0):
+			return recordSize
+		# Same bound as the compressed shard writers
+		return recordSize + (recordSize >> BlockFileWriter.COMPRESSED_EXPANSION_SHIFT) + 1
+
+
+	def getBytesWritten(self):
+		# Closed shards on disk, plus what open shards hold so far; a
+		# compressed shard still to open costs at least its stream overhead
+		with self._lock:
+			closedBytes = sum( shard["diskBytes"] for shard in self._closedShards )
+		return closedBytes + sum( (shard["writer"].getBytesWritten() if (shard is not None) else self._streamOverhead) for shard in self._openShards )
+
+
+	def tightenStorage(self):
+		tightened = False
+		for shard in self._openShards:
+			if ( (shard is not None) and (shard["writer"].tightenStorage()) ):
+				tightened = True
+		return tightened
+
+
+	def getStateKey(self):
+		return os.path.abspath(self._filepath)
+
+
+	def getState(self):
+		with self._lock:
+			return { "closedShards": list(self._closedShards) }
+
+
+	def setState(self, state):
+		# Open shards are cut at arbitrary places; there is no safe point to resume from
+		self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Sharded output '" + str(self._filepath) + "' can not be resumed")
+
+
+	def close(self):
+		for slot in range(self._nbParallel):
+			if (self._openShards[slot] is not None):
+				self._closeShard(self._openShards[slot])
+				self._openShards[slot] = None
+		if (self._executor is not None):
+			self._executor.shutdown()
+			self._executor = None
+
+		# Manifest always exists, even without any shard
+		with self._lock:
+			self._writeManifest()
+		self._logger.printMessage(self, SimpleLoggerLevel.INFO, "Wrote " + str(len(self._closedShards)) + " shard(s), listed in '" + str(self.getManifestPath()) + "'")
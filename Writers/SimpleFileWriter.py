@@ -9,32 +9,52 @@ class SimpleFileWriter(WriterInterface):
 	def __init__(self, loggerObj):
 		super().__init__(loggerObj)
 		self._fileHandler = None
+		self._filepath = None
+		self._bytesWritten = 0
 	
 	def open(self, filepath, overwrite=True):
 		
-		parentDir = os.path.dirname(filepath)
-		# Check if we have a parent subdirectory
-		# If not, use "." (current work dir)
-		if (parentDir == ""):
-			parentDir = "."
-		# Check existence and write on parent
-		if ( (not os.path.exists(parentDir)) or (not os.access(parentDir, os.W_OK)) ):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Writer destination path '" + str(filepath) + "' does not exist or is not writable!" )
-		
-		# If target already exist, check that it is a file and that it is writable
-		if ( (os.path.exists(filepath)) and 
-			( (not os.access(filepath, os.W_OK)) or (not os.path.isfile(filepath)) ) ):
-			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Writer destination path '" + str(filepath) + "' is not a file or file is not writable!" )
+		self._checkDestinationPath(filepath)
 		
+		self._filepath = filepath
 		if (overwrite):
 			self._fileHandler = open(filepath, "w")
+			self._bytesWritten = 0
 		else:
 			self._fileHandler = open(filepath, "a")
+			self._bytesWritten = os.path.getsize(filepath)
 	
 	
 	def write(self, wordsList):
 		for word in wordsList:
 			self._fileHandler.write(word + "\n")
+			self._bytesWritten += self.getRecordSize(word)
+	
+	
+	def getRecordSize(self, word):
+		return len(word.encode(self._fileHandler.encoding)) + 1
+	
+	
+	def getBytesWritten(self):
+		return self._bytesWritten
+	
+	
+	def getStateKey(self):
+		return os.path.abspath(self._filepath)
+	
+	
+	def getState(self):
+		# Everything up to the returned offset is on disk
+		self._fileHandler.flush()
+		return { "offset": self._fileHandler.tell() }
+	
+	
+	def setState(self, state):
+		# Drop what was written after the checkpoint; it will be generated again
+		self._fileHandler.flush()
+		self._fileHandler.truncate(state["offset"])
+		self._fileHandler.seek(0, os.SEEK_END)
+		self._bytesWritten = state["offset"]
 	
 	
 	def close(self):
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3.6
 
+import os
+
 from SimpleLogger import *
 
 class WriterInterface(object):
@@ -9,6 +11,22 @@ class WriterInterface(object):
 			raise Exception("loggerObj not of a SimpleLogger instance!")
 		self._logger = loggerObj
 	
+	def _checkDestinationPath(self, filepath):
+		# Shared by file based writers
+		parentDir = os.path.dirname(filepath)
+		# Check if we have a parent subdirectory
+		# If not, use "." (current work dir)
+		if (parentDir == ""):
+			parentDir = "."
+		# Check existence and write on parent
+		if ( (not os.path.exists(parentDir)) or (not os.access(parentDir, os.W_OK)) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Writer destination path '" + str(filepath) + "' does not exist or is not writable!" )
+		
+		# If target already exist, check that it is a file and that it is writable
+		if ( (os.path.exists(filepath)) and 
+			( (not os.access(filepath, os.W_OK)) or (not os.path.isfile(filepath)) ) ):
+			self._logger.printMessage(self, SimpleLoggerLevel.CRITICAL, "Writer destination path '" + str(filepath) + "' is not a file or file is not writable!" )
+	
 	def open(self, filepath, overwrite=True):
 		raise Exception("Method must be implemented by child class")
 	
@@ -16,4 +34,32 @@ class WriterInterface(object):
 		raise Exception("Method must be implemented by child class")
 	
 	def close(self):
-		raise Exception("Method must be implemented by child class")
\ No newline at end of file
+		raise Exception("Method must be implemented by child class")
+	
+	# Bytes the word will use once written (before any compression)
+	# Writers not using any storage (screen, queue) return 0
+	def getRecordSize(self, word):
+		return 0
+	
+	# Storage actually used by the output so far (ex: file size)
+	# Writers not using any storage return None
+	def getBytesWritten(self):
+		return None
+	
+	# When getBytesWritten() is only an upper bound (ex: data held by a
+	# compressor), make it exact; return True if it may have decreased
+	def tightenStorage(self):
+		return False
+	
+	# Key used to match a saved state with its writer on resume
+	def getStateKey(self):
+		return self.__class__.__name__
+	
+	# Picklable position of the writer (ex: file offset), used by checkpoints
+	# Writers without meaningful position return None
+	def getState(self):
+		return None
+	
+	# Rewind the writer to a getState() position
+	def setState(self, state):
+		pass
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3.6
+
+import os
+import sys
+import random
+import string
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SimpleLogger import *
+from WriterController import *
+from Writers.BlockFileWriter import *
+
+class StorageLimitTest(unittest.TestCase):
+
+	# Final file size against --maximum-storage-size, for every codec:
+	# never over the limit, and not stopped early either (only the room a
+	# compressed stream may still need is left unused)
+
+	EXTENSIONS = [ ".txt", ".gz", ".bz2", ".xz", ".lzma" ]
+	LIMITS = [ 10 * 1024, 100 * 1024, 1024 * 1024 ]
+	BATCH_SIZE = 1000
+
+	def setUp(self):
+		self._logger = SimpleLogger(defaultLevel=SimpleLoggerLevel.ERROR,
+		                            printOnStderrLevel=SimpleLoggerLevel.ERROR,
+		                            throwOnLevel=SimpleLoggerLevel.CRITICAL)
+		self._directory = tempfile.TemporaryDirectory()
+		# Somewhat compressible, like real passwords
+		randomObj = random.Random(1)
+		self._words = [ "".join(randomObj.choices(string.ascii_lowercase[:12], k=8)) for index in range(5000) ]
+		self._random = randomObj
+
+
+	def tearDown(self):
+		self._directory.cleanup()
+
+
+	def _writeUpTo(self, filepath, limit):
+		# Same use of the controller as SequenceGenerator: reserve, write
+		# the batch (even empty once refused), go on while storage is left
+		writerCtrl = WriterController(loggerObj=self._logger)
+		writer = BlockFileWriter(loggerObj=self._logger)
+		writer.open(filepath)
+		writerCtrl.addWriter(writer)
+		writerCtrl.setStorageLimit(limit)
+
+		while (writerCtrl.hasStorageLeft()):
+			batch = []
+			for index in range(self.BATCH_SIZE):
+				word = self._random.choice(self._words)
+				if (not writerCtrl.reserve(word)):
+					break
+				batch.append(word)
+			writerCtrl.write(batch)
+		writerCtrl.close()
+		return os.path.getsize(filepath)
+
+
+	def test_limitIsReachedWithoutOverrun(self):
+		for extension in self.EXTENSIONS:
+			for limit in self.LIMITS:
+				with self.subTest(extension=extension, limit=limit):
+					size = self._writeUpTo(os.path.join(self._directory.name, "out" + str(limit) + extension), limit)
+					self.assertLessEqual(size, limit)
+					# Room a new stream may need, plus one record
+					unusedAllowed = BlockFileWriter.COMPRESSED_STREAM_OVERHEADS.get(extension, 0) + 16
+					self.assertGreaterEqual(size, limit - unusedAllowed)
+
+
+if __name__ == '__main__':
+	unittest.main()